@@ -0,0 +1,119 @@
+import bisect
+import json
+import os
+
+
+class AddressIndex:
+    """Per-address posting lists of confirmed transactions.
+
+    Each address maps to a list of (height, position, direction, token)
+    entries in chain order, where `direction` is a bit set of SENT and
+    RECEIVED (both for a transfer to oneself). Entries are appended block by
+    block, so listing an address's transactions only touches the blocks that
+    contain them, and a cursor (height, position) resumes a listing with a
+    binary search. Snapshots carry the height and tip hash they were taken at,
+    like the account ledger's.
+    """
+
+    SENT = 1
+    RECEIVED = 2
+
+    def __init__(self):
+        self.postings = {}
+        self.height = 0
+        self.tip_hash = None
+
+    @classmethod
+    def transaction_postings(cls, tx):
+        """Yield (address, direction) for one transaction."""
+        sender = tx.get("sender")
+        receiver = tx.get("receiver")
+        if sender is not None and sender == receiver:
+            yield sender, cls.SENT | cls.RECEIVED
+            return
+        if sender is not None:
+            yield sender, cls.SENT
+        if receiver is not None:
+            yield receiver, cls.RECEIVED
+
+    def apply_block(self, block):
+        for position, tx in enumerate(block.transactions):
+            token = tx.get("token", "IFC")
+            for address, direction in self.transaction_postings(tx):
+                self.postings.setdefault(address, []).append((block.index, position, direction, token))
+        self.height = block.index + 1
+        self.tip_hash = block.hash
+
+    def revert_block(self, block, previous_hash=None):
+        """Undo the tip block; `previous_hash` becomes the new tip hash."""
+        for tx in block.transactions:
+            for address, _ in self.transaction_postings(tx):
+                entries = self.postings.get(address)
+                while entries and entries[-1][0] == block.index:
+                    entries.pop()
+                if entries == []:
+                    del self.postings[address]
+        self.height = block.index
+        self.tip_hash = previous_hash if previous_hash is not None else block.previous_hash
+
+    def iter_entries(self, address, direction=None, token=None, after=None, where=None):
+        """Yield one address's entries in chain order.
+
+        Starts after the (height, position) cursor `after` and keeps entries
+        whose direction has the `direction` bit, whose token is `token` and
+        that pass `where(entry)`.
+        """
+        entries = self.postings.get(address, [])
+        start = bisect.bisect_right(entries, tuple(after), key=lambda entry: entry[:2]) if after else 0
+        for i in range(start, len(entries)):
+            entry = entries[i]
+            if direction and not entry[2] & direction:
+                continue
+            if token and entry[3] != token:
+                continue
+            if where is not None and not where(entry):
+                continue
+            yield entry
+
+    def page(self, address, direction=None, token=None, after=None, limit=None, where=None):
+        """Return (entries, more): up to `limit` entries of `iter_entries` and whether another one follows."""
+        matches = []
+        for entry in self.iter_entries(address, direction, token, after, where):
+            if limit is not None and len(matches) == limit:
+                return matches, True
+            matches.append(entry)
+        return matches, False
+
+    def count(self, address):
+        return len(self.postings.get(address, []))
+
+    def rebuild(self, chain):
+        """Recompute every posting list by applying the whole chain."""
+        self.postings = {}
+        self.height = 0
+        self.tip_hash = None
+        for block in chain:
+            self.apply_block(block)
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"height": self.height, "tip_hash": self.tip_hash, "postings": self.postings}, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Load a snapshot; returns False if it is missing or unreadable."""
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, "r") as f:
+                snapshot = json.load(f)
+        except json.JSONDecodeError:
+            print(f"ERROR: Corrupted address index snapshot {path}, it will be rebuilt.")
+            return False
+
+        self.postings = {address: [tuple(entry) for entry in entries]
+                         for address, entries in snapshot.get("postings", {}).items()}
+        self.height = snapshot.get("height", 0)
+        self.tip_hash = snapshot.get("tip_hash")
+        return True
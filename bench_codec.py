@@ -0,0 +1,109 @@
+"""Compare the binary block codec against the JSON path used for blocks so far.
+
+Usage:
+    python bench_codec.py [chain.json] [--blocks N] [--txs N] [--rounds N]
+
+Without a chain file a synthetic chain is generated. For each format it
+reports total encoded size and the time to encode and decode every block.
+"""
+import argparse
+import hashlib
+import json
+import random
+import time
+
+import block_codec
+
+
+def synthetic_chain(block_count, txs_per_block):
+    """Generate blocks shaped like the ones `IFChain.mine` produces."""
+    rng = random.Random(1985)
+    wallets = [hashlib.sha256(str(i).encode()).hexdigest()[:40] for i in range(200)]
+    previous_hash = "0"
+    blocks = []
+    for index in range(block_count):
+        transactions = []
+        for _ in range(txs_per_block):
+            amount = rng.randint(1, 10_000)
+            gas_fee = amount * 0.005
+            transactions.append({
+                "sender": rng.choice(wallets),
+                "receiver": rng.choice(wallets),
+                "amount": amount,
+                "token": "IFC",
+                "gas_fee": gas_fee,
+                "net_amount": amount - gas_fee,
+                "hash": hashlib.sha256(rng.randbytes(32)).hexdigest(),
+                "timestamp": 1740000000 + index * 60 + rng.random(),
+                "tx_type": "transfer",
+                "block_confirmations": 1,
+                "status": "confirmed",
+                "signatures": [],
+            })
+        block_hash = hashlib.sha256(rng.randbytes(32)).hexdigest()
+        blocks.append({
+            "index": index,
+            "timestamp": 1740000000.0 + index * 60,
+            "transactions": transactions,
+            "previous_hash": previous_hash,
+            "poh_hash": hashlib.sha256(rng.randbytes(32)).hexdigest(),
+            "nonce": rng.randint(0, 5000),
+            "hash": block_hash,
+        })
+        previous_hash = block_hash
+    return blocks
+
+
+def measure(blocks, encode, decode, rounds):
+    encoded = [encode(block) for block in blocks]
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for block in blocks:
+            encode(block)
+    encode_seconds = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for payload in encoded:
+            decode(payload)
+    decode_seconds = (time.perf_counter() - start) / rounds
+
+    return sum(len(payload) for payload in encoded), encode_seconds, decode_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("chain", nargs="?", help="JSON chain file (defaults to a synthetic chain)")
+    parser.add_argument("--blocks", type=int, default=500)
+    parser.add_argument("--txs", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.chain:
+        with open(args.chain, "r") as f:
+            blocks = json.load(f)
+        source = args.chain
+    else:
+        blocks = synthetic_chain(args.blocks, args.txs)
+        source = f"synthetic ({args.blocks} blocks x {args.txs} txs)"
+
+    for block in blocks:
+        assert block_codec.decode_block(block_codec.encode_block(block)) == block, "codec round trip mismatch"
+
+    formats = {
+        "json": (lambda block: json.dumps(block).encode(), json.loads),
+        "binary": (block_codec.encode_block, block_codec.decode_block),
+    }
+
+    print(f"Chain: {source}, {sum(len(b['transactions']) for b in blocks)} transactions, {args.rounds} rounds")
+    print(f"{'format':<8} {'bytes':>12} {'ratio':>7} {'encode ms':>11} {'decode ms':>11}")
+    baseline = None
+    for name, (encode, decode) in formats.items():
+        size, encode_seconds, decode_seconds = measure(blocks, encode, decode, args.rounds)
+        baseline = baseline or size
+        print(f"{name:<8} {size:>12} {size / baseline:>7.2f} {encode_seconds * 1000:>11.1f} {decode_seconds * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
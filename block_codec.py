@@ -0,0 +1,401 @@
+"""Compact, versioned binary encoding for IFChain blocks and transactions.
+
+Block layout (all integers are unsigned LEB128 varints unless noted):
+
+    format version (1 byte)
+    header length, header:
+        index, timestamp (tagged value), previous_hash, poh_hash (hash fields),
+        nonce, hash (hash field), then since format 2 the block header version
+        and merkle_root as tagged values (None for legacy blocks)
+    string table: count, then each string as length + UTF-8 bytes
+    transaction count, then each transaction:
+        presence bitmap over TRANSACTION_FIELDS, the present fields in that
+        fixed order as tagged values, then a tagged dict of any extra keys
+
+64-character lowercase hex hashes are stored as their raw 32 bytes, ints as
+zigzag varints, floats as IEEE-754 doubles and repeated strings (addresses,
+tokens, status values) as references into the per-block string table. Decoding
+returns exactly the values that were encoded, so `Block.compute_hash` gives
+the same result for a decoded block.
+
+Payloads come from untrusted peers, so decoding only ever raises CodecError:
+varints are limited to MAX_VARINT_BITS, nested lists and dicts to MAX_DEPTH
+levels, and no element count may exceed the bytes left in the payload (every
+element takes at least one byte), so a forged count cannot make the decoder
+allocate or loop beyond the size of the payload.
+
+Run as a script to convert a JSON chain file to the binary chain format and
+back:
+
+    python block_codec.py encode blockchain.json blockchain.bin
+    python block_codec.py decode blockchain.bin blockchain.json
+"""
+import json
+import struct
+import sys
+
+FORMAT_VERSION = 2
+SUPPORTED_FORMAT_VERSIONS = (1, 2)  # Format 1 payloads predate block header versions
+CONTENT_TYPE = "application/x-ifchain-block"
+CHAIN_FILE_MAGIC = b"IFCB"
+MAX_VARINT_BITS = 128
+MAX_DEPTH = 32  # Nesting of lists and dicts inside one value
+
+TRANSACTION_FIELDS = (
+    "sender", "receiver", "amount", "token", "gas_fee", "net_amount", "hash",
+    "timestamp", "tx_type", "block_confirmations", "status", "signatures",
+)
+
+T_NONE, T_FALSE, T_TRUE, T_INT, T_FLOAT, T_STR, T_STR_REF, T_HASH32, T_LIST, T_DICT = range(10)
+
+_DOUBLE = struct.Struct(">d")
+_HEX_DIGITS = frozenset("0123456789abcdef")
+
+
+class CodecError(ValueError):
+    """Raised when a payload is truncated, malformed or of an unknown format version."""
+
+
+def write_varint(out, value):
+    if value.bit_length() > MAX_VARINT_BITS:
+        raise CodecError(f"integer too large to encode ({value.bit_length()} bits)")
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(buf, pos):
+    try:
+        byte = buf[pos]
+    except IndexError:
+        raise CodecError("truncated varint") from None
+    if byte < 0x80:
+        return byte, pos + 1
+
+    result = shift = 0
+    while True:
+        try:
+            byte = buf[pos]
+        except IndexError:
+            raise CodecError("truncated varint") from None
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+        if shift >= MAX_VARINT_BITS:
+            raise CodecError("varint too long")
+
+
+def read_count(buf, pos, what):
+    """Read an element count, rejecting one larger than the bytes left (each element takes at least one)."""
+    count, pos = read_varint(buf, pos)
+    if count > len(buf) - pos:
+        raise CodecError(f"{what} count {count} exceeds the remaining payload")
+    return count, pos
+
+
+def _is_hash32(value):
+    return len(value) == 64 and _HEX_DIGITS.issuperset(value)
+
+
+class _StringTable:
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def ref(self, value):
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+
+def _write_str(out, value):
+    data = value.encode()
+    write_varint(out, len(data))
+    out += data
+
+
+def _read_str(buf, pos):
+    length, pos = read_varint(buf, pos)
+    end = pos + length
+    if end > len(buf):
+        raise CodecError("truncated string")
+    try:
+        return bytes(buf[pos:end]).decode(), end
+    except UnicodeDecodeError as e:
+        raise CodecError(f"invalid UTF-8 in string: {e}") from None
+
+
+def write_value(out, value, strings=None):
+    """Append one tagged value; strings go through `strings` when a table is given."""
+    value_type = type(value)
+    if value_type is str:
+        if strings is not None and value in strings.ids:
+            out.append(T_STR_REF)
+            write_varint(out, strings.ids[value])
+        elif _is_hash32(value):
+            out.append(T_HASH32)
+            out += bytes.fromhex(value)
+        elif strings is not None:
+            out.append(T_STR_REF)
+            write_varint(out, strings.ref(value))
+        else:
+            out.append(T_STR)
+            _write_str(out, value)
+    elif value_type is float:
+        out.append(T_FLOAT)
+        out += _DOUBLE.pack(value)
+    elif value is None:
+        out.append(T_NONE)
+    elif value is True:
+        out.append(T_TRUE)
+    elif value is False:
+        out.append(T_FALSE)
+    elif isinstance(value, int):
+        out.append(T_INT)
+        write_varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+    elif isinstance(value, float):
+        out.append(T_FLOAT)
+        out += _DOUBLE.pack(value)
+    elif isinstance(value, str):
+        write_value(out, str(value), strings)
+    elif isinstance(value, (list, tuple)):
+        out.append(T_LIST)
+        write_varint(out, len(value))
+        for item in value:
+            write_value(out, item, strings)
+    elif isinstance(value, dict):
+        out.append(T_DICT)
+        write_varint(out, len(value))
+        for key, item in value.items():
+            _write_str(out, str(key))
+            write_value(out, item, strings)
+    else:
+        raise CodecError(f"cannot encode value of type {type(value).__name__}")
+
+
+def read_value(buf, pos, strings=None, depth=0):
+    """Decode one tagged value, returning (value, next position)."""
+    try:
+        tag = buf[pos]
+    except IndexError:
+        raise CodecError("truncated value") from None
+    pos += 1
+    # Most frequent tags first: addresses/tokens, hashes, amounts
+    if tag == T_STR_REF:
+        string_id, pos = read_varint(buf, pos)
+        try:
+            return strings[string_id], pos
+        except (IndexError, TypeError):
+            raise CodecError(f"unknown string reference {string_id}") from None
+    if tag == T_HASH32:
+        if pos + 32 > len(buf):
+            raise CodecError("truncated hash")
+        return buf[pos:pos + 32].hex(), pos + 32
+    if tag == T_FLOAT:
+        if pos + 8 > len(buf):
+            raise CodecError("truncated float")
+        return _DOUBLE.unpack_from(buf, pos)[0], pos + 8
+    if tag == T_INT:
+        raw, pos = read_varint(buf, pos)
+        return (raw >> 1) if not raw & 1 else -((raw + 1) >> 1), pos
+    if tag == T_NONE:
+        return None, pos
+    if tag == T_TRUE:
+        return True, pos
+    if tag == T_FALSE:
+        return False, pos
+    if tag == T_STR:
+        return _read_str(buf, pos)
+    if tag in (T_LIST, T_DICT) and depth >= MAX_DEPTH:
+        raise CodecError(f"values nested deeper than {MAX_DEPTH} levels")
+    if tag == T_LIST:
+        count, pos = read_count(buf, pos, "list")
+        items = []
+        for _ in range(count):
+            item, pos = read_value(buf, pos, strings, depth + 1)
+            items.append(item)
+        return items, pos
+    if tag == T_DICT:
+        count, pos = read_count(buf, pos, "dict")
+        items = {}
+        for _ in range(count):
+            key, pos = _read_str(buf, pos)
+            items[key], pos = read_value(buf, pos, strings, depth + 1)
+        return items, pos
+    raise CodecError(f"unknown value tag {tag}")
+
+
+def encode_transaction(out, tx, strings):
+    presence = 0
+    for bit, field in enumerate(TRANSACTION_FIELDS):
+        if field in tx:
+            presence |= 1 << bit
+    write_varint(out, presence)
+    for field in TRANSACTION_FIELDS:
+        if field in tx:
+            write_value(out, tx[field], strings)
+    extras = {key: value for key, value in tx.items() if key not in TRANSACTION_FIELDS}
+    write_value(out, extras, strings)
+
+
+def decode_transaction(buf, pos, strings):
+    presence, pos = read_varint(buf, pos)
+    tx = {}
+    for bit, field in enumerate(TRANSACTION_FIELDS):
+        if presence & (1 << bit):
+            tx[field], pos = read_value(buf, pos, strings)
+    extras, pos = read_value(buf, pos, strings)
+    if not isinstance(extras, dict):
+        raise CodecError("transaction extras are not a dict")
+    tx.update(extras)
+    return tx, pos
+
+
+def _encode_header(block):
+    out = bytearray()
+    write_varint(out, block["index"])
+    write_value(out, block["timestamp"])
+    write_value(out, block["previous_hash"])
+    write_value(out, block["poh_hash"])
+    write_varint(out, block["nonce"])
+    write_value(out, block["hash"])
+    write_value(out, block.get("version"))
+    write_value(out, block.get("merkle_root"))
+    return out
+
+
+def encode_block(block):
+    """Encode a block dict (as produced by `Block.to_dict`) into the binary format."""
+    header = _encode_header(block)
+
+    strings = _StringTable()
+    body = bytearray()
+    transactions = block.get("transactions") or []
+    write_varint(body, len(transactions))
+    for tx in transactions:
+        encode_transaction(body, tx, strings)
+
+    out = bytearray([FORMAT_VERSION])
+    write_varint(out, len(header))
+    out += header
+    write_varint(out, len(strings.strings))
+    for value in strings.strings:
+        _write_str(out, value)
+    out += body
+    return bytes(out)
+
+
+def _check_version(buf, pos):
+    if pos >= len(buf):
+        raise CodecError("empty block payload")
+    version = buf[pos]
+    if version not in SUPPORTED_FORMAT_VERSIONS:
+        raise CodecError(f"unsupported block format version {version}")
+    return pos + 1
+
+
+def decode_header(buf, pos=0, end=None):
+    """Decode only the header fields of an encoded block, skipping its transactions."""
+    format_version = buf[pos] if pos < len(buf) else None
+    pos = _check_version(buf, pos)
+    header_length, pos = read_varint(buf, pos)
+    if end is not None and pos + header_length > end:
+        raise CodecError("truncated block header")
+    header = {}
+    header["index"], pos = read_varint(buf, pos)
+    header["timestamp"], pos = read_value(buf, pos)
+    header["previous_hash"], pos = read_value(buf, pos)
+    header["poh_hash"], pos = read_value(buf, pos)
+    header["nonce"], pos = read_varint(buf, pos)
+    header["hash"], pos = read_value(buf, pos)
+    if format_version >= 2:
+        block_version, pos = read_value(buf, pos)
+        merkle_root, pos = read_value(buf, pos)
+        if block_version is not None:
+            header["version"] = block_version
+        if merkle_root is not None:
+            header["merkle_root"] = merkle_root
+    return header
+
+
+def decode_transactions(buf, pos=0):
+    """Decode the transaction list of an encoded block without building its header."""
+    pos = _check_version(buf, pos)
+    header_length, pos = read_varint(buf, pos)
+    pos += header_length
+
+    string_count, pos = read_count(buf, pos, "string table")
+    strings = []
+    for _ in range(string_count):
+        value, pos = _read_str(buf, pos)
+        strings.append(value)
+
+    tx_count, pos = read_count(buf, pos, "transaction")
+    transactions = []
+    for _ in range(tx_count):
+        tx, pos = decode_transaction(buf, pos, strings)
+        transactions.append(tx)
+    return transactions
+
+
+def decode_block(buf, pos=0):
+    """Decode a full block dict from the binary format."""
+    block = decode_header(buf, pos)
+    block["transactions"] = decode_transactions(buf, pos)
+    return block
+
+
+def encode_chain(blocks):
+    """Encode a list of block dicts as a binary chain file (magic, version, length-prefixed blocks)."""
+    out = bytearray(CHAIN_FILE_MAGIC)
+    out.append(FORMAT_VERSION)
+    write_varint(out, len(blocks))
+    for block in blocks:
+        payload = encode_block(block)
+        write_varint(out, len(payload))
+        out += payload
+    return bytes(out)
+
+
+def decode_chain(data):
+    """Decode a binary chain file back into a list of block dicts."""
+    if data[:len(CHAIN_FILE_MAGIC)] != CHAIN_FILE_MAGIC:
+        raise CodecError("not an IFChain binary chain file")
+    pos = _check_version(data, len(CHAIN_FILE_MAGIC))
+    count, pos = read_count(data, pos, "block")
+    blocks = []
+    for _ in range(count):
+        length, pos = read_varint(data, pos)
+        blocks.append(decode_block(data[pos:pos + length]))
+        pos += length
+    return blocks
+
+
+def main(argv):
+    if len(argv) != 4 or argv[1] not in ("encode", "decode"):
+        print("Usage: python block_codec.py encode|decode <input> <output>")
+        return 1
+
+    command, source, target = argv[1:]
+    if command == "encode":
+        with open(source, "r") as f:
+            blocks = json.load(f)
+        with open(target, "wb") as f:
+            f.write(encode_chain(blocks))
+    else:
+        with open(source, "rb") as f:
+            blocks = decode_chain(f.read())
+        with open(target, "w") as f:
+            json.dump(blocks, f)
+
+    print(f"Converted {len(blocks)} blocks from {source} to {target}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
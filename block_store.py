@@ -0,0 +1,474 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+import block_codec
+
+
+class BlockLog:
+    """Append-only block log split into rolling segment files.
+
+    Every block is written as one framed record (length, crc32, payload) at the
+    end of the active segment, so persisting a new block costs O(block size)
+    instead of rewriting the whole chain. A small manifest lists the segments
+    and the height of the first block in each one, and a fixed-width index
+    maps every height to its segment and record offset. Segments and the index
+    are read through `mmap`, so any block can be fetched in O(1) without
+    loading the rest of the chain. On open, the tail of the active segment is
+    validated and a torn or corrupt record left behind by a crash is truncated
+    away.
+
+    Record payloads use the binary format from `block_codec`, whose header
+    can be decoded without touching the transactions. Records written before
+    the codec existed start with `{` and hold JSON (either the whole block
+    dict, or the header line, a newline and the transaction list); they are
+    still readable.
+    """
+
+    MANIFEST_FILE = "manifest.json"
+    INDEX_FILE = "index.bin"
+    SEGMENT_MAX_BYTES = 16 * 1024 * 1024
+    RECORD_HEADER = struct.Struct(">II")  # payload length, crc32 of payload
+    INDEX_ENTRY = struct.Struct(">IQI")  # segment number, record offset, payload length
+
+    def __init__(self, directory, segment_max_bytes=None, fsync=True):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes or self.SEGMENT_MAX_BYTES
+        self.fsync = fsync
+        self.segments = []  # [{"name", "first_height", "count"}] in height order
+        self.migrated_from = None
+        self._active = None  # file handle of the last segment, opened for append
+        self._index = None  # file handle of the index, opened for append
+        self._count = 0  # number of indexed blocks
+        self._maps = {}  # segment number (or "index") -> read-only mmap
+        self._lock = threading.RLock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_manifest()
+        self._open_index()
+        self._recover()
+
+    def __len__(self):
+        return self._count
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, self.MANIFEST_FILE)
+
+    def _index_path(self):
+        return os.path.join(self.directory, self.INDEX_FILE)
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, segment["name"])
+
+    @staticmethod
+    def _segment_number(segment):
+        return int(segment["name"][len("segment_"):-len(".log")])
+
+    def _load_manifest(self):
+        path = self._manifest_path()
+        if not os.path.exists(path):
+            self.segments = []
+            return
+
+        try:
+            with open(path, "r") as f:
+                manifest = json.load(f)
+        except json.JSONDecodeError:
+            print("ERROR: Corrupted block log manifest, rebuilding from segment files.")
+            manifest = {"segments": self._discover_segments()}
+
+        self.segments = [
+            {"name": s["name"], "first_height": s["first_height"], "count": s.get("count", 0)}
+            for s in manifest.get("segments", [])
+        ]
+        self.migrated_from = manifest.get("migrated_from")
+
+    def _discover_segments(self):
+        """Fallback used when the manifest is unreadable: list segment files in name order."""
+        names = sorted(n for n in os.listdir(self.directory) if n.startswith("segment_") and n.endswith(".log"))
+        return [{"name": name, "first_height": None, "count": 0} for name in names]
+
+    def _write_manifest(self):
+        manifest = {
+            "version": 1,
+            "segments": self.segments,
+            "height": len(self),
+        }
+        if self.migrated_from:
+            manifest["migrated_from"] = self.migrated_from
+
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=4)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self._manifest_path())
+
+    def _open_index(self):
+        path = self._index_path()
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        self._count = size // self.INDEX_ENTRY.size
+        if size % self.INDEX_ENTRY.size:
+            self._truncate_index(self._count)
+        self._index = open(path, "ab")
+
+    def _truncate_index(self, height):
+        self._close_map("index")
+        with open(self._index_path(), "ab") as f:
+            f.truncate(height * self.INDEX_ENTRY.size)
+        self._count = height
+
+    def _write_index_entry(self, segment, offset, length):
+        self._index.write(self.INDEX_ENTRY.pack(self._segment_number(segment), offset, length))
+        self._count += 1
+
+    def _scan_segment(self, segment, start=0, repair=False):
+        """Return (offset, length) of every intact record from `start` onward.
+
+        With `repair=True` anything after the last intact record (a torn write
+        or a checksum mismatch) is truncated from the file.
+        """
+        path = self._segment_path(segment)
+        records = []
+        if not os.path.exists(path):
+            return records
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read()
+
+        position = 0
+        header_size = self.RECORD_HEADER.size
+        while position + header_size <= len(data):
+            length, checksum = self.RECORD_HEADER.unpack_from(data, position)
+            payload = data[position + header_size:position + header_size + length]
+            if len(payload) != length or zlib.crc32(payload) != checksum:
+                break
+            records.append((start + position, length))
+            position += header_size + length
+
+        if repair and position != len(data):
+            print(f"WARNING: Truncating {len(data) - position} torn bytes from {segment['name']}")
+            self._close_map(self._segment_number(segment))
+            with open(path, "r+b") as f:
+                f.truncate(start + position)
+
+        return records
+
+    def _record_is_intact(self, segment, offset, length):
+        path = self._segment_path(segment)
+        with open(path, "rb") as f:
+            f.seek(offset)
+            header = f.read(self.RECORD_HEADER.size)
+            payload = f.read(length)
+        if len(header) != self.RECORD_HEADER.size or len(payload) != length:
+            return False
+        return self.RECORD_HEADER.unpack(header) == (length, zlib.crc32(payload))
+
+    def _rebuild_index(self, from_segment=0):
+        """Re-scan segments from `from_segment` onward and rewrite their index entries."""
+        segment = self.segments[from_segment]
+        self._truncate_index(segment["first_height"])
+        for i in range(from_segment, len(self.segments)):
+            segment = self.segments[i]
+            segment["first_height"] = self._count
+            records = self._scan_segment(segment, repair=i == len(self.segments) - 1)
+            for offset, length in records:
+                self._write_index_entry(segment, offset, length)
+            segment["count"] = len(records)
+        self._index.flush()
+
+    def _recover(self):
+        """Reconcile the index with the segments and drop a torn tail left by a crash."""
+        if not self.segments:
+            self._truncate_index(0)
+            return
+
+        height = 0
+        for i, segment in enumerate(self.segments[:-1]):
+            if segment["first_height"] is None:
+                segment["first_height"] = height
+                self._rebuild_index(i)
+                self._write_manifest()
+                return
+            segment["first_height"] = height
+            height += segment["count"]
+
+        # The index must cover every sealed segment and start the active one at offset 0
+        if self._count < height or (height and self._entry(height - 1)[0] != self._segment_number(self.segments[-2])):
+            self._rebuild_index(0)
+            self._write_manifest()
+            return
+
+        active = self.segments[-1]
+        active["first_height"] = height
+        indexed_end = 0
+        if self._count > height:
+            number, offset, length = self._entry(self._count - 1)
+            if number != self._segment_number(active) or not self._record_is_intact(active, offset, length):
+                self._rebuild_index(len(self.segments) - 1)
+                self._write_manifest()
+                return
+            indexed_end = offset + self.RECORD_HEADER.size + length
+
+        # Records written to the segment but not yet indexed are picked up, a torn one is cut off
+        for offset, length in self._scan_segment(active, start=indexed_end, repair=True):
+            self._write_index_entry(active, offset, length)
+        self._index.flush()
+        active["count"] = self._count - height
+        self._write_manifest()
+
+    def _open_active(self):
+        if self._active is None or self._active.closed:
+            self._active = open(self._segment_path(self.segments[-1]), "ab")
+        return self._active
+
+    def _roll_segment(self):
+        """Seal the active segment and start a new one at the current height."""
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+
+        number = self._segment_number(self.segments[-1]) + 1 if self.segments else 0
+        self.segments.append({"name": f"segment_{number:06d}.log", "first_height": len(self), "count": 0})
+        open(self._segment_path(self.segments[-1]), "ab").close()
+        self._write_manifest()
+
+    def append(self, block_dict):
+        """Append one block record and return its height."""
+        payload = block_codec.encode_block(block_dict)
+
+        with self._lock:
+            if not self.segments or (
+                self.segments[-1]["count"] and
+                os.path.getsize(self._segment_path(self.segments[-1])) + len(payload) > self.segment_max_bytes
+            ):
+                self._roll_segment()
+
+            f = self._open_active()
+            offset = f.tell()
+            f.write(self.RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+            # The index is written after the record, so a crash in between is repaired on open
+            self._write_index_entry(self.segments[-1], offset, len(payload))
+            self._index.flush()
+            self.segments[-1]["count"] += 1
+            return len(self) - 1
+
+    def truncate(self, height):
+        """Drop every block at `height` and above (used when a longer chain replaces ours)."""
+        with self._lock:
+            if height >= len(self):
+                return
+
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+
+            while len(self.segments) > 1 and self.segments[-1]["first_height"] >= height:
+                segment = self.segments.pop()
+                self._close_map(self._segment_number(segment))
+                os.remove(self._segment_path(segment))
+
+            segment = self.segments[-1]
+            keep = height - segment["first_height"]
+            if keep < segment["count"]:
+                _number, offset, _length = self._entry(height)
+                self._close_map(self._segment_number(segment))
+                with open(self._segment_path(segment), "r+b") as f:
+                    f.truncate(offset)
+            segment["count"] = keep
+
+            self._index.close()
+            self._truncate_index(height)
+            self._index = open(self._index_path(), "ab")
+            self._write_manifest()
+
+    def sync(self):
+        """Flush the active segment and index, and persist the manifest."""
+        with self._lock:
+            if self._active is not None and not self._active.closed:
+                self._active.flush()
+                if self.fsync:
+                    os.fsync(self._active.fileno())
+            self._index.flush()
+            self._write_manifest()
+
+    def close(self):
+        self.sync()
+        with self._lock:
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+            self._index.close()
+            for key in list(self._maps):
+                self._close_map(key)
+
+    def _close_map(self, key):
+        mapped = self._maps.pop(key, None)
+        if mapped is not None:
+            mapped.close()
+
+    def _mapped(self, key, path, min_size):
+        """Return a read-only mmap of `path`, remapping it if the file has grown past the old mapping."""
+        mapped = self._maps.get(key)
+        if mapped is None or len(mapped) < min_size:
+            self._close_map(key)
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[key] = mapped
+        return mapped
+
+    def _entry(self, height):
+        end = (height + 1) * self.INDEX_ENTRY.size
+        if self._index is not None:
+            self._index.flush()
+        index_map = self._mapped("index", self._index_path(), end)
+        return self.INDEX_ENTRY.unpack_from(index_map, height * self.INDEX_ENTRY.size)
+
+    def _payload_bounds(self, height):
+        if not 0 <= height < len(self):
+            raise IndexError(f"block height {height} out of range")
+        number, offset, length = self._entry(height)
+        start = offset + self.RECORD_HEADER.size
+        segment_map = self._mapped(number, os.path.join(self.directory, f"segment_{number:06d}.log"), start + length)
+        return segment_map, start, start + length
+
+    def read_payload(self, height):
+        """Return the raw record payload of the block at `height`."""
+        with self._lock:
+            segment_map, start, end = self._payload_bounds(height)
+            return segment_map[start:end]
+
+    @staticmethod
+    def _is_json_record(segment_map, start):
+        return segment_map[start] == ord("{")
+
+    def read_header(self, height):
+        """Decode only the header fields of the block at `height` (no transactions)."""
+        with self._lock:
+            segment_map, start, end = self._payload_bounds(height)
+            if not self._is_json_record(segment_map, start):
+                return block_codec.decode_header(segment_map, start, end)
+
+            split = segment_map.find(b"\n", start, end)
+            if split == -1:
+                header = json.loads(segment_map[start:end])
+                header.pop("transactions", None)
+                return header
+            return json.loads(segment_map[start:split])
+
+    def read_transactions(self, height):
+        """Decode the transaction list of the block at `height`."""
+        with self._lock:
+            segment_map, start, end = self._payload_bounds(height)
+            payload = segment_map[start:end]
+
+        if not self._is_json_record(payload, 0):
+            return block_codec.decode_transactions(payload)
+
+        split = payload.find(b"\n")
+        if split == -1:
+            return json.loads(payload).get("transactions", [])
+        return json.loads(payload[split + 1:])
+
+    def read(self, height):
+        """Decode the full block dict at `height`."""
+        block = self.read_header(height)
+        block["transactions"] = self.read_transactions(height)
+        return block
+
+    def read_all(self):
+        """Yield every stored block as a dict, in height order."""
+        for height in range(len(self)):
+            yield self.read(height)
+
+    def migrate_from_json(self, json_path):
+        """One-time import of a legacy blockchain.json array into an empty log."""
+        if len(self):
+            return 0
+
+        with open(json_path, "r") as f:
+            chain_data = json.load(f)
+
+        for block in chain_data:
+            self.append(block)
+
+        self.migrated_from = os.path.basename(json_path)
+        self.sync()
+        return len(chain_data)
+
+
+class LazyChain:
+    """List-like view over a BlockLog that only materializes blocks when they are touched.
+
+    Indexing decodes just the block header through `block_factory(header,
+    transactions_loader)`; the transaction list is decoded by the loader the
+    first time it is accessed. Recently used blocks are kept in a small LRU
+    cache so hot blocks such as the tip are not decoded again.
+    """
+
+    CACHE_SIZE = 256
+
+    def __init__(self, block_log, block_factory, cache_size=None):
+        self.block_log = block_log
+        self.block_factory = block_factory
+        self.cache_size = cache_size or self.CACHE_SIZE
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.block_log)
+
+    def __bool__(self):
+        return len(self.block_log) > 0
+
+    def __iter__(self):
+        for height in range(len(self)):
+            yield self[height]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[height] for height in range(*key.indices(len(self)))]
+
+        height = key + len(self) if key < 0 else key
+        if not 0 <= height < len(self):
+            raise IndexError("chain index out of range")
+
+        with self._lock:
+            block = self._cache.get(height)
+            if block is not None:
+                self._cache.move_to_end(height)
+                return block
+
+            header = self.block_log.read_header(height)
+            block = self.block_factory(header, lambda: self.block_log.read_transactions(height))
+            self._remember(height, block)
+            return block
+
+    def _remember(self, height, block):
+        self._cache[height] = block
+        self._cache.move_to_end(height)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def append(self, block):
+        """Persist a block at the tip and keep the in-memory object cached."""
+        with self._lock:
+            height = self.block_log.append(block.to_dict(format_timestamp=False))
+            self._remember(height, block)
+
+    def truncate(self, height):
+        """Drop every block at `height` and above."""
+        with self._lock:
+            self.block_log.truncate(height)
+            for cached_height in [h for h in self._cache if h >= height]:
+                del self._cache[cached_height]
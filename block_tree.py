@@ -0,0 +1,67 @@
+class BlockTree:
+    """Cumulative work of the main chain plus the competing branches beside it.
+
+    `main_work[height]` is the total work of the main chain up to and including
+    that height. Blocks that do not extend the tip are kept in `side` with
+    their own cumulative work; following `previous_hash` from a side block
+    leads back to the main chain at the fork point. Blocks abandoned by a
+    reorg are added back as a side branch, so switching back costs no
+    download. Side blocks more than MAX_DEPTH below the tip can no longer win
+    and are pruned, and at most MAX_SIDE_BLOCKS are kept.
+    """
+
+    MAX_DEPTH = 100
+    MAX_SIDE_BLOCKS = 1000
+
+    def __init__(self):
+        self.main_work = []
+        self.side = {}  # Block hash -> (block, cumulative work)
+
+    def __contains__(self, block_hash):
+        return block_hash in self.side
+
+    def __len__(self):
+        return len(self.side)
+
+    @property
+    def tip_work(self):
+        return self.main_work[-1] if self.main_work else 0
+
+    def push_main(self, work):
+        """Record the work of a block appended to the main chain."""
+        self.main_work.append(self.tip_work + work)
+
+    def pop_main(self):
+        self.main_work.pop()
+
+    def add_side(self, block, cumulative_work):
+        self.side[block.hash] = (block, cumulative_work)
+
+    def get_side(self, block_hash):
+        """(block, cumulative work) of a side block, or None."""
+        return self.side.get(block_hash)
+
+    def branch(self, tip_hash):
+        """Side blocks from the fork point up to `tip_hash`, in height order."""
+        blocks = []
+        entry = self.side.get(tip_hash)
+        while entry is not None:
+            block = entry[0]
+            blocks.append(block)
+            entry = self.side.get(block.previous_hash)
+        blocks.reverse()
+        return blocks
+
+    def discard(self, blocks):
+        for block in blocks:
+            self.side.pop(block.hash, None)
+
+    def prune(self, tip_height):
+        """Drop side blocks too deep to matter, then the lowest ones beyond MAX_SIDE_BLOCKS."""
+        floor = tip_height - self.MAX_DEPTH
+        for block_hash in [h for h, (block, _) in self.side.items() if block.index <= floor]:
+            del self.side[block_hash]
+        if len(self.side) > self.MAX_SIDE_BLOCKS:
+            by_height = sorted(self.side, key=lambda h: self.side[h][0].index)
+            for block_hash in by_height[:len(self.side) - self.MAX_SIDE_BLOCKS]:
+                del self.side[block_hash]
@@ -1,5 +1,12 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 import time
+import base64
+import bisect
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from itertools import islice
+import calendar
+import struct
 import hashlib
 import json
 import os
@@ -8,11 +15,151 @@ import threading
 from datetime import datetime
 import requests
 from ecdsa import SECP256k1, SigningKey
+import block_codec
+import compact_block
+import merkle
+from block_store import BlockLog, LazyChain
+from mempool_journal import MempoolJournal
+from ledger import AccountLedger, PendingOverlay
+from tx_index import TransactionIndex
+from address_index import AddressIndex
+from time_index import BlockTimeIndex
+from tx_columns import TransactionColumns
+from query_planner import TransactionQueryPlanner
+from chain_stats import ChainStats
+from response_cache import ResponseCache
+from broadcaster import PeerBroadcaster
+from block_tree import BlockTree
+from orphan_pool import OrphanPool
+from gossip import InventoryQueue, SeenCache
+from pow_miner import ProofOfWorkMiner
 
 app = Flask(__name__)
 
 ifchain = None
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NDJSON_MIMETYPE = "application/x-ndjson"
+NODE_URL_HEADER = "X-Node-Url"  # Sent with gossip so the receiver knows whom to ask for missing parents and whom not to relay back to
+
+def encode_cursor(*parts):
+    """Opaque pagination cursor for a position in a listing; clients pass it back unchanged."""
+    return base64.urlsafe_b64encode(":".join(str(part) for part in parts).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, size):
+    """Inverse of `encode_cursor` (raises ValueError if the cursor is malformed)."""
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    parts = tuple(int(part) for part in raw.split(":"))
+    if len(parts) != size:
+        raise ValueError("malformed cursor")
+    return parts
+
+def page_args(cursor_size=2, default_limit=DEFAULT_PAGE_SIZE):
+    """Parses the `limit` and `cursor` query args of a paginated listing (raises ValueError if malformed).
+
+    Without `limit` the page size is `default_limit` (None means no limit). Transaction
+    listings use (height, position) cursors, block and mempool listings a single number.
+    """
+    limit = request.args.get('limit')
+    if limit is None:
+        limit = default_limit
+    else:
+        limit = int(limit)
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        limit = min(limit, MAX_PAGE_SIZE)
+    cursor = request.args.get('cursor')
+    return limit, decode_cursor(cursor, cursor_size) if cursor else None
+
+def wants_ndjson():
+    """True when the client asked for a streamed NDJSON response (`format=ndjson` or the Accept header)."""
+    return request.args.get('format') == 'ndjson' or NDJSON_MIMETYPE in request.headers.get('Accept', '')
+
+def ndjson_response(items, headers=None):
+    """Streams `items` as one JSON document per line, serializing them one at a time."""
+    def generate():
+        for item in items:
+            yield app.json.dumps(item) + "\n"
+    return Response(generate(), mimetype=NDJSON_MIMETYPE, headers=headers)
+
+def transaction_listing(locations_after, build_item, items_key, count_key, extra=None, total=None):
+    """Pages, or streams as NDJSON, transactions given by their (height, position) in chain order.
+
+    `locations_after(after)` returns an iterator over the matching locations past the
+    cursor; only the requested page is materialized. A JSON page holds up to `limit`
+    (default DEFAULT_PAGE_SIZE) items, their number as `count`, the number of all matches
+    as `count_key` and a `next_cursor`; NDJSON streams every remaining match unless a
+    `limit` is given. `total()` counts the matches, by default by walking `locations_after(None)`.
+    """
+    ndjson = wants_ndjson()
+    try:
+        limit, after = page_args(default_limit=None if ndjson else DEFAULT_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+
+    locations = locations_after(after)
+    if ndjson:
+        return ndjson_response(build_item(height, position) for height, position in islice(locations, limit))
+
+    page = list(islice(locations, limit + 1))
+    more = len(page) > limit
+    page = page[:limit]
+    body = dict(extra or {})
+    body[count_key] = total() if total is not None else sum(1 for _ in locations_after(None))
+    body["count"] = len(page)
+    body[items_key] = [build_item(height, position) for height, position in page]
+    body["next_cursor"] = encode_cursor(*page[-1]) if more else None
+    return jsonify(body), 200
+
+response_cache = ResponseCache()
+
+def cached_response(state_version):
+    """Serves a read endpoint from `response_cache`, with ETag / If-None-Match support.
+
+    `state_version()` returns whatever the response depends on; it is part of the cache
+    key and of the ETag, so a client polling with an unchanged ETag gets a 304 without the
+    view running. Only 200 responses are cached; streamed ones just get the ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = state_version()
+            key = (request.path, tuple(sorted(request.args.items(multi=True))), wants_ndjson(), version)
+            etag = response_cache.etag(key)
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            cached = response_cache.get(key)
+            if cached is not None:
+                body, status, mimetype = cached
+                response = Response(body, status=status, mimetype=mimetype)
+            else:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                # Skip caching if the state moved while the view ran, the body may be newer than `version`
+                if not response.is_streamed and state_version() == version:
+                    response_cache.put(key, response.get_data(), response.status_code, response.mimetype)
+            response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
+
+def tip_version():
+    return ifchain.tip_hash()
+
+def located_transaction(height, position):
+    """The listing item shared by the search endpoints: served transaction, block index and block time."""
+    block = ifchain.chain[height]
+    return {
+        "transaction": ifchain.serve_transaction(block.transactions[position], block.index),
+        "block_index": block.index,
+        "timestamp": datetime.utcfromtimestamp(block.timestamp).strftime('%Y-%m-%d %H:%M:%S')
+    }
+
 def get_ifchain_instance():
     """Ensures a single instance of the blockchain is used."""
     global ifchain
@@ -36,37 +183,240 @@ class PoH:
     def get_history(self):
         return self.history
 
+def epoch_seconds(timestamp):
+    """Whole UTC epoch seconds of a block timestamp given as a number or a '%Y-%m-%d %H:%M:%S' string."""
+    if isinstance(timestamp, (int, float)):
+        return int(timestamp)
+    return calendar.timegm(datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S').timetuple())
+
+def normalize_timestamp(timestamp):
+    """Block timestamps are epoch seconds in memory; blocks persisted by older nodes carry the UTC string form."""
+    if isinstance(timestamp, (int, float)):
+        return timestamp
+    return epoch_seconds(timestamp)
+
+def date_to_epoch(date):
+    """Epoch seconds of UTC midnight for a 'YYYY-MM-DD' query date (raises ValueError if malformed)."""
+    return calendar.timegm(datetime.strptime(date, "%Y-%m-%d").timetuple())
+
+def hash_bytes(value):
+    """32 raw bytes of a hex hash; non-hash placeholders such as the genesis "0" are hashed instead."""
+    if len(value) == 64:
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            pass
+    return hashlib.sha256(value.encode()).digest()
+
 class Block:
-    def __init__(self, index, timestamp, transactions, previous_hash, poh_hash, nonce=0, hash=None):
+    NONCE_MARKER = "__IFCHAIN_NONCE__"
+    LEGACY_VERSION = 1  # Hash over the JSON serialization of the whole block
+    HEADER_VERSION = 2  # Hash over the fixed binary header with a transactions Merkle root
+    HEADER_PREFIX = struct.Struct(">BQq32s32s32s")  # version, index, timestamp, previous_hash, poh_hash, merkle_root
+    HEADER_NONCE = struct.Struct(">Q")
+    HASHED_FIELDS = frozenset({"index", "timestamp", "_transactions", "previous_hash", "poh_hash", "nonce", "version"})
+
+    def __setattr__(self, name, value):
+        # Assigning any hashed field drops the memoized hash. Mutating the transaction dicts in place is not seen.
+        if name in self.HASHED_FIELDS:
+            self.__dict__.pop("_computed_hash", None)
+        object.__setattr__(self, name, value)
+
+    def __init__(self, index, timestamp, transactions, previous_hash, poh_hash, nonce=0, hash=None,
+                 version=LEGACY_VERSION, merkle_root=None):
+        # `merkle_root` is accepted from serialized blocks but always recomputed from the transactions
         self.index = index
-        self.timestamp = timestamp
+        self.timestamp = normalize_timestamp(timestamp)
+        self._transactions_loader = None
         self.transactions = transactions
         self.previous_hash = previous_hash
         self.poh_hash = poh_hash
         self.nonce = nonce
+        self.version = version
         self.hash = hash if hash else self.compute_hash()
-        
-    def to_dict(self, include_hash=True):
-        """Convert block data to a dictionary, optionally including the hash."""
+
+    @property
+    def transactions(self):
+        """Transaction list, decoded from the block log on first access for lazily loaded blocks."""
+        if self._transactions_loader is not None:
+            self._transactions = self._transactions_loader()
+            self._transactions_loader = None
+        return self._transactions
+
+    @transactions.setter
+    def transactions(self, transactions):
+        self._transactions = transactions
+        self._transactions_loader = None
+        self._merkle_levels = None
+
+    @classmethod
+    def from_header(cls, header, transactions_loader):
+        """Build a Block from its header fields, deferring transaction decoding to `transactions_loader`."""
+        block = cls(
+            index=header["index"],
+            timestamp=header["timestamp"],
+            transactions=None,
+            previous_hash=header["previous_hash"],
+            poh_hash=header["poh_hash"],
+            nonce=header["nonce"],
+            hash=header["hash"],
+            version=header.get("version", cls.LEGACY_VERSION)
+        )
+        block._transactions_loader = transactions_loader
+        return block
+
+    @classmethod
+    def from_dict(cls, block):
+        """Rebuild a Block from the dictionary produced by `to_dict`.
+
+        Blocks come from peers, so header fields of the wrong type or range raise ValueError
+        here rather than failing later inside hashing or validation.
+        """
+        cls.check_header_types(block)
+        return cls(
+            index=block["index"],
+            timestamp=block["timestamp"],
+            transactions=block["transactions"],
+            previous_hash=block["previous_hash"],
+            poh_hash=block["poh_hash"],
+            nonce=block["nonce"],
+            hash=block["hash"],
+            version=block.get("version", cls.LEGACY_VERSION)
+        )
+
+    @classmethod
+    def check_header_types(cls, block):
+        """Raises ValueError unless the header fields of a block dict have the types hashing and the codec expect."""
+        for field in ("index", "nonce"):
+            value = block[field]
+            if type(value) is not int or not 0 <= value < 1 << 64:
+                raise ValueError(f"{field} must be an integer in [0, 2**64)")
+        version = block.get("version", cls.LEGACY_VERSION)
+        if type(version) is not int or version not in (cls.LEGACY_VERSION, cls.HEADER_VERSION):
+            raise ValueError(f"unsupported block version {version!r}")
+        for field in ("previous_hash", "poh_hash", "hash"):
+            if not isinstance(block[field], str):
+                raise ValueError(f"{field} must be a string")
+        timestamp = block["timestamp"]
+        if isinstance(timestamp, bool) or not isinstance(timestamp, (int, float, str)):
+            raise ValueError("timestamp must be a number or a date string")
+        if not isinstance(timestamp, str) and not -(1 << 63) <= timestamp < 1 << 63:
+            raise ValueError("timestamp out of range")
+        transactions = block["transactions"]
+        if not isinstance(transactions, list) or not all(isinstance(tx, dict) for tx in transactions):
+            raise ValueError("transactions must be a list of objects")
+
+    def to_dict(self, include_hash=True, format_timestamp=True):
+        """Convert block data to a dictionary, optionally including the hash.
+
+        The timestamp is the UTC '%Y-%m-%d %H:%M:%S' string that legacy block hashes cover,
+        or the raw epoch value with `format_timestamp=False` (used for storage).
+        """
         block_dict = {
             "index": self.index,
             "timestamp": (
                 datetime.utcfromtimestamp(int(self.timestamp)).strftime('%Y-%m-%d %H:%M:%S')
-                if isinstance(self.timestamp, (int, float)) else self.timestamp
+                if format_timestamp else self.timestamp
             ),
             "transactions": self.transactions,
             "previous_hash": self.previous_hash,
             "poh_hash": self.poh_hash,
             "nonce": self.nonce
         }
+        if self.version != self.LEGACY_VERSION:
+            # Legacy blocks omit these so their JSON hash input is unchanged
+            block_dict["version"] = self.version
+            block_dict["merkle_root"] = self.merkle_root().hex()
         if include_hash:
             block_dict["hash"] = self.hash
         return block_dict
 
+    def merkle_levels(self):
+        """Merkle tree over the block's transactions, built once and cached (reassigning `transactions` resets it)."""
+        if self._merkle_levels is None:
+            self._merkle_levels = merkle.merkle_levels([merkle.transaction_leaf(tx) for tx in self.transactions])
+        return self._merkle_levels
+
+    def merkle_root(self):
+        """Merkle root over the block's transactions."""
+        return self.merkle_levels()[-1][0]
+
+    def merkle_proof(self, position):
+        """Sibling hashes proving the transaction at `position` against `merkle_root()`."""
+        return merkle.merkle_branch(self.merkle_levels(), position)
+
+    def header(self):
+        """Header fields without the transactions, with the Merkle root that commits to them."""
+        header = self.to_dict()
+        del header["transactions"]
+        header["version"] = self.version
+        header["merkle_root"] = self.merkle_root().hex()
+        return header
+
+    def has_duplicate_transactions(self):
+        """True if two transactions share a hash, which v2 blocks must not (legacy blocks are exempt)."""
+        if self.version < self.HEADER_VERSION:
+            return False
+        hashes = [tx.get("hash") for tx in self.transactions]
+        return len(set(hashes)) != len(hashes)
+
+    @classmethod
+    def header_hash(cls, header):
+        """Hash of a v2 block from its header fields alone; None for legacy blocks, whose hash covers the transactions."""
+        version = header.get("version", cls.LEGACY_VERSION)
+        if version < cls.HEADER_VERSION:
+            return None
+        prefix = cls.HEADER_PREFIX.pack(
+            version,
+            header["index"],
+            epoch_seconds(header["timestamp"]),
+            hash_bytes(header["previous_hash"]),
+            hash_bytes(header["poh_hash"]),
+            bytes.fromhex(header["merkle_root"])
+        )
+        return hashlib.sha256(prefix + cls.HEADER_NONCE.pack(header["nonce"])).hexdigest()
+
+    def header_prefix(self):
+        """Serialized header without the nonce: the part of the PoW input that is the same for every attempt."""
+        return self.HEADER_PREFIX.pack(
+            self.version,
+            self.index,
+            epoch_seconds(self.timestamp),
+            hash_bytes(self.previous_hash),
+            hash_bytes(self.poh_hash),
+            self.merkle_root()
+        )
+
     def compute_hash(self):
-        """Compute SHA-256 hash of block data, excluding the hash field itself."""
-        block_string = json.dumps(self.to_dict(include_hash=False), sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+        """Compute SHA-256 hash of block data, excluding the hash field itself (memoized until a field changes)."""
+        computed_hash = self.__dict__.get("_computed_hash")
+        if computed_hash is not None:
+            return computed_hash
+
+        if self.version >= self.HEADER_VERSION:
+            computed_hash = hashlib.sha256(self.header_prefix() + self.HEADER_NONCE.pack(self.nonce)).hexdigest()
+        else:
+            # Legacy path: the whole block, transactions included, serialized as JSON
+            block_string = json.dumps(self.to_dict(include_hash=False), sort_keys=True)
+            computed_hash = hashlib.sha256(block_string.encode()).hexdigest()
+        self.__dict__["_computed_hash"] = computed_hash
+        return computed_hash
+
+    def pow_template(self):
+        """Split the hashed input around the nonce for the miner.
+
+        Returns (prefix, suffix, nonce_encoding) such that compute_hash() is
+        sha256(prefix + encoded nonce + suffix) for any nonce.
+        """
+        if self.version >= self.HEADER_VERSION:
+            return self.header_prefix(), b"", "u64"
+
+        block_dict = self.to_dict(include_hash=False)
+        block_dict["nonce"] = self.NONCE_MARKER
+        block_string = json.dumps(block_dict, sort_keys=True)
+        # "nonce" sorts right after "index", so the first occurrence is the nonce value itself
+        prefix, _, suffix = block_string.partition(json.dumps(self.NONCE_MARKER))
+        return prefix.encode(), suffix.encode(), "decimal"
       
  
 class IFChain:
@@ -74,14 +424,33 @@ class IFChain:
     transaction_tax_rate = 0.03
     GAS_FEE_PER_TRANSACTION = 0.001
     GAS_FEE_PER_CONTRACT_EXECUTION = 0.002
+    LEDGER_CHECKPOINT_INTERVAL = 100  # Blocks between account ledger snapshots
+    CHAIN_PAGE_SIZE = 500  # Blocks fetched per request when syncing from a peer without /headers
+    MAX_HEADERS = 2000  # Headers served per /headers request
+    MAX_BLOCK_RANGE = 500  # Blocks served per /blocks request
+    SYNC_BLOCK_RANGE = 100  # Blocks per range request during a headers-first sync
+    SYNC_WORKERS = 4  # Concurrent peer requests during sync
+    MINER_WORKERS = int(os.getenv("IFCHAIN_MINER_WORKERS", os.cpu_count() or 1))  # PoW worker processes
+    BROADCAST_WORKERS = int(os.getenv("IFCHAIN_BROADCAST_WORKERS", 8))  # Threads delivering to peers
+    MAX_INVENTORY = 1000  # Hashes accepted per /inv announcement
+    INVENTORY_REQUEST_TTL = 30  # Seconds before a body already asked for may be asked for again
     
     def __init__(self, port):
         self.port = port
         self.chain_id = "1985"
         self.CONTRACT_STATE_FILE = "contract_states.json"
-        self.BLOCKCHAIN_FILE = "blockchain.json"
-        self.PENDING_TRANSACTIONS_FILE = "pending_transactions.json"
+        self.BLOCKCHAIN_FILE = "blockchain.json"  # Legacy full-chain JSON, only read for migration
+        self.BLOCK_LOG_DIR = "blockchain_data"
+        self.LEDGER_SNAPSHOT_FILE = os.path.join(self.BLOCK_LOG_DIR, "ledger_snapshot.json")
+        self.ADDRESS_INDEX_FILE = os.path.join(self.BLOCK_LOG_DIR, "address_index.json")
+        self.TX_COLUMNS_FILE = os.path.join(self.BLOCK_LOG_DIR, "tx_columns.npz")
+        self.CHAIN_STATS_FILE = os.path.join(self.BLOCK_LOG_DIR, "chain_stats.json")
+        self.PENDING_TRANSACTIONS_FILE = "pending_transactions.json"  # Legacy snapshot, only read for migration
+        self.MEMPOOL_JOURNAL_FILE = "pending_transactions.journal"
         self.unconfirmed_transactions = []
+        self.unconfirmed_seqs = []  # Journal sequence number of each pending transaction
+        self.pending_overlay = PendingOverlay()  # Balance deltas of the pending transactions
+        self.mempool_journal = MempoolJournal(self.MEMPOOL_JOURNAL_FILE)
         self.chain = []
         self.peers = set()
         self.poh = PoH()
@@ -92,64 +461,293 @@ class IFChain:
         self.applied_inflation_years = set()
         self.minted_tokens = {}
         self.contracts = {}
+        self.contracts_version = 0  # Bumped whenever the contract state is saved
         self.wallet_balances = {}
+        self.wallet_balances_version = 0  # Bumped whenever the saved wallet balances are written
+        self.ledger = AccountLedger()  # Confirmed balances, maintained block by block
+        self.block_heights = {}  # Block hash -> height; height -> block is the chain itself
+        self.block_tree = BlockTree()  # Cumulative work of the main chain and competing side branches
+        self.orphans = OrphanPool()  # Blocks waiting for a parent we have not received yet
+        self.chain_lock = threading.RLock()  # Serializes tip changes from peers, sync and the miner
+        self.address_index = AddressIndex()  # Address -> confirmed transactions touching it
+        self.block_times = BlockTimeIndex()  # Block timestamps in time order for date ranges
+        self.tx_columns = TransactionColumns()  # Confirmed transactions as NumPy columns for filters and aggregates
+        self.stats = ChainStats()  # Running chain totals for the overview endpoints
+        self.miner = ProofOfWorkMiner(workers=self.MINER_WORKERS)
+        self.miner.start()  # Fork the PoW workers before the node starts any threads
+        self.broadcaster = PeerBroadcaster(workers=self.BROADCAST_WORKERS)  # Pooled, non-blocking peer delivery
+        self.seen_transactions = SeenCache()  # Transaction hashes already handled, so gossip fetches each body once
+        self.seen_blocks = SeenCache()
+        self.requested_inventory = SeenCache(ttl=self.INVENTORY_REQUEST_TTL)  # (kind, hash) bodies asked for and in flight
+        self.tx_announcements = InventoryQueue(self.announce_transactions)  # Batches transaction hashes per peer
+        self.last_mining_result = None
         self.gas_fee = 0.005
 
         self.load_wallet_balances()
         self.load_unconfirmed_transactions()
         self.load_contract_state()
         self.load_peers()
-        
+        self.block_log = BlockLog(self.BLOCK_LOG_DIR)
+        self.chain = LazyChain(self.block_log, Block.from_header)
+        self.tx_index = TransactionIndex(self.BLOCK_LOG_DIR)  # Confirmed tx hash -> (height, position)
+
+        # ✅ One-time migration of the legacy blockchain.json into the block log
+        if len(self.block_log) == 0 and os.path.exists(self.BLOCKCHAIN_FILE) and os.stat(self.BLOCKCHAIN_FILE).st_size > 0:
+            self.migrate_blockchain_file()
+
         # ✅ Prevent Genesis Block Overwriting
-        if not os.path.exists(self.BLOCKCHAIN_FILE) or os.stat(self.BLOCKCHAIN_FILE).st_size == 0:
-            print("DEBUG: No blockchain file found, creating genesis block.")
+        if len(self.block_log) == 0:
+            print("DEBUG: Block log is empty, creating genesis block.")
             self.create_genesis_block()
-            self.save_blockchain_state()  # Save the new blockchain file
         else:
-            print("DEBUG: Blockchain file exists, loading from storage.")
+            print("DEBUG: Block log exists, loading from storage.")
             self.load_blockchain_state()
 
+        self.load_block_index()
+        self.load_tx_index()
+        self.load_ledger()
+        self.load_address_index()
+        self.load_tx_columns()
+        self.load_chain_stats()
+
         self.sync_chain()
      
     def sync_chain(self):
-        """Fetches the longest blockchain from peers and updates local chain if needed."""
-        longest_chain = None
-        max_length = len(self.chain)
+        """Fetches the longest blockchain from peers and updates local chain if needed.
 
-        print(f"DEBUG: Syncing with peers {self.peers}")
+        Headers first: every peer is asked for its tip, the common ancestor with the best
+        chain is found by probing single headers, the missing headers are downloaded and
+        checked, and only then are the missing blocks fetched, SYNC_BLOCK_RANGE at a time
+        and in parallel from every peer on that tip, each block checked against its header
+        as it arrives. Peers without /headers are synced from paged /chain instead.
+        """
+        peers = list(self.peers)
+        print(f"DEBUG: Syncing with peers {peers}")
+        if not peers:
+            print("DEBUG: No valid longer chain found. Sync skipped.")
+            return {"error": "No longer chain found or sync failed."}, 400
 
-        for peer in self.peers:
-            try:
-                response = requests.get(f"{peer}/chain", timeout=3)  # Ensure we get a response quickly
-                if response.status_code == 200:
-                    peer_chain = response.json().get("chain", [])
-                    peer_chain_id = response.json().get("chain_id", "")  # Get peer's chain ID
+        with ThreadPoolExecutor(max_workers=min(self.SYNC_WORKERS, len(peers))) as pool:
+            tips = dict(zip(peers, pool.map(self.probe_peer_tip, peers)))
 
-                    # Validate Chain ID to ensure you are connecting to the correct blockchain
-                    if peer_chain_id != self.chain_id:
-                        print(f"ERROR: Peer {peer} has a different Chain ID. Sync aborted.")
-                        continue
+        best_peer = None
+        max_length = len(self.chain)
+        for peer, tip in tips.items():
+            if tip is None:
+                continue
 
-                    peer_length = len(peer_chain)
-                    print(f"DEBUG: Peer {peer} has chain length {peer_length}")
+            # Validate Chain ID to ensure you are connecting to the correct blockchain
+            if tip["chain_id"] != self.chain_id:
+                print(f"ERROR: Peer {peer} has a different Chain ID. Sync aborted.")
+                continue
 
-                    # If the peer's chain is longer, update our local copy
-                    if peer_length > max_length:
-                        max_length = peer_length
-                        longest_chain = peer_chain
-            except requests.exceptions.RequestException as e:
-                print(f"ERROR: Failed to connect to {peer} - {e}")
+            print(f"DEBUG: Peer {peer} has chain length {tip['length']}")
+            if tip["length"] > max_length:
+                max_length = tip["length"]
+                best_peer = peer
 
-        if longest_chain:
-            # Convert JSON blocks to Block objects to update local chain
-            self.chain = [Block(**block) for block in longest_chain]
-            self.save_blockchain_state()
-            print(f"DEBUG: Synced to a longer chain of length {max_length}")
-            return {"message": "Blockchain synchronized successfully."}, 200
+        if best_peer:
+            try:
+                if tips[best_peer]["headers"]:
+                    sources = [peer for peer, tip in tips.items() if tip is not None and tip["headers"] and
+                               tip["chain_id"] == self.chain_id and tip["tip_hash"] == tips[best_peer]["tip_hash"]]
+                    suffix, fork_height = self.download_missing_blocks(best_peer, sources, max_length)
+                else:
+                    suffix, fork_height = self.download_chain_suffix(best_peer, max_length)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"ERROR: Failed to download chain from {best_peer} - {e}")
+                suffix, fork_height = None, 0
+
+            if suffix and fork_height + len(suffix) > len(self.chain):
+                self.replace_chain(suffix, start_height=fork_height)
+                print(f"DEBUG: Synced to a longer chain of length {len(self.chain)} (from height {fork_height})")
+                return {"message": "Blockchain synchronized successfully."}, 200
 
         print("DEBUG: No valid longer chain found. Sync skipped.")
         return {"error": "No longer chain found or sync failed."}, 400
 
+    def fetch_headers(self, peer, from_height, count):
+        """GET a peer's /headers; returns the JSON body, or None if the peer does not serve headers."""
+        response = self.broadcaster.session(peer).get(f"{peer}/headers", params={"from": from_height, "count": count},
+                                                      timeout=3)
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+    def probe_peer_tip(self, peer):
+        """A peer's chain_id, length and tip hash, and whether it serves /headers; None if it is unreachable."""
+        try:
+            body = self.fetch_headers(peer, 0, 0)
+            if body is not None:
+                return {"chain_id": body.get("chain_id", ""), "length": body["length"],
+                        "tip_hash": body.get("tip_hash"), "headers": True}
+
+            page = self.fetch_chain_page(peer, 0, 1)
+            if page is not None:
+                return {"chain_id": page.get("chain_id", ""), "length": page.get("length", len(page.get("chain", []))),
+                        "tip_hash": None, "headers": False}
+        except requests.exceptions.RequestException as e:
+            print(f"ERROR: Failed to connect to {peer} - {e}")
+        return None
+
+    def find_common_ancestor(self, peer, peer_length):
+        """Height of the last block we share with `peer` (-1 if not even the genesis block matches).
+
+        Steps back from our tip in growing strides until a header matches, then bisects the
+        gap, so a peer that simply extends our chain costs one request.
+        """
+        def shared(height):
+            body = self.fetch_headers(peer, height, 1)
+            if not body or not body["headers"]:
+                raise ValueError(f"peer {peer} has no header at height {height}")
+            return body["headers"][0]["hash"] == self.chain[height].hash
+
+        top = min(len(self.chain), peer_length) - 1
+        good, bad = -1, top + 1
+        height, stride = top, 1
+        while height >= 0:
+            if shared(height):
+                good = height
+                break
+            bad = height
+            if height == 0:
+                break
+            height = max(0, height - stride)
+            stride *= 2
+
+        while bad - good > 1:
+            middle = (good + bad) // 2
+            if shared(middle):
+                good = middle
+            else:
+                bad = middle
+        return good
+
+    def validate_headers(self, headers, previous_hash, start_height):
+        """Checks a downloaded header chain: heights, hash links, proof of work and, for v2 blocks, the header hash."""
+        for offset, header in enumerate(headers):
+            if header["index"] != start_height + offset:
+                return False
+            if header["previous_hash"] != previous_hash:
+                print(f"ERROR: Invalid chain link at index {header['index']}")
+                return False
+            if header["index"] > 0 and not header["hash"].startswith("0" * IFChain.difficulty):
+                print(f"ERROR: Invalid proof of work at index {header['index']}")
+                return False
+            computed_hash = Block.header_hash(header)
+            if computed_hash is not None and computed_hash != header["hash"]:
+                print(f"ERROR: Header hash mismatch at index {header['index']}")
+                return False
+            previous_hash = header["hash"]
+        return True
+
+    def download_headers(self, peer, start_height, end_height):
+        """Headers [start_height, end_height) of a peer's chain, validated as one chain on top of our block below start."""
+        headers = []
+        previous_hash = self.chain[start_height - 1].hash if start_height > 0 else "0"
+        height = start_height
+        while height < end_height:
+            body = self.fetch_headers(peer, height, min(self.MAX_HEADERS, end_height - height))
+            batch = body["headers"] if body else []
+            if not batch:
+                raise ValueError(f"peer {peer} stopped serving headers at height {height}")
+            if not self.validate_headers(batch, previous_hash, height):
+                raise ValueError(f"peer {peer} sent an invalid header chain at height {height}")
+            headers.extend(batch)
+            previous_hash = batch[-1]["hash"]
+            height += len(batch)
+        return headers
+
+    def block_matches_header(self, block, header):
+        """True if a downloaded block is the one its (already validated) header describes."""
+        if block.index != header["index"] or block.hash != header["hash"] or block.previous_hash != header["previous_hash"]:
+            return False
+        if block.version >= Block.HEADER_VERSION:
+            # The header hash commits to the Merkle root, and the root to every transaction
+            return (block.merkle_root().hex() == header["merkle_root"] and block.compute_hash() == header["hash"] and
+                    not block.has_duplicate_transactions())
+        return True  # Legacy hashes cover the whole block but older data does not always re-hash, see /debug_hashes
+
+    def fetch_block_range(self, sources, headers, start_height):
+        """Blocks for `headers` (heights start_height...), trying each source peer in turn until one sends valid blocks."""
+        end_height = start_height + len(headers)
+        for peer in sources:
+            try:
+                response = self.broadcaster.session(peer).get(
+                    f"{peer}/blocks", params={"from": start_height, "to": end_height - 1}, timeout=10)
+                if response.status_code != 200:
+                    continue
+                blocks = [Block.from_dict(block_data) for block_data in response.json().get("blocks", [])]
+            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                print(f"WARNING: Failed to fetch blocks {start_height}-{end_height - 1} from {peer}: {e}")
+                continue
+
+            if len(blocks) == len(headers) and all(map(self.block_matches_header, blocks, headers)):
+                return blocks
+            print(f"WARNING: Peer {peer} sent blocks {start_height}-{end_height - 1} that do not match their headers")
+        raise ValueError(f"no peer sent valid blocks {start_height}-{end_height - 1}")
+
+    def download_missing_blocks(self, best_peer, sources, peer_length):
+        """Headers-first download of the blocks we are missing from the best chain.
+
+        Returns (blocks, fork_height) like `download_chain_suffix`. Block ranges are spread
+        over `sources` (the peers on the same tip) and fetched concurrently; a range that
+        fails or does not match its headers is retried from the next peer.
+        """
+        fork_height = self.find_common_ancestor(best_peer, peer_length) + 1
+        headers = self.download_headers(best_peer, fork_height, peer_length)
+        print(f"DEBUG: Common ancestor with {best_peer} at height {fork_height - 1}, {len(headers)} blocks to fetch")
+
+        starts = list(range(0, len(headers), self.SYNC_BLOCK_RANGE))
+        if not starts:
+            return [], fork_height
+        with ThreadPoolExecutor(max_workers=min(self.SYNC_WORKERS, len(starts))) as pool:
+            ranges = [
+                pool.submit(self.fetch_block_range,
+                            sources[i % len(sources):] + sources[:i % len(sources)],  # Rotate the first choice
+                            headers[start:start + self.SYNC_BLOCK_RANGE], fork_height + start)
+                for i, start in enumerate(starts)
+            ]
+            blocks = []
+            for future in ranges:
+                blocks.extend(future.result())
+        return blocks, fork_height
+
+    def fetch_chain_page(self, peer, from_height, limit):
+        """GET one page of a peer's /chain; returns the JSON body, or None if the peer answered with an error."""
+        response = self.broadcaster.session(peer).get(f"{peer}/chain", params={"from_height": from_height, "limit": limit},
+                                                      timeout=3)
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+    def download_chain_suffix(self, peer, length):
+        """Downloads a peer's chain from the first block that differs from ours.
+
+        Returns (blocks, fork_height), where blocks are the peer's blocks from fork_height
+        on. Only one page of blocks is held in memory beyond the blocks actually kept.
+        """
+        suffix = []
+        fork_height = None
+        height = 0
+        while height < length:
+            page = self.fetch_chain_page(peer, height, self.CHAIN_PAGE_SIZE)
+            # Peers that predate paging return their whole chain; keep only the part we asked for
+            blocks = [block for block in (page or {}).get("chain", []) if block["index"] >= height]
+            if not blocks:
+                break
+
+            for block_data in blocks:
+                index = block_data["index"]
+                if fork_height is None:
+                    if index < len(self.chain) and self.chain[index].hash == block_data["hash"]:
+                        continue  # Still on our common prefix
+                    fork_height = index
+                suffix.append(Block.from_dict(block_data))
+            height = blocks[-1]["index"] + 1
+
+        return suffix, len(self.chain) if fork_height is None else fork_height
+
 
     def validate_chain(self, chain):
         """Ensures the chain received from peers is valid before replacing local chain."""
@@ -211,7 +809,7 @@ class IFChain:
     
     def register_peer(self, peer):
         """Registers a new node in the network and immediately saves it to file."""
-        self_address = f"http://127.0.0.1:{self.port}"  # Get own address
+        self_address = self.node_url()  # Get own address
 
         if peer == self_address:
             print("DEBUG: Node tried to register itself. Ignoring.")
@@ -233,92 +831,642 @@ class IFChain:
         return False
 
 
-    def broadcast_transaction(self, tx_data):
-        """Sends a new transaction to all peers."""
-        print(f"Broadcasting transaction to peers: {self.peers}")  # Debugging Log
-        for peer in self.peers:
-            try:
-                response = requests.post(f"{peer}/receive_transaction", json=tx_data, timeout=2)
-                print(f"Transaction sent to {peer} Status: {response.status_code} Response: {response.text}")  # Debugging Log
-            except requests.exceptions.RequestException as e:
-                print(f"Failed to send transaction to {peer}: {e}")  # Debugging Log
+    def node_url(self):
+        """The address this node registers with peers."""
+        return f"http://127.0.0.1:{self.port}"
 
+    def broadcast_transaction(self, tx_data, origin=None):
+        """Announces a transaction to every peer but `origin` by hash; only peers that ask get the body.
 
-    def broadcast_block(self, block_data):
-        """Sends a newly mined block to all peers."""
+        Announcements are batched, so a burst of transactions costs one inventory per peer.
+        """
+        print(f"Broadcasting transaction to peers: {self.peers}")  # Debugging Log
+        if tx_data.get("hash"):
+            self.seen_transactions.add(tx_data["hash"])
+        self.tx_announcements.add(tx_data, origin)
+
+    def announce_transactions(self, batch):
+        """Sends one inventory of transaction hashes per peer, then the bodies the peer answered it still wants."""
+        headers = {NODE_URL_HEADER: self.node_url()}
+        for peer in list(self.peers):
+            transactions = {tx["hash"]: tx for tx, origin in batch if origin != peer and tx.get("hash")}
+            if not transactions:
+                continue
+
+            def deliver(session, peer, transactions=transactions):
+                response = session.post(f"{peer}/inv", json={"type": "tx", "hashes": list(transactions)},
+                                        headers=headers, timeout=2)
+                if response.status_code == 404:
+                    # Peer predates inventory gossip, push the bodies as before
+                    for tx in transactions.values():
+                        response = session.post(f"{peer}/receive_transaction", json=tx, headers=headers, timeout=2)
+                    return response
+                if not response.ok:
+                    return response
+                wanted = [transactions[h] for h in response.json().get("wanted", []) if h in transactions]
+                if not wanted:
+                    return response
+                return session.post(f"{peer}/receive_transactions", json={"transactions": wanted},
+                                    headers=headers, timeout=5)
+
+            self.broadcaster.broadcast([peer], f"inventory of {len(transactions)} transactions", deliver)
+
+    def broadcast_block(self, block_data, origin=None):
+        """Announces a block to every peer but `origin`; peers that do not have it yet get it as a compact block.
+
+        Only transactions that were never gossiped are sent in full with the header, the rest as
+        short ids the peer resolves from its mempool. Peers predating /inv get the full block in
+        the binary block format, as does a peer still missing transactions after one round trip.
+        """
         print(f"Broadcasting block {block_data['index']} to peers: {self.peers}")  # Debugging Log
+        block_hash = block_data["hash"]
+        self.seen_blocks.add(block_hash)
+        transactions = block_data["transactions"]
+        compact = compact_block.encode_compact_block(
+            Block.from_dict(block_data).header(), transactions,
+            lambda tx: tx.get("hash") not in self.seen_transactions)
+        payload = block_codec.encode_block(block_data)
+        headers = {NODE_URL_HEADER: self.node_url()}
+
+        def deliver(session, peer):
+            response = session.post(f"{peer}/inv", json={"type": "block", "hashes": [block_hash]},
+                                    headers=headers, timeout=2)
+            if response.ok:
+                if block_hash not in response.json().get("wanted", []):
+                    return response  # Peer already has it
+                message = compact
+                for _ in range(2):
+                    response = session.post(f"{peer}/compact_block", json=message, headers=headers, timeout=5)
+                    missing = response.json().get("missing") if response.ok else None
+                    if not missing:
+                        return response
+                    message = compact_block.with_prefilled(compact, transactions, missing)
+                print(f"DEBUG: {peer} still misses {len(missing)} transactions of block {block_data['index']}, sending it in full.")
+            response = session.post(f"{peer}/receive_block", data=payload,
+                                    headers={"Content-Type": block_codec.CONTENT_TYPE, **headers}, timeout=5)
+            if response.status_code == 415:
+                # Peer predates the binary block format, fall back to JSON
+                response = session.post(f"{peer}/receive_block", json=block_data, headers=headers, timeout=5)
+            return response
+
+        peers = [peer for peer in self.peers if peer != origin]
+        self.broadcaster.broadcast(peers, f"block {block_data['index']}", deliver)
+
+    def receive_compact_block(self, message):
+        """Rebuilds a block from a compact block message and the mempool.
+
+        Returns (block, missing): while transactions are missing `block` is None and `missing`
+        lists their positions. If the rebuilt transactions do not match the header's Merkle root,
+        every position filled from the pool is reported missing. Raises
+        compact_block.CompactBlockError for malformed messages or a header failing proof of work.
+        """
+        header, _, _ = compact_block.parse(message)
+        header_hash = Block.header_hash(header)
+        if header_hash is not None and (header_hash != header["hash"] or
+                                        not header_hash.startswith('0' * IFChain.difficulty)):
+            raise compact_block.CompactBlockError("Block header fails proof of work")
 
-        for peer in self.peers:
-            try:
-                response = requests.post(f"{peer}/receive_block", json=block_data, timeout=5)
-                if response.status_code == 200:
-                    print(f"Block {block_data['index']} successfully sent to {peer} ✅")
-                else:
-                    print(f"Peer {peer} rejected block {block_data['index']} ❌ Status: {response.status_code} Response: {response.text}")
-            except requests.exceptions.RequestException as e:
-                print(f"Failed to send block {block_data['index']} to {peer}: {e}")  # Debugging Log
+        transactions, missing, from_pool = compact_block.reconstruct(
+            message, list(self.unconfirmed_transactions), self.block_transaction)
+        if missing:
+            return None, missing
+
+        try:
+            block = Block.from_dict(dict(header, transactions=transactions))
+        except (KeyError, TypeError, ValueError) as e:
+            raise compact_block.CompactBlockError(f"Malformed compact block header: {e}")
+        if header_hash is not None and block.merkle_root().hex() != header.get("merkle_root"):
+            print(f"DEBUG: Rebuilt block {block.index} does not match its Merkle root, asking for the pool transactions.")
+            return None, from_pool
+        return block, []
+
+    @staticmethod
+    def block_transaction(tx):
+        """The copy of a pending transaction that goes into a block."""
+        return dict(tx, status="confirmed", block_confirmations=1)
+
+    def knows_transaction(self, tx_hash):
+        return tx_hash in self.seen_transactions or tx_hash in self.pending_overlay or self.is_confirmed_transaction(tx_hash)
+
+    def knows_block(self, block_hash):
+        return (block_hash in self.seen_blocks or block_hash in self.block_heights or
+                block_hash in self.block_tree or block_hash in self.orphans)
+
+    def wanted_inventory(self, kind, hashes):
+        """The announced hashes whose bodies this node needs and has not already asked another peer for."""
+        known = self.knows_transaction if kind == "tx" else self.knows_block
+        return [h for h in dict.fromkeys(hashes)
+                if isinstance(h, str) and not known(h) and self.requested_inventory.add((kind, h))]
+
+    def accept_relayed_transaction(self, tx, origin=None):
+        """Adds a transaction relayed by a peer under the hash it was announced with, then announces it onwards.
+
+        Returns "accepted", "duplicate", "confirmed" or "rejected".
+        """
+        required_fields = ["sender", "receiver", "amount", "token", "hash"]
+        if not isinstance(tx, dict) or not all(field in tx for field in required_fields):
+            return "rejected"
+        tx_hash = tx["hash"]
+        self.seen_transactions.add(tx_hash)
+        if tx_hash in self.pending_overlay:
+            return "duplicate"
+        if self.is_confirmed_transaction(tx_hash):
+            return "confirmed"
+
+        try:
+            affordable = self.can_afford(tx)
+        except (TypeError, ValueError):
+            return "rejected"
+        if not affordable:
+            print(f"Transaction failed: Insufficient balance for {tx['sender']}.")
+            return "rejected"
+
+        transaction = {key: value for key, value in tx.items() if key != "origin"}
+        transaction.update(status="pending", block_confirmations=0)
+        self.add_to_mempool(transaction)
+        self.broadcast_transaction(transaction, origin)
+        return "accepted"
 
         
     def create_genesis_block(self):
-        genesis_block = Block(0, time.time(), [], "0", self.poh.current_hash)
+        genesis_block = Block(0, time.time(), [], "0", self.poh.current_hash, version=Block.HEADER_VERSION)
         genesis_block.hash = genesis_block.compute_hash()
         genesis_block.chain_id = self.chain_id  # Attach Chain ID to the genesis block
         self.chain.append(genesis_block)
+        self.apply_block_state(genesis_block)
         self.save_blockchain_state()
+        return genesis_block
+
+    def migrate_blockchain_file(self):
+        """Imports the legacy blockchain.json into the block log (runs once, while the log is empty)."""
+        try:
+            migrated = self.block_log.migrate_from_json(self.BLOCKCHAIN_FILE)
+            print(f"DEBUG: Migrated {migrated} blocks from {self.BLOCKCHAIN_FILE} into {self.BLOCK_LOG_DIR}.")
+        except json.JSONDecodeError:
+            print(f"ERROR: Corrupted {self.BLOCKCHAIN_FILE}, skipping migration.")
         
     def load_blockchain_state(self):
-        if os.path.exists(self.BLOCKCHAIN_FILE):
-            try:
-                print("DEBUG: Loading blockchain from file...")
-                with open(self.BLOCKCHAIN_FILE, "r") as f:
-                    chain_data = json.load(f)
-
-                if not chain_data:
-                    print("WARNING: blockchain.json is empty!")
-                    return
-
-                self.chain = [Block(
-                    index=block["index"],
-                    timestamp=block["timestamp"],
-                    transactions=block["transactions"],
-                    previous_hash=block["previous_hash"],
-                    poh_hash=block["poh_hash"],
-                    nonce=block["nonce"],
-                    hash=block["hash"]
-                ) for block in chain_data]
-
-                print(f"DEBUG: Loaded {len(self.chain)} blocks from file.")
+        """Opens the chain over the block log; blocks are only decoded when they are accessed."""
+        print("DEBUG: Loading blockchain from block log...")
+        self.chain = LazyChain(self.block_log, Block.from_header)
 
-            except json.JSONDecodeError:
-                print("ERROR: Corrupted blockchain file! Resetting to genesis block.")
-                self.chain = [self.create_genesis_block()]
-        else:
-            print("WARNING: No blockchain file found. Creating new genesis block.")
-            self.chain = [self.create_genesis_block()]
+        if not self.chain:
+            print("WARNING: Block log is empty! Creating new genesis block.")
+            self.create_genesis_block()
+            return
+
+        print(f"DEBUG: Loaded {len(self.chain)} blocks from block log.")
 
     def save_blockchain_state(self):
-        with open(self.BLOCKCHAIN_FILE, "w") as f:
-            json.dump([block.to_dict() for block in self.chain], f)
+        """Blocks are appended as they are added, so this only flushes the log and its manifest."""
+        self.block_log.sync()
+        self.tx_index.sync()
         print("Blockchain state saved")
-        
+
+    def replace_chain(self, new_chain, start_height=0):
+        """Replaces the local chain, rewriting the block log only from the first differing block.
+
+        `new_chain` holds the new blocks from `start_height` on; the blocks below it are kept.
+        """
+        fork_height = start_height
+        while (fork_height < min(len(self.chain), start_height + len(new_chain)) and
+               self.chain[fork_height].hash == new_chain[fork_height - start_height].hash):
+            fork_height += 1
+
+        self.reorganize(fork_height, new_chain[fork_height - start_height:])
+
+    def reorganize(self, fork_height, new_blocks):
+        """Rolls the chain back to `fork_height` and applies `new_blocks` on top of it.
+
+        Derived state is reverted block by block from the tip, so the cost grows with the
+        depth of the reorg rather than the chain height. The abandoned blocks are kept as a
+        side branch in the block tree, and their transactions that the new chain does not
+        confirm go back into the mempool.
+        """
+        with self.chain_lock:
+            abandoned = []
+            for height in range(len(self.chain) - 1, fork_height - 1, -1):
+                block = self.chain[height]
+                block.transactions  # Decode now, the block log record is about to be truncated
+                self.revert_block_state(block)
+                abandoned.append(block)
+            abandoned.reverse()
+
+            self.chain.truncate(fork_height)
+            for block in new_blocks:
+                self.chain.append(block)
+                self.apply_block_state(block)
+                self.drop_confirmed_from_mempool(block)
+            self.block_tree.discard(new_blocks)
+
+            work = self.block_tree.main_work[fork_height - 1] if fork_height > 0 else 0
+            for block in abandoned:
+                work += self.block_work(block)
+                self.block_tree.add_side(block, work)
+            self.block_tree.prune(len(self.chain) - 1)
+
+            if abandoned:
+                print(f"DEBUG: Reorganized at height {fork_height}: {len(abandoned)} blocks abandoned, "
+                      f"{len(new_blocks)} applied.")
+                self.miner.cancel()  # Any job in flight builds on an abandoned tip
+                self.return_to_mempool(abandoned)
+            self.save_blockchain_state()
+
+    def return_to_mempool(self, blocks):
+        """Puts transactions of abandoned blocks back into the mempool unless the chain or the pool already has them.
+
+        Each one is checked against the balances of the new main chain (and the pool so far), so
+        a transaction conflicting with one confirmed on the winning branch is dropped.
+        """
+        returned = dropped = 0
+        for block in blocks:
+            for tx in block.transactions:
+                tx_hash = tx.get("hash")
+                if not tx_hash or tx_hash in self.pending_overlay or self.is_confirmed_transaction(tx_hash):
+                    continue
+                try:
+                    affordable = self.can_afford(tx)
+                except (KeyError, TypeError, ValueError):
+                    affordable = False
+                if not affordable:
+                    dropped += 1
+                    continue
+                self.add_to_mempool(dict(tx, status="pending", block_confirmations=0))
+                returned += 1
+        if returned or dropped:
+            print(f"DEBUG: Returned {returned} transactions from abandoned blocks to the mempool, "
+                  f"dropped {dropped} the new chain no longer covers.")
+
+    def can_afford(self, tx):
+        """True if the sender's spendable balance covers a pending transaction, as checked when it was added.
+
+        Transfers need amount plus gas fee, contract gas charges their amount; mints come from
+        SYSTEM and are always covered. Raises KeyError/TypeError/ValueError for malformed amounts.
+        """
+        if tx.get("sender") == "SYSTEM":
+            return True
+        amount = float(tx["amount"])
+        required = amount if tx.get("tx_type") == "gas_fee" else amount + float(tx.get("gas_fee", amount * self.gas_fee))
+        return self.spendable_balance(tx["sender"], tx.get("token", "IFC")) >= required
+
+    @classmethod
+    def block_work(cls, block):
+        """Expected number of hashes behind a block (every block is mined at the same difficulty)."""
+        return 16 ** cls.difficulty
+
+    def accept_block(self, block, peer=None):
+        """Adds a block received from a peer, then connects any pooled orphans that were waiting for it.
+
+        A block whose parent is unknown goes to the orphan pool and its missing ancestors are
+        requested from `peer` (or every known peer) in the background. Returns the status of
+        `block` itself, see `attach_block`.
+        """
+        self.seen_blocks.add(block.hash)
+        with self.chain_lock:
+            status = self.attach_block(block)
+            if status == "orphan":
+                if self.orphans.add(block, peer):
+                    print(f"DEBUG: Block {block.index} is an orphan, {len(self.orphans)} in the pool.")
+                self.request_missing_parents(block, peer)
+                return status
+
+            if status in ("extended", "side", "reorg"):
+                parents = [block.hash]
+                while parents:
+                    for child in self.orphans.pop_children(parents.pop()):
+                        child_status = self.attach_block(child)
+                        print(f"DEBUG: Connected orphan block {child.index} ({child_status}).")
+                        if child_status in ("extended", "side", "reorg"):
+                            parents.append(child.hash)
+            return status
+
+    def request_missing_parents(self, orphan, peer=None):
+        """Fetches the blocks between our chain and a pooled orphan on a background thread."""
+        missing_hash, missing_height = self.orphans.missing_parent(orphan)
+        if missing_height < 0 or not self.orphans.mark_requested(missing_hash):
+            return
+        peers = [peer] if peer in self.peers else list(self.peers)
+        threading.Thread(target=self.fetch_missing_parents, args=(missing_hash, missing_height, peers),
+                         daemon=True).start()
+
+    def fetch_missing_parents(self, missing_hash, missing_height, peers):
+        """Downloads the block `missing_hash` at `missing_height` and the ancestors we lack, from the first peer that has them.
+
+        The gap up to our tip comes from the peer's main chain in one /blocks request. If the peer
+        holds the block off its main chain (on a side branch or in its orphan pool), the branch is
+        fetched by hash instead, see `fetch_branch`.
+        """
+        for peer in peers:
+            session = self.broadcaster.session(peer)
+            start = max(min(len(self.chain), missing_height), missing_height - self.MAX_BLOCK_RANGE + 1)
+            try:
+                response = session.get(f"{peer}/blocks", params={"from": start, "to": missing_height}, timeout=5)
+                blocks = []
+                if response.status_code == 200:
+                    blocks = [Block.from_dict(block_data) for block_data in response.json().get("blocks", [])]
+                if not blocks or blocks[-1].hash != missing_hash:
+                    # The peer's main chain does not hold it at that height
+                    blocks = self.fetch_branch(session, peer, missing_hash)
+            except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as e:
+                print(f"WARNING: Failed to fetch missing block {missing_height} from {peer}: {e}")
+                continue
+            if not blocks:
+                continue
+
+            print(f"DEBUG: Fetched {len(blocks)} missing blocks up to height {missing_height} from {peer}")
+            for block in blocks:
+                self.accept_block(block, peer)
+            return
+
+    def fetch_branch(self, session, peer, block_hash):
+        """Blocks from the first one we lack up to `block_hash`, fetched by hash following previous_hash.
+
+        Stops at a block we already hold (main chain, side branch or orphan pool) or after
+        MAX_BLOCK_RANGE blocks; returns [] if the peer cannot serve one of them.
+        """
+        blocks = []
+        while (len(blocks) < self.MAX_BLOCK_RANGE and block_hash not in self.block_heights and
+               block_hash not in self.block_tree and block_hash not in self.orphans):
+            response = session.get(f"{peer}/block/{block_hash}", timeout=5)
+            if response.status_code != 200:
+                return []
+            block = Block.from_dict(response.json())
+            if block.hash != block_hash:
+                print(f"WARNING: {peer} answered block {block_hash} with {block.hash}")
+                return []
+            blocks.append(block)
+            block_hash = block.previous_hash
+        blocks.reverse()
+        return blocks
+
+    def attach_block(self, block):
+        """Places one block in the block tree.
+
+        Returns "extended" (new tip), "reorg" (its branch now has the most cumulative work
+        and became the main chain), "side" (kept on a side branch), "duplicate", "orphan"
+        (parent unknown) or "invalid".
+        """
+        if block.hash in self.block_heights or block.hash in self.block_tree:
+            return "duplicate"
+        if not self.is_valid_proof(block, block.hash) or block.has_duplicate_transactions():
+            return "invalid"
+
+        parent_height = self.block_heights.get(block.previous_hash)
+        if parent_height is not None:
+            parent_index, parent_work = parent_height, self.block_tree.main_work[parent_height]
+        else:
+            parent = self.block_tree.get_side(block.previous_hash)
+            if parent is None:
+                return "orphan"
+            parent_index, parent_work = parent[0].index, parent[1]
+        if block.index != parent_index + 1:
+            return "invalid"
+
+        if parent_height == len(self.chain) - 1:
+            self.add_block(block, block.hash)
+            self.miner.cancel()  # Our in-flight job now builds on a stale tip
+            self.drop_confirmed_from_mempool(block)
+            self.block_tree.prune(block.index)
+            return "extended"
+
+        work = parent_work + self.block_work(block)
+        self.block_tree.add_side(block, work)
+        if work <= self.block_tree.tip_work:
+            return "side"  # Ties keep the branch we saw first
+
+        branch = self.block_tree.branch(block.hash)
+        fork_height = branch[0].index
+        if self.block_heights.get(branch[0].previous_hash) != fork_height - 1:
+            print(f"WARNING: Branch of block {block.index} lost its link to the main chain, not switching.")
+            return "side"
+        self.reorganize(fork_height, branch)
+        return "reorg"
+
+    def apply_block_state(self, block):
+        """Updates state derived from the chain after `block` is appended at the tip."""
+        self.block_heights[block.hash] = block.index
+        self.block_times.append(block.index, block.timestamp)
+        self.block_tree.push_main(self.block_work(block))
+        self.tx_index.apply_block(block)
+        self.ledger.apply_block(block)
+        self.address_index.apply_block(block)
+        self.tx_columns.apply_block(block)
+        self.stats.apply_block(block)
+        if self.ledger.height % self.LEDGER_CHECKPOINT_INTERVAL == 0:
+            self.ledger.save(self.LEDGER_SNAPSHOT_FILE)
+            self.address_index.save(self.ADDRESS_INDEX_FILE)
+            self.tx_columns.save(self.TX_COLUMNS_FILE)
+            self.stats.save(self.CHAIN_STATS_FILE)
+
+    def revert_block_state(self, block):
+        """Undoes `apply_block_state` for the tip block before it is removed from the chain."""
+        self.block_heights.pop(block.hash, None)
+        previous_timestamp = self.block_times.time_at(block.index - 1) if block.index > 0 else None
+        self.block_times.pop()
+        self.block_tree.pop_main()
+        self.tx_index.revert_block(block)
+        self.ledger.revert_block(block)
+        self.address_index.revert_block(block)
+        self.tx_columns.revert_block(block)
+        self.stats.revert_block(block, previous_timestamp=previous_timestamp)
+
+    def load_block_index(self):
+        """Builds the block hash and timestamp indexes from the stored headers (transactions are not decoded)."""
+        self.block_heights = {}
+        self.block_times = BlockTimeIndex()
+        self.block_tree = BlockTree()
+        for height in range(len(self.block_log)):
+            header = self.block_log.read_header(height)
+            self.block_heights[header["hash"]] = height
+            self.block_times.append(height, normalize_timestamp(header["timestamp"]))
+            self.block_tree.push_main(self.block_work(header))
+
+    def heights_between_dates(self, start_date, end_date):
+        """Heights of the blocks between two 'YYYY-MM-DD' dates (UTC midnight to UTC midnight, inclusive)."""
+        return self.block_times.heights_between(date_to_epoch(start_date), date_to_epoch(end_date))
+
+    def load_tx_index(self):
+        """Brings the transaction index up to the chain tip, rebuilding it if it belongs to another chain."""
+        height = self.tx_index.height
+        if height > len(self.chain) or (height > 0 and self.chain[height - 1].hash != self.tx_index.tip_hash):
+            self.tx_index.rebuild(self.chain)
+            self.tx_index.sync()
+            print(f"DEBUG: Transaction index rebuilt from {len(self.chain)} blocks.")
+            return
+
+        for block in self.chain[height:]:
+            self.tx_index.apply_block(block)
+        if height < len(self.chain):
+            self.tx_index.sync()
+        print(f"DEBUG: Transaction index restored at height {height}, replayed {len(self.chain) - height} blocks.")
+
+    def header_at(self, height):
+        """Header dict of the block at `height` as /headers serves it, read without decoding transactions."""
+        stored = self.block_log.read_header(height)
+        timestamp = stored["timestamp"]
+        header = {
+            "index": stored["index"],
+            "timestamp": (
+                datetime.utcfromtimestamp(int(timestamp)).strftime('%Y-%m-%d %H:%M:%S')
+                if isinstance(timestamp, (int, float)) else timestamp
+            ),
+            "previous_hash": stored["previous_hash"],
+            "poh_hash": stored["poh_hash"],
+            "nonce": stored["nonce"],
+            "hash": stored["hash"]
+        }
+        if stored.get("version", Block.LEGACY_VERSION) != Block.LEGACY_VERSION:
+            header["version"] = stored["version"]
+            header["merkle_root"] = stored.get("merkle_root") or self.chain[height].merkle_root().hex()
+        return header
+
+    def tip_hash(self):
+        """Hash of the tip block, or None for an empty chain (the tip stays in the block cache)."""
+        return self.chain[-1].hash if self.chain else None
+
+    def get_block(self, height):
+        """Block at `height`, or None when it is out of range."""
+        if 0 <= height < len(self.chain):
+            return self.chain[height]
+        return None
+
+    def get_block_by_hash(self, block_hash):
+        """Block with the given stored hash, looked up in the hash index."""
+        height = self.block_heights.get(block_hash)
+        return self.chain[height] if height is not None else None
+
+    def find_block(self, block_hash):
+        """Block with the given hash on the main chain, a side branch or in the orphan pool."""
+        block = self.get_block_by_hash(block_hash)
+        if block is None:
+            side = self.block_tree.get_side(block_hash)
+            block = side[0] if side is not None else self.orphans.get(block_hash)
+        return block
+
+    def load_snapshot_index(self, index, path, name):
+        """Restores a snapshotted chain index and replays blocks mined since; rebuilds it if the snapshot is unusable."""
+        snapshot_ok = index.load(path)
+        height = index.height
+        if (not snapshot_ok or height > len(self.chain) or
+                (height > 0 and self.chain[height - 1].hash != index.tip_hash)):
+            index.rebuild(self.chain)
+            index.save(path)
+            print(f"DEBUG: {name} rebuilt from {len(self.chain)} blocks.")
+            return
+
+        for block in self.chain[height:]:
+            index.apply_block(block)
+        print(f"DEBUG: {name} restored at height {height}, replayed {len(self.chain) - height} blocks.")
+
+    def load_ledger(self):
+        """Restores the account ledger from its snapshot and replays blocks mined since then."""
+        self.load_snapshot_index(self.ledger, self.LEDGER_SNAPSHOT_FILE, "Account ledger")
+
+    def load_address_index(self):
+        """Restores the address posting lists from their snapshot and replays blocks mined since then."""
+        self.load_snapshot_index(self.address_index, self.ADDRESS_INDEX_FILE, "Address index")
+
+    def load_tx_columns(self):
+        """Restores the transaction columns from their snapshot and replays blocks mined since then."""
+        self.load_snapshot_index(self.tx_columns, self.TX_COLUMNS_FILE, "Transaction columns")
+
+    def load_chain_stats(self):
+        """Restores the running chain totals from their snapshot and replays blocks mined since then."""
+        self.load_snapshot_index(self.stats, self.CHAIN_STATS_FILE, "Chain stats")
+
+    def rebuild_ledger(self):
+        """Recomputes the account ledger from the whole chain and snapshots it."""
+        self.ledger.rebuild(self.chain)
+        self.ledger.save(self.LEDGER_SNAPSHOT_FILE)
+        print(f"DEBUG: Account ledger rebuilt from {len(self.chain)} blocks.")
+
+    def full_scan_balances(self):
+        """Computes confirmed balances for every address by scanning all blocks (the pre-ledger method)."""
+        balances = {}
+        for block in self.chain:
+            for tx in block.transactions:
+                token = tx.get("token", "IFC")
+                net_amount = tx.get("net_amount", tx.get("amount", 0))
+
+                if tx.get("receiver") is not None:
+                    account = balances.setdefault(tx["receiver"], {})
+                    account[token] = account.get(token, 0) + net_amount
+
+                if tx.get("sender") is not None:
+                    account = balances.setdefault(tx["sender"], {})
+                    account[token] = account.get(token, 0) - tx.get("amount", 0)
+        return balances
+
+    def check_ledger(self):
+        """Compares the account ledger against a full chain scan and returns any mismatching balances."""
+        expected = self.full_scan_balances()
+        mismatches = []
+        for address in set(expected) | set(self.ledger.balances):
+            ledger_balance = self.ledger.balances.get(address, {})
+            scanned_balance = expected.get(address, {})
+            for token in set(ledger_balance) | set(scanned_balance):
+                if round(ledger_balance.get(token, 0), 6) != round(scanned_balance.get(token, 0), 6):
+                    mismatches.append({
+                        "wallet_address": address,
+                        "token": token,
+                        "ledger": ledger_balance.get(token, 0),
+                        "full_scan": scanned_balance.get(token, 0)
+                    })
+        return mismatches
+
     def last_block(self):
         return self.chain[-1]
 
     def add_block(self, block, proof):
-        """Adds a validated block to the chain and updates transaction confirmations."""
-        previous_hash = self.last_block().hash if self.chain else "0"
+        """Adds a validated block to the chain (confirmations are derived from height when served)."""
+        with self.chain_lock:
+            previous_hash = self.last_block().hash if self.chain else "0"
 
-        if previous_hash != block.previous_hash:
-            return False  # Block invalid
+            if previous_hash != block.previous_hash or block.has_duplicate_transactions():
+                return False  # Block invalid
 
-        block.hash = proof
-        self.chain.append(block)
-    
-        for prev_block in self.chain:
-            for tx in prev_block.transactions:
-                tx["block_confirmations"] += 1  # Increase confirmations
+            block.hash = proof
+            self.chain.append(block)
+            self.apply_block_state(block)
 
-        return True
+            return True
+
+    def confirmations(self, block_index):
+        """Number of confirmations of a block: 1 for the tip, +1 for every block mined on top of it."""
+        return len(self.chain) - block_index
+
+    def serve_transaction(self, tx, block_index):
+        """Copy of a confirmed transaction for API responses with confirmations derived from chain height.
+
+        The stored `block_confirmations` field is legacy: it was frozen (or mutated in memory)
+        by older nodes and is part of the hashed block data, so it is never rewritten.
+        """
+        served = dict(tx)
+        served["block_confirmations"] = self.confirmations(block_index)
+        return served
+
+    def find_transaction(self, tx_hash):
+        """Return (block, position) of a confirmed transaction, or (None, None) if it is not on the chain."""
+        location = self.tx_index.lookup(tx_hash)
+        if location is None:
+            return None, None
+        height, position = location
+        return self.chain[height], position
+
+    def is_confirmed_transaction(self, tx_hash):
+        """True if a transaction with this hash is already in a block (replay check)."""
+        return tx_hash in self.tx_index
+
+    @staticmethod
+    def submitted_transaction_hash(tx_data, timestamp):
+        """Hash of a transaction submitted by a client.
+
+        Paying the same amount to the same receiver twice is two transactions, so the hash also
+        covers the client's `nonce` or, when it sends none, the admission `timestamp`. Resending
+        a request with the same nonce gives the same hash and is rejected as a replay.
+        """
+        hashed = tx_data if "nonce" in tx_data else dict(tx_data, timestamp=timestamp)
+        return hashlib.sha256(json.dumps(hashed, sort_keys=True).encode()).hexdigest()
 
     def is_valid_proof(self, block, block_hash):
         return (block_hash.startswith('0' * IFChain.difficulty) and
@@ -340,7 +1488,13 @@ class IFChain:
         gas_fee = amount * self.gas_fee
         net_amount = amount - gas_fee
 
-        sender_balance = self.get_wallet_balance(sender).get("balance", {}).get(token, 0)
+        timestamp = time.time()
+        tx_hash = self.submitted_transaction_hash(tx_data, timestamp)
+        if self.is_confirmed_transaction(tx_hash):
+            print(f"Transaction failed: {tx_hash} is already confirmed.")
+            return False
+
+        sender_balance = self.spendable_balance(sender, token)
 
         if sender_balance < (amount + gas_fee):
             print(f"Transaction failed: Insufficient balance for {sender}. Available: {sender_balance}, Required: {amount + gas_fee}")
@@ -353,16 +1507,15 @@ class IFChain:
             "token": token,
             "gas_fee": gas_fee,
             "net_amount": net_amount,
-            "hash": hashlib.sha256(json.dumps(tx_data, sort_keys=True).encode()).hexdigest(),
-            "timestamp": time.time(),
+            "hash": tx_hash,
+            "timestamp": timestamp,
             "tx_type": "transfer",
             "block_confirmations": 0,
             "status": "pending",
             "signatures": []
         }
 
-        self.unconfirmed_transactions.append(transaction)
-        self.save_unconfirmed_transactions()
+        self.add_to_mempool(transaction)
         
         print(f"Transaction added successfully: {transaction}")
         print(f"DEBUG: Current Unconfirmed Transactions: {self.unconfirmed_transactions}")
@@ -412,55 +1565,106 @@ class IFChain:
             "signatures": []
         }
 
-        self.unconfirmed_transactions.append(new_tx)
+        self.add_to_mempool(new_tx)
         print(f"DEBUG: Mint transaction added to pool: {new_tx['hash']}")
 
         return {"message": f"{amount} {token} added to {wallet_address}"}
         
+    def add_to_mempool(self, tx):
+        """Adds a transaction to the pending pool, journaling a single add record."""
+        seq = self.mempool_journal.add(tx)
+        self.unconfirmed_transactions.append(tx)
+        self.unconfirmed_seqs.append(seq)
+        self.pending_overlay.add(tx)
+
+    def remove_from_mempool(self, tx_hashes):
+        """Removes one pending transaction per given hash, journaling a remove record for each."""
+        remaining = list(tx_hashes)
+        kept_transactions, kept_seqs = [], []
+        for tx, seq in zip(self.unconfirmed_transactions, self.unconfirmed_seqs):
+            if tx.get("hash") in remaining:
+                remaining.remove(tx["hash"])
+                self.mempool_journal.remove(seq)
+                self.pending_overlay.remove(tx)
+            else:
+                kept_transactions.append(tx)
+                kept_seqs.append(seq)
+
+        self.unconfirmed_transactions = kept_transactions
+        self.unconfirmed_seqs = kept_seqs
+        self.compact_mempool_journal()
+
+    def clear_mined_transactions(self, through_seq):
+        """Drops every pending transaction up to `through_seq` with one mined marker in the journal."""
+        mined = 0
+        while mined < len(self.unconfirmed_seqs) and self.unconfirmed_seqs[mined] <= through_seq:
+            mined += 1
+
+        self.mempool_journal.mark_mined(through_seq, mined)
+        if mined == len(self.unconfirmed_transactions):
+            self.pending_overlay.clear()
+        else:
+            for tx in self.unconfirmed_transactions[:mined]:
+                self.pending_overlay.remove(tx)
+        del self.unconfirmed_transactions[:mined]
+        del self.unconfirmed_seqs[:mined]
+        self.compact_mempool_journal()
+
+    def drop_confirmed_from_mempool(self, block):
+        """Removes pending transactions that a block from elsewhere has already confirmed."""
+        confirmed = [tx["hash"] for tx in block.transactions if tx.get("hash") in self.pending_overlay]
+        if confirmed:
+            self.remove_from_mempool(confirmed)
+            print(f"DEBUG: Dropped {len(confirmed)} pending transactions confirmed in block {block.index}.")
+
+    def compact_mempool_journal(self, force=False):
+        """Rewrites the journal down to the live pool once it is mostly dead records."""
+        if force or self.mempool_journal.needs_compaction():
+            self.mempool_journal.compact(list(zip(self.unconfirmed_seqs, self.unconfirmed_transactions)))
+
     def save_pending_transactions(self):
-        """Save unconfirmed transactions to a file for persistence."""
-        with open("pending_transactions.json", "w") as f:
-            json.dump(self.unconfirmed_transactions, f)
+        """Pending transactions are journaled as they arrive, so this only compacts the journal."""
+        self.compact_mempool_journal(force=True)
         print("DEBUG: Pending transactions saved.")
 
     def load_pending_transactions(self):
-        """Load unconfirmed transactions from a file."""
-        if os.path.exists("pending_transactions.json"):
-            with open("pending_transactions.json", "r") as f:
-                try:
-                    self.unconfirmed_transactions = json.load(f)
-                except json.JSONDecodeError:
-                    print("ERROR: Corrupted pending transactions file, resetting.")
-                    self.unconfirmed_transactions = []
-        else:
-            self.unconfirmed_transactions = []
+        """Load unconfirmed transactions by replaying the mempool journal."""
+        self.load_unconfirmed_transactions()
         print("DEBUG: Pending transactions loaded.")
         
     def save_unconfirmed_transactions(self):
         """Save unconfirmed transactions to a file to persist across restarts."""
-        with open(self.PENDING_TRANSACTIONS_FILE, "w") as f:
-            json.dump(self.unconfirmed_transactions, f)
-        print("DEBUG: Saved pending transactions to file.")
+        self.save_pending_transactions()
 
     def load_unconfirmed_transactions(self):
-        """Load unconfirmed transactions from file at startup."""
-        if os.path.exists(self.PENDING_TRANSACTIONS_FILE):
+        """Replay the mempool journal at startup, migrating the legacy JSON snapshot once."""
+        if not os.path.exists(self.MEMPOOL_JOURNAL_FILE) and os.path.exists(self.PENDING_TRANSACTIONS_FILE):
             try:
                 with open(self.PENDING_TRANSACTIONS_FILE, "r") as f:
-                    self.unconfirmed_transactions = json.load(f)
-                print("DEBUG: Loaded pending transactions from file.")
+                    legacy_transactions = json.load(f)
+                for tx in legacy_transactions:
+                    self.mempool_journal.add(tx)
+                print(f"DEBUG: Migrated {len(legacy_transactions)} pending transactions into the mempool journal.")
             except json.JSONDecodeError:
-                print("ERROR: Corrupt pending transactions file! Resetting list.")
-                self.unconfirmed_transactions = []
-        else:
-            self.unconfirmed_transactions = []
+                print("ERROR: Corrupt pending transactions file! Skipping migration.")
+
+        entries = self.mempool_journal.replay()
+        self.unconfirmed_seqs = [seq for seq, _ in entries]
+        self.unconfirmed_transactions = [tx for _, tx in entries]
+        self.pending_overlay.rebuild(self.unconfirmed_transactions)
+        print(f"DEBUG: Loaded {len(entries)} pending transactions from journal.")
 
     def proof_of_work(self, block):
-        block.nonce = 0
-        computed_hash = block.compute_hash()
-        while not computed_hash.startswith('0' * IFChain.difficulty):
-            block.nonce += 1
-            computed_hash = block.compute_hash()
+        """Finds a nonce meeting IFChain.difficulty across the miner's worker processes.
+
+        Returns the block hash, or None if the job was abandoned because the tip moved.
+        """
+        prefix, suffix, nonce_encoding = block.pow_template()
+        result = self.miner.mine(prefix, suffix, IFChain.difficulty, nonce_encoding)
+        if result is None:
+            return None
+
+        block.nonce, computed_hash = result
         return computed_hash
 
     def freeze_token(self, token):
@@ -590,7 +1794,7 @@ class IFChain:
 
                 # Gas fee calculation
                 gas_fee = self.GAS_FEE_PER_CONTRACT_EXECUTION
-                sender_balance = self.get_wallet_balance(sender).get("balance", {}).get("IFC", 0)
+                sender_balance = self.spendable_balance(sender, "IFC")
 
                 if sender_balance < gas_fee:
                     return jsonify({"error": "Insufficient balance for gas fee"}), 400
@@ -612,7 +1816,7 @@ class IFChain:
                 }
 
                 # Add gas fee transaction to pending transactions
-                self.unconfirmed_transactions.append(gas_transaction)
+                self.add_to_mempool(gas_transaction)
 
                 # Execute the contract function with state modification
                 result = local_scope[function_name](**params)
@@ -643,6 +1847,7 @@ class IFChain:
             
     def save_contract_state(self):
         """Save all smart contract states to a file for persistence."""
+        self.contracts_version += 1
         try:
             with open(self.CONTRACT_STATE_FILE, "w") as f:
                 json.dump(self.contracts, f, indent=4)
@@ -681,82 +1886,74 @@ class IFChain:
         last_block = self.last_block()
         poh_hash = self.poh.current_hash  # ✅ Capture current PoH hash
 
-        transactions_to_add = self.unconfirmed_transactions.copy()
+        # Copies, so an abandoned job leaves the pending transactions untouched
+        transactions_to_add = []
+        included = set()
+        for tx in self.unconfirmed_transactions:
+            if tx.get("hash") in included:
+                continue  # Resubmitted copy, a block may hold each transaction once
+            included.add(tx.get("hash"))
+            transactions_to_add.append(self.block_transaction(tx))
+        mined_through_seq = self.unconfirmed_seqs[-1]
         print(f"DEBUG: Transactions being added to block: {transactions_to_add}")
 
-        gas_collected = 0
-
-        for tx in transactions_to_add:
-            tx["status"] = "confirmed"
-            tx["block_confirmations"] = 1
-            gas_collected += tx.get("gas_fee", 0)
+        gas_collected = sum(tx.get("gas_fee", 0) for tx in transactions_to_add)
 
         new_block = Block(
             index=last_block.index + 1,
             timestamp=time.time(),
             transactions=transactions_to_add,
             previous_hash=last_block.hash,
-            poh_hash=poh_hash  # ✅ Ensure PoH hash is sent with the block
+            poh_hash=poh_hash,  # ✅ Ensure PoH hash is sent with the block
+            version=Block.HEADER_VERSION
         )
 
         proof = self.proof_of_work(new_block)
-        new_block.hash = proof
-        self.add_block(new_block, proof)
+        if proof is None or not self.add_block(new_block, proof):
+            print(f"DEBUG: Mining of block {new_block.index} abandoned, chain tip advanced.")
+            return f"Mining abandoned: block {new_block.index} was already added by a peer."
 
         print(f"DEBUG: Mined Block {new_block.index} - Hash: {new_block.hash}")
         print(f"DEBUG: Total Blocks in Memory after mining: {len(self.chain)}")
 
-        self.unconfirmed_transactions = []  # Clear mined transactions
+        self.clear_mined_transactions(mined_through_seq)  # Clear mined transactions
         self.save_blockchain_state()
 
         print("DEBUG: Current pending transactions AFTER mining:", self.unconfirmed_transactions)  # 🔍 Debugging
 
         # ✅ Auto-sync: Broadcast the new block to peers
-        self.broadcast_block(new_block.__dict__)  # ✅ Convert to dictionary
+        self.broadcast_block(new_block.to_dict())  # ✅ Convert to dictionary
+
+        return (f"Block {new_block.index} mined with {len(transactions_to_add)} transactions "
+                f"at {self.miner.last_hashrate:,.0f} H/s.")
+
+    def mine_in_background(self, miner_wallet):
+        """Starts `mine` on a background thread so the request thread is not blocked by PoW."""
+        if self.miner.mining:
+            return False
 
-        return f"Block {new_block.index} mined with {len(transactions_to_add)} transactions."
+        def run():
+            self.last_mining_result = {"result": self.mine(miner_wallet), "finished_at": time.time()}
 
+        threading.Thread(target=run, daemon=True).start()
+        return True
    
     def get_wallet_balance(self, wallet_address):
         """Retrieve the balance of tokens for a specific wallet from the chain and saved balances."""
 
         balance = {}
 
-        print(f"Fetching balance for {wallet_address} from stored wallet balances and blockchain...")
-
         # ✅ Step 1: Check saved wallet balances first
         if wallet_address in self.wallet_balances:
             balance = self.wallet_balances[wallet_address].copy()  # Get saved balances
-            print(f"Loaded stored balance for {wallet_address}: {balance}")
-
-        # ✅ Step 2: Check confirmed transactions in the blockchain
-        for block in self.chain:
-            print(f"Checking block {block.index}...")
-            for tx in block.transactions:
-                token = tx.get("token", "IFC")  # Default to IFC if token key is missing
-                net_amount = tx.get("net_amount", tx.get("amount", 0))  # Prevent KeyError
 
-                if tx.get("receiver") == wallet_address:
-                    balance[token] = balance.get(token, 0) + net_amount
-                    print(f"Adding {net_amount} {token} to {wallet_address} from confirmed transaction.")
+        # ✅ Step 2: Add confirmed balances from the account ledger (no chain scan)
+        for token, amount in self.ledger.balances.get(wallet_address, {}).items():
+            balance[token] = balance.get(token, 0) + amount
 
-                if tx.get("sender") == wallet_address:
-                    balance[token] = balance.get(token, 0) - tx.get("amount", 0)  # Prevent KeyError
-                    print(f"Subtracting {tx.get('amount', 0)} {token} from {wallet_address} (sent transaction).")
-
-        # ✅ Step 3: Check pending (unconfirmed) transactions
-        for tx in self.unconfirmed_transactions:
-            print("Checking unconfirmed transactions...")
-            token = tx.get("token", "IFC")
-            net_amount = tx.get("net_amount", tx.get("amount", 0))  # Prevent KeyError
-
-            if tx.get("receiver") == wallet_address:
-                balance[token] = balance.get(token, 0) + net_amount
-                print(f"Adding {net_amount} {token} from unconfirmed transaction.")
-
-            if tx.get("sender") == wallet_address:
-                balance[token] = balance.get(token, 0) - tx.get("amount", 0)  # Prevent KeyError
-                print(f"Subtracting {tx.get('amount', 0)} {token} from unconfirmed transaction.")
+        # ✅ Step 3: Add pending (unconfirmed) deltas from the mempool overlay
+        for token, amount in self.pending_overlay.delta(wallet_address).items():
+            balance[token] = balance.get(token, 0) + amount
 
         # ✅ Step 4: Round final balance for better readability
         balance = {token: round(amount, 6) for token, amount in balance.items()}
@@ -764,6 +1961,15 @@ class IFChain:
         print(f"Final balance for {wallet_address}: {balance}")
 
         return {"wallet_address": wallet_address, "balance": balance}
+
+    def spendable_balance(self, wallet_address, token):
+        """Saved + confirmed balance minus pending spends for one token, without scanning the mempool."""
+        return round(
+            self.wallet_balances.get(wallet_address, {}).get(token, 0) +
+            self.ledger.balances.get(wallet_address, {}).get(token, 0) +
+            self.pending_overlay.delta(wallet_address, token),
+            6
+        )
         
     def load_wallet_balances(self):
         """Load wallet balances from a JSON file."""
@@ -781,6 +1987,7 @@ class IFChain:
 
     def save_wallet_balances(self):
         """Save wallet balances to a JSON file for persistence."""
+        self.wallet_balances_version += 1
         try:
             with open("wallet_balances.json", "w") as f:
                 json.dump(self.wallet_balances, f, indent=4)
@@ -841,8 +2048,12 @@ class IFChain:
 ifchain = None
 
 def get_ifchain_instance():
-    port = int(os.getenv("FLASK_RUN_PORT", 5001))  # Get port from environment or default to 5001
-    return IFChain(port=port)  # ✅ Pass the port
+    """Ensures a single instance of the blockchain is used (the mempool journal has one writer)."""
+    global ifchain
+    if ifchain is None:
+        port = int(os.getenv("FLASK_RUN_PORT", 5001))  # Get port from environment or default to 5001
+        ifchain = IFChain(port=port)  # ✅ Pass the port
+    return ifchain
 
 ifchain = get_ifchain_instance()
 
@@ -857,13 +2068,39 @@ poh_thread.start()
 schedule.every(365).days.do(ifchain.apply_inflation)
 
 @app.route('/chain', methods=['GET'])
+@cached_response(tip_version)
 def get_chain():
-    """Retrieve the full blockchain with formatted timestamps."""
-    chain_data = [block.to_dict() for block in ifchain.chain]  
-    return jsonify({
-        "length": len(chain_data),
-        "chain": chain_data
-    })
+    """Retrieve the blockchain with formatted timestamps.
+
+    With `from_height`, `limit` or `cursor` only one page of blocks is returned along with a
+    `next_cursor`; with `format=ndjson` the blocks are streamed one per line.
+    """
+    ndjson = wants_ndjson()
+    paged = any(arg in request.args for arg in ('from_height', 'limit', 'cursor'))
+    try:
+        limit, after = page_args(cursor_size=1, default_limit=DEFAULT_PAGE_SIZE if paged and not ndjson else None)
+        from_height = after[0] + 1 if after else max(0, int(request.args.get('from_height', 0)))
+    except ValueError:
+        return jsonify({"error": "Invalid from_height, limit or cursor"}), 400
+
+    length = len(ifchain.chain)
+    end_height = length if limit is None else min(length, from_height + limit)
+    heights = range(from_height, end_height)
+
+    if ndjson:
+        headers = {"X-Chain-Length": str(length), "X-Chain-Id": ifchain.chain_id}
+        return ndjson_response((ifchain.chain[height].to_dict() for height in heights), headers)
+
+    chain_data = [ifchain.chain[height].to_dict() for height in heights]
+    response = {
+        "length": length,
+        "chain": chain_data,
+        "chain_id": ifchain.chain_id
+    }
+    if paged:
+        response["from_height"] = from_height
+        response["next_cursor"] = encode_cursor(end_height - 1) if end_height < length else None
+    return jsonify(response)
 
 @app.route('/create_wallet', methods=['POST'])
 def create_wallet():
@@ -907,7 +2144,13 @@ def add_new_transaction():
     gas_fee = amount * instance.gas_fee
     net_amount = amount - gas_fee
 
-    sender_balance = instance.get_wallet_balance(sender).get("balance", {}).get(token, 0)
+    timestamp = time.time()
+    tx_hash = instance.submitted_transaction_hash(tx_data, timestamp)
+    if instance.is_confirmed_transaction(tx_hash):
+        print(f"Transaction failed: {tx_hash} is already confirmed.")
+        return jsonify({"error": "Transaction already confirmed"}), 409
+
+    sender_balance = instance.spendable_balance(sender, token)
     
     print(f"Sender balance: {sender_balance} IFC | Required: {amount + gas_fee} IFC")
 
@@ -922,21 +2165,22 @@ def add_new_transaction():
         "token": token,
         "gas_fee": gas_fee,
         "net_amount": net_amount,
-        "hash": hashlib.sha256(json.dumps(tx_data, sort_keys=True).encode()).hexdigest(),
-        "timestamp": time.time(),
+        "hash": tx_hash,
+        "timestamp": timestamp,
         "tx_type": "transfer",
         "block_confirmations": 0,
         "status": "pending",
         "signatures": []
     }
 
-    instance.unconfirmed_transactions.append(transaction)
-
-    # ✅ Save the updated unconfirmed transactions
-    instance.save_pending_transactions()
+    # ✅ Journal the new transaction instead of rewriting the whole pool
+    instance.add_to_mempool(transaction)
 
     print(f"Transaction added successfully: {transaction}")
 
+    # ✅ Announce the hash; peers fetch the body only if they do not have it
+    instance.broadcast_transaction(transaction)
+
     return jsonify({"message": "Transaction added to the pool"}), 201
 
     
@@ -964,18 +2208,23 @@ def broadcast_transaction():
     }
 
     # Add to local node
-    ifchain.unconfirmed_transactions.append(transaction)
+    ifchain.add_to_mempool(transaction)
 
-    # Broadcast to peers
-    for peer in ifchain.peers:
-        try:
-            response = requests.post(f"{peer}/receive_transaction", json=transaction)
-            if response.status_code != 201:
-                print(f"Failed to send transaction to {peer}")
-        except requests.exceptions.RequestException:
-            print(f"Error communicating with peer {peer}")
+    # Broadcast to peers in the background
+    ifchain.broadcast_transaction(transaction)
 
     return jsonify({"message": "Transaction broadcasted"}), 201
+
+@app.route('/broadcast_status', methods=['GET'])
+def broadcast_status():
+    """Per-peer delivery results of recent broadcasts."""
+    status = ifchain.broadcaster.status()
+    status["gossip"] = {
+        "seen_transactions": len(ifchain.seen_transactions),
+        "seen_blocks": len(ifchain.seen_blocks),
+        "queued_announcements": len(ifchain.tx_announcements)
+    }
+    return jsonify(status), 200
   
 @app.route('/mine', methods=['GET'])
 def mine():
@@ -985,6 +2234,11 @@ def mine():
     if not miner_wallet:
         return jsonify({"error": "Miner wallet address required"}), 400
 
+    if request.args.get('background', '').lower() in ('1', 'true'):
+        if not ifchain.mine_in_background(miner_wallet):
+            return jsonify({"error": "Mining already in progress"}), 409
+        return jsonify({"message": "Mining started", "status_url": "/mining_status"}), 202
+
     result = ifchain.mine(miner_wallet)
 
     if not result:
@@ -992,6 +2246,14 @@ def mine():
 
     return jsonify({"message": result}), 200
     
+@app.route('/mining_status', methods=['GET'])
+def mining_status():
+    """Reports miner workers, hashrate and the result of the last background mining job."""
+    status = ifchain.miner.status()
+    status["difficulty"] = IFChain.difficulty
+    status["last_result"] = ifchain.last_mining_result
+    return jsonify(status), 200
+
 @app.route('/freeze_token', methods=['POST'])
 def freeze_token():
     data = request.get_json()
@@ -1094,7 +2356,7 @@ def execute_contract():
 
     # Charge gas fee
     gas_fee = ifchain.GAS_FEE_PER_CONTRACT_EXECUTION
-    caller_balance = ifchain.get_wallet_balance(caller).get("balance", {}).get("IFC", 0)
+    caller_balance = ifchain.spendable_balance(caller, "IFC")
 
     if caller_balance < gas_fee:
         return jsonify({"error": "Insufficient balance for gas fee"}), 400
@@ -1243,6 +2505,7 @@ def get_contract_logs(contract_name):
     }), 200
     
 @app.route('/contracts', methods=['GET'])
+@cached_response(lambda: ifchain.contracts_version)
 def get_all_contracts():
     """Fetch a list of all deployed smart contracts."""
     return jsonify({"contracts": list(ifchain.contracts.keys())}), 200
@@ -1257,78 +2520,81 @@ def delete_contract(contract_name):
     return jsonify({"error": "Contract not found"}), 404
   
 @app.route('/block/<int:index>', methods=['GET'])
+@cached_response(tip_version)
 def get_block(index):
     """Fetch details of a specific block by index."""
     if index < len(ifchain.chain):
-        return jsonify(ifchain.chain[index].__dict__), 200
+        return jsonify(ifchain.chain[index].to_dict()), 200
     return jsonify({"error": "Block not found"}), 404
     
+@app.route('/ledger/rebuild', methods=['POST'])
+def rebuild_ledger():
+    """Rebuilds the account ledger from the chain (admin/maintenance)."""
+    ifchain.rebuild_ledger()
+    return jsonify({"message": "Account ledger rebuilt", "height": ifchain.ledger.height}), 200
+
+@app.route('/ledger/check', methods=['GET'])
+def check_ledger():
+    """Checks the account ledger against a full chain scan."""
+    mismatches = ifchain.check_ledger()
+    return jsonify({
+        "consistent": not mismatches,
+        "height": ifchain.ledger.height,
+        "mismatches": mismatches
+    }), 200 if not mismatches else 409
+
 @app.route('/api/total-transactions', methods=['GET'])
 def get_total_transactions():
     """Retrieve the total number of transactions in the blockchain."""
-    total_transactions = sum(len(block.transactions) for block in ifchain.chain)
-
-    return jsonify({"count": total_transactions}), 200
+    return jsonify({"count": ifchain.stats.total_transactions}), 200
     
 @app.route('/wallet_transactions/<wallet_address>', methods=['GET'])
 def get_wallet_transactions(wallet_address):
-    """Retrieve all transactions involving a specific wallet address with filtering options."""
+    """Retrieve transactions involving a specific wallet address with filtering options, one page at a time."""
     
     token_filter = request.args.get('token')
     transaction_type = request.args.get('type')
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
 
-    transactions = []
+    direction = {"sent": AddressIndex.SENT, "received": AddressIndex.RECEIVED}.get(transaction_type)
 
-    for block in ifchain.chain:
+    in_date_range = None
+    if start_date and end_date:
         try:
-            # Ensure timestamp is always treated as a float
-            block_time = datetime.utcfromtimestamp(float(block.timestamp)).strftime('%Y-%m-%d %H:%M:%S')
-            block_timestamp = datetime.strptime(block_time, '%Y-%m-%d %H:%M:%S')
+            start_timestamp = date_to_epoch(start_date)
+            end_timestamp = date_to_epoch(end_date)
         except ValueError:
-            continue  # Skip invalid timestamps
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
 
-        for tx in block.transactions:
-            if wallet_address not in [tx["sender"], tx["receiver"]]:
-                continue
-            
-            if token_filter and tx["token"] != token_filter:
-                continue
+        def in_date_range(entry):
+            return start_timestamp <= ifchain.block_times.time_at(entry[0]) <= end_timestamp
 
-            if transaction_type == "sent" and tx["sender"] != wallet_address:
-                continue
-            if transaction_type == "received" and tx["receiver"] != wallet_address:
-                continue
+    # ✅ Answer from the address posting lists, only decoding blocks that hold matches
+    def locations_after(after):
+        return (entry[:2] for entry in
+                ifchain.address_index.iter_entries(wallet_address, direction, token_filter, after, in_date_range))
 
-            if start_date and end_date:
-                try:
-                    start_timestamp = datetime.strptime(start_date, "%Y-%m-%d")
-                    end_timestamp = datetime.strptime(end_date, "%Y-%m-%d")
-                    if not (start_timestamp <= block_timestamp <= end_timestamp):
-                        continue
-                except ValueError:
-                    return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
-
-            transactions.append({
-                "transaction_hash": tx["hash"],
-                "block_index": block.index,
-                "timestamp": block_time,
-                "sender": tx["sender"],
-                "receiver": tx["receiver"],
-                "amount": tx["amount"],
-                "token": tx["token"],
-                "tax": tx["tax"],
-                "net_amount": tx["net_amount"]
-            })
+    def build_item(height, position):
+        block = ifchain.chain[height]
+        tx = block.transactions[position]
+        return {
+            "transaction_hash": tx["hash"],
+            "block_index": block.index,
+            "timestamp": datetime.utcfromtimestamp(block.timestamp).strftime('%Y-%m-%d %H:%M:%S'),
+            "sender": tx["sender"],
+            "receiver": tx["receiver"],
+            "amount": tx["amount"],
+            "token": tx["token"],
+            "tax": tx.get("tax", tx.get("gas_fee")),  # Transactions record their fee as gas_fee
+            "net_amount": tx["net_amount"]
+        }
 
-    return jsonify({
-        "wallet_address": wallet_address,
-        "total_transactions": len(transactions),
-        "transactions": transactions
-    }), 200
+    return transaction_listing(locations_after, build_item, "transactions", "total_transactions",
+                               extra={"wallet_address": wallet_address})
     
 @app.route('/get_wallet_balance', methods=['GET'])
+@cached_response(lambda: (ifchain.tip_hash(), ifchain.pending_overlay.version, ifchain.wallet_balances_version))
 def api_get_wallet_balance():
     wallet_address = request.args.get('wallet_address')
 
@@ -1344,24 +2610,47 @@ def api_get_wallet_balance():
 
 @app.route('/search_transactions', methods=['GET'])
 def search_transactions():
-    """Search transactions by sender, receiver, token type, or all."""
+    """Search transactions by sender, receiver, token type, or all, one page at a time."""
     sender = request.args.get('sender')
     receiver = request.args.get('receiver')
     token = request.args.get('token')
 
-    matching_transactions = []
+    def locations_after(after):
+        if sender or receiver:
+            # Walk the posting list of one party and check the other on the entry itself
+            if sender:
+                address, direction = sender, AddressIndex.SENT
+            else:
+                address, direction = receiver, AddressIndex.RECEIVED
+
+            def other_party_matches(entry):
+                if not (sender and receiver):
+                    return True
+                tx = ifchain.chain[entry[0]].transactions[entry[1]]
+                return tx["receiver"] == receiver
+
+            return (entry[:2] for entry in
+                    ifchain.address_index.iter_entries(address, direction, token, after, other_party_matches))
+
+        # No address to index on: scan forward from the cursor, lazily
+        def scan():
+            for height in range(after[0] if after else 0, len(ifchain.chain)):
+                for position, tx in enumerate(ifchain.chain[height].transactions):
+                    if after and (height, position) <= after:
+                        continue
+                    if token and tx["token"] != token:
+                        continue
+                    yield height, position
+        return scan()
 
-    for block in ifchain.chain:
-        for tx in block.transactions:
-            if ((not sender or tx["sender"] == sender) and
-                (not receiver or tx["receiver"] == receiver) and
-                (not token or tx["token"] == token)):
-                matching_transactions.append(tx)
+    def build_item(height, position):
+        return ifchain.serve_transaction(ifchain.chain[height].transactions[position], height)
 
-    return jsonify({
-        "total_matches": len(matching_transactions),
-        "transactions": matching_transactions
-    }), 200
+    def total():
+        columns = ifchain.tx_columns
+        return columns.count(columns.select(sender=sender, receiver=receiver, token=token))
+
+    return transaction_listing(locations_after, build_item, "transactions", "total_matches", total=total)
     
 @app.route('/search_transaction_by_hash', methods=['GET'])
 def search_transaction_by_hash():
@@ -1371,21 +2660,48 @@ def search_transaction_by_hash():
     if not tx_hash:
         return jsonify({"error": "Transaction hash is required"}), 400
 
-    for block in ifchain.chain:
-        for tx in block.transactions:
-            if "hash" in tx and tx["hash"] == tx_hash:
-                return jsonify({
-                    "transaction": tx,
-                    "block_index": block.index,
-                    "timestamp": datetime.utcfromtimestamp(block.timestamp).strftime('%Y-%m-%d %H:%M:%S'),
-                    "status": tx["status"],
-                    "confirmations": tx["block_confirmations"],
-                    "gas_fee": tx["gas_fee"],
-                    "type": tx["tx_type"],
-                    "signatures": tx["signatures"]
-                }), 200
+    block, position = ifchain.find_transaction(tx_hash)
+    if block is not None:
+        tx = block.transactions[position]
+        served_tx = ifchain.serve_transaction(tx, block.index)
+        return jsonify({
+            "transaction": served_tx,
+            "block_index": block.index,
+            "timestamp": datetime.utcfromtimestamp(block.timestamp).strftime('%Y-%m-%d %H:%M:%S'),
+            "status": tx["status"],
+            "confirmations": served_tx["block_confirmations"],
+            "gas_fee": tx["gas_fee"],
+            "type": tx["tx_type"],
+            "signatures": tx["signatures"]
+        }), 200
 
     return jsonify({"error": "Transaction not found"}), 404
+
+@app.route('/tx_proof/<tx_hash>', methods=['GET'])
+def get_tx_proof(tx_hash):
+    """Merkle inclusion proof of a confirmed transaction: its leaf, the sibling branch and the block header.
+
+    The leaf is sha256 of 0x00 followed by the transaction serialized as JSON with sorted
+    keys. Fold the branch from the leaf upwards with sha256(0x01 + left + right) (a set bit
+    in `position` means the sibling is on the left) and compare with `header.merkle_root`. For version 2 headers that root is part
+    of the hashed header, so the header hash (and its PoW) covers the transaction.
+    """
+    block, position = ifchain.find_transaction(tx_hash)
+    if block is None:
+        return jsonify({"error": "Transaction not found"}), 404
+
+    tx = block.transactions[position]
+    return jsonify({
+        "tx_hash": tx_hash,
+        "transaction": tx,
+        "block_index": block.index,
+        "position": position,
+        "leaf": merkle.transaction_leaf(tx).hex(),
+        "branch": [node.hex() for node in block.merkle_proof(position)],
+        "header": block.header(),
+        "header_commits_merkle_root": block.version >= Block.HEADER_VERSION,
+        "confirmations": ifchain.confirmations(block.index)
+    }), 200
     
 @app.route('/search_transactions_by_date', methods=['GET'])
 def search_transactions_by_date():
@@ -1397,26 +2713,20 @@ def search_transactions_by_date():
         return jsonify({"error": "Both start_date and end_date are required"}), 400
 
     try:
-        start_timestamp = datetime.strptime(start_date, "%Y-%m-%d").timestamp()
-        end_timestamp = datetime.strptime(end_date, "%Y-%m-%d").timestamp()
+        heights = ifchain.heights_between_dates(start_date, end_date)
     except ValueError:
         return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
 
-    matched_transactions = []
-
-    for block in ifchain.chain:
-        if start_timestamp <= block.timestamp <= end_timestamp:
-            for tx in block.transactions:
-                matched_transactions.append({
-                    "transaction": tx,
-                    "block_index": block.index,
-                    "timestamp": datetime.utcfromtimestamp(block.timestamp).strftime('%Y-%m-%d %H:%M:%S')
-                })
+    # ✅ Only blocks inside the range are visited, found by bisecting the timestamp index
+    def locations_after(after):
+        start = bisect.bisect_left(heights, after[0]) if after else 0
+        for height in heights[start:]:
+            for position in range(len(ifchain.chain[height].transactions)):
+                if not after or (height, position) > after:
+                    yield height, position
 
-    return jsonify({
-        "total_matches": len(matched_transactions),
-        "transactions": matched_transactions
-    }), 200
+    return transaction_listing(locations_after, located_transaction, "transactions", "total_matches",
+                               total=lambda: ifchain.tx_columns.count_rows_of_heights(heights))
     
 @app.route('/search_transactions_by_amount', methods=['GET'])
 def search_transactions_by_amount():
@@ -1424,25 +2734,53 @@ def search_transactions_by_amount():
     min_amount = request.args.get('min_amount', type=float, default=0)
     max_amount = request.args.get('max_amount', type=float, default=float('inf'))
 
-    matched_transactions = []
+    # ✅ Vectorized range filter over the amount column, then fetch only the matching transactions
+    rows = ifchain.tx_columns.select(min_amount=min_amount, max_amount=max_amount)
 
-    for block in ifchain.chain:
-        for tx in block.transactions:
-            if min_amount <= tx["amount"] <= max_amount:
-                matched_transactions.append({
-                    "transaction": tx,
-                    "block_index": block.index,
-                    "timestamp": datetime.utcfromtimestamp(block.timestamp).strftime('%Y-%m-%d %H:%M:%S')
-                })
+    def locations_after(after):
+        return iter(ifchain.tx_columns.locations(ifchain.tx_columns.rows_after(rows, after)))
+
+    return transaction_listing(locations_after, located_transaction, "transactions", "total_matches",
+                               total=lambda: ifchain.tx_columns.count(rows))
+    
+@app.route('/api/transaction-aggregates', methods=['GET'])
+def get_transaction_aggregates():
+    """Count, totals and an amount histogram of the confirmed transactions matching the filters."""
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    bins = request.args.get('bins', type=int, default=10)
+
+    start_time = end_time = None
+    if start_date and end_date:
+        try:
+            start_time, end_time = date_to_epoch(start_date), date_to_epoch(end_date)
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+    if bins < 1:
+        return jsonify({"error": "bins must be positive"}), 400
+
+    columns = ifchain.tx_columns
+    rows = columns.select(
+        sender=request.args.get('sender'),
+        receiver=request.args.get('receiver'),
+        token=request.args.get('token'),
+        min_amount=request.args.get('min_amount', type=float),
+        max_amount=request.args.get('max_amount', type=float),
+        start_time=start_time,
+        end_time=end_time
+    )
+    counts, edges = columns.histogram("amount", rows, bins)
 
     return jsonify({
-        "total_matches": len(matched_transactions),
-        "transactions": matched_transactions
+        "count": columns.count(rows),
+        "total_amount": columns.sum("amount", rows),
+        "total_gas_fee": columns.sum("gas_fee", rows),
+        "amount_histogram": {"counts": counts, "bin_edges": edges}
     }), 200
-    
+
 @app.route('/search_transactions_advanced', methods=['GET'])
 def search_transactions_advanced():
-    """Search transactions using multiple filters."""
+    """Search transactions using multiple filters; `explain=1` adds the query plan to the response."""
     
     sender = request.args.get('sender')
     receiver = request.args.get('receiver')
@@ -1452,65 +2790,49 @@ def search_transactions_advanced():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     block_number = request.args.get('block_number', type=int)
+    explain = request.args.get('explain') in ('1', 'true')
 
-    matched_transactions = []
-
-    for block in ifchain.chain:
+    start_time = end_time = None
+    if start_date and end_date:
         try:
-            # Convert timestamp to Unix format if stored as a string
-            if isinstance(block.timestamp, str):
-                block_timestamp = datetime.strptime(block.timestamp, '%Y-%m-%d %H:%M:%S').timestamp()
-            else:
-                block_timestamp = float(block.timestamp)  # Ensure float for Unix timestamp
+            start_time, end_time = date_to_epoch(start_date), date_to_epoch(end_date)
         except ValueError:
-            return jsonify({"error": "Invalid block timestamp format"}), 400
-
-        block_time = datetime.utcfromtimestamp(block_timestamp).strftime('%Y-%m-%d %H:%M:%S')
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
 
-        if block_number is not None and block.index != block_number:
-            continue
-        if start_date and end_date:
-            try:
-                start_timestamp = datetime.strptime(start_date, "%Y-%m-%d").timestamp()
-                end_timestamp = datetime.strptime(end_date, "%Y-%m-%d").timestamp()
-                if not (start_timestamp <= block_timestamp <= end_timestamp):
-                    continue
-            except ValueError:
-                return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
-
-        for tx in block.transactions:
-            if sender and tx["sender"] != sender:
-                continue
-            if receiver and tx["receiver"] != receiver:
-                continue
-            if token and tx["token"] != token:
-                continue
-            if not (min_amount <= tx["amount"] <= max_amount):
-                continue
+    # ✅ The planner drives the search from the most selective index and checks the other filters on its rows
+    planner = TransactionQueryPlanner(ifchain.tx_columns, ifchain.address_index, ifchain.block_times)
+    rows, plan = planner.execute({
+        "sender": sender,
+        "receiver": receiver,
+        "token": token,
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "amount_range_given": 'min_amount' in request.args or 'max_amount' in request.args,
+        "start_time": start_time,
+        "end_time": end_time,
+        "block_number": block_number
+    })
 
-            matched_transactions.append({
-                "transaction": tx,
-                "block_index": block.index,
-                "timestamp": block_time
-            })
+    def locations_after(after):
+        return iter(ifchain.tx_columns.locations(ifchain.tx_columns.rows_after(rows, after)))
 
-    return jsonify({
-        "total_matches": len(matched_transactions),
-        "transactions": matched_transactions
-    }), 200
+    if explain:
+        print(f"DEBUG: search_transactions_advanced plan: {plan}")
+    return transaction_listing(locations_after, located_transaction, "transactions", "total_matches",
+                               extra={"plan": plan} if explain else None,
+                               total=lambda: ifchain.tx_columns.count(rows))
     
 @app.route('/block/<block_identifier>', methods=['GET'])
+@cached_response(tip_version)
 def get_block_details(block_identifier):
     """
     Retrieve block details by either block index or block hash.
     """
     
     if block_identifier.isdigit():
-        block_index = int(block_identifier)
-        block = next((b for b in ifchain.chain if b.index == block_index), None)
+        block = ifchain.get_block(int(block_identifier))
     else:
-        block_hash = block_identifier
-        block = next((b for b in ifchain.chain if b.hash == block_hash), None)
+        block = ifchain.find_block(block_identifier)
 
     if block is None:
         return jsonify({"error": "Block not found"}), 404
@@ -1518,6 +2840,7 @@ def get_block_details(block_identifier):
     return jsonify(block.to_dict()), 200
     
 @app.route('/block/latest', methods=['GET'])
+@cached_response(tip_version)
 def get_latest_block():
     """
     Retrieve the latest block.
@@ -1529,6 +2852,7 @@ def get_latest_block():
     return jsonify(latest_block.to_dict()), 200
     
 @app.route('/blockNumber', methods=['GET'])
+@cached_response(tip_version)
 def get_latest_block_number():
     """
     Retrieve the latest block number.
@@ -1536,8 +2860,8 @@ def get_latest_block_number():
     if not ifchain.chain:
         return jsonify({"error": "Blockchain is empty"}), 404
 
-    latest_block = ifchain.chain[-1]  # Get the last block
-    return jsonify({"blockNumber": latest_block.index}), 200
+    # Block index equals height, so the tip number comes from the index without decoding a block
+    return jsonify({"blockNumber": len(ifchain.chain) - 1}), 200
     
 @app.route('/debug_hashes', methods=['GET'])
 def debug_hashes():
@@ -1555,28 +2879,44 @@ def debug_hashes():
     
 @app.route('/pending_transactions', methods=['GET'])
 def get_pending_transactions():
-    """Returns all unconfirmed transactions."""
+    """Returns the unconfirmed transactions: all of them, one page (`limit`/`cursor`) or streamed as NDJSON."""
     
     instance = get_ifchain_instance()
+    ndjson = wants_ndjson()
+    paged = 'limit' in request.args or 'cursor' in request.args
+    try:
+        limit, after = page_args(cursor_size=1, default_limit=DEFAULT_PAGE_SIZE if paged and not ndjson else None)
+    except ValueError:
+        return jsonify({"error": "Invalid limit or cursor"}), 400
 
-    # ✅ Load pending transactions before returning
-    instance.load_pending_transactions()
+    # Journal sequence numbers only grow, so they stay valid cursors while transactions are mined
+    seqs = list(instance.unconfirmed_seqs)
+    transactions = list(instance.unconfirmed_transactions)
+    start = bisect.bisect_right(seqs, after[0]) if after else 0
+    end = len(seqs) if limit is None else min(len(seqs), start + limit)
 
-    print("DEBUG: Returning unconfirmed transactions:", instance.unconfirmed_transactions)
+    print(f"DEBUG: Returning {end - start} of {len(transactions)} unconfirmed transactions")
 
-    return jsonify({
-        "pending_transactions": instance.unconfirmed_transactions,
-        "total_pending": len(instance.unconfirmed_transactions)
-    }), 200
+    if ndjson:
+        return ndjson_response(transactions[position] for position in range(start, end))
+
+    response = {
+        "pending_transactions": transactions[start:end],
+        "total_pending": len(transactions)
+    }
+    if paged:
+        response["next_cursor"] = encode_cursor(seqs[end - 1]) if end < len(seqs) else None
+    return jsonify(response), 200
    
 @app.route('/blockchain_overview', methods=['GET'])
 def blockchain_overview():
     """Provides an overview of the blockchain status."""
     
-    total_blocks = len(ifchain.chain)
-    total_transactions = sum(len(block.transactions) for block in ifchain.chain)
-    total_wallets = len(set(tx["sender"] for block in ifchain.chain for tx in block.transactions) |
-                        set(tx["receiver"] for block in ifchain.chain for tx in block.transactions))
+    # ✅ Totals are maintained block by block, nothing here walks the chain
+    stats = ifchain.stats
+    total_blocks = stats.total_blocks
+    total_transactions = stats.total_transactions
+    total_wallets = stats.total_wallets
     total_contracts = len(ifchain.contracts)
     pending_transactions = len(ifchain.unconfirmed_transactions)
 
@@ -1586,6 +2926,9 @@ def blockchain_overview():
         "total_blocks": total_blocks,
         "total_transactions": total_transactions,
         "total_wallets": total_wallets,
+        "token_volume": stats.token_volume,
+        "gas_collected": stats.gas_collected,
+        "average_block_time": stats.average_block_time,
         "total_smart_contracts": total_contracts,
         "pending_transactions": pending_transactions,
         "latest_block": latest_block,
@@ -1595,9 +2938,10 @@ def blockchain_overview():
 @app.route('/block/<block_hash>', methods=['GET'])
 def get_block_by_hash(block_hash):
     """Retrieve a block by its hash."""
-    for block in ifchain.chain:
-        if block.compute_hash() == block_hash:
-            return jsonify(block.to_dict()), 200
+    # Same URL rule as /block/<block_identifier>, which is registered first and serves these requests
+    block = ifchain.find_block(block_hash)
+    if block is not None:
+        return jsonify(block.to_dict()), 200
     return jsonify({"error": "Block not found"}), 404
   
 @app.route('/peers', methods=['GET'])
@@ -1630,76 +2974,165 @@ def register_peer():
 @app.route('/receive_block', methods=['POST'])
 def receive_block():
     """Receives and validates a new block from peers before adding it."""
-    block_data = request.get_json()
+    if request.mimetype == block_codec.CONTENT_TYPE:
+        try:
+            block_data = block_codec.decode_block(request.get_data())
+        except block_codec.CodecError as e:
+            return jsonify({"error": f"Invalid block encoding: {e}"}), 400
+    else:
+        block_data = request.get_json()
     print(f"DEBUG: Received block from peer: {block_data}")  # 🔍 Debugging
 
-    new_block = Block(**block_data)
-
-    # Get the last block in the local chain
-    last_block = ifchain.last_block()
-
-    # Validate block index
-    if new_block.index != last_block.index + 1:
-        print(f"❌ Block rejected: Incorrect index. Expected {last_block.index + 1}, got {new_block.index}")
-        return jsonify({"error": "Block rejected: Incorrect index"}), 400
-
-    # Validate previous hash
-    if new_block.previous_hash != last_block.hash:
-        print(f"❌ Block rejected: Previous hash mismatch. Expected {last_block.hash}, got {new_block.previous_hash}")
-        return jsonify({"error": "Block rejected: Previous hash mismatch"}), 400
+    try:
+        new_block = Block.from_dict(block_data)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid block: {e}"}), 400
+    return block_received(new_block, request.headers.get(NODE_URL_HEADER))
 
-    # ✅ Fix: Accept the PoH hash from the incoming block
-    if hasattr(new_block, "poh_hash"):
-        print(f"🔄 Updating PoH hash from peer: {new_block.poh_hash}")
-        ifchain.poh.current_hash = new_block.poh_hash  # ✅ Accept PoH hash
+@app.route('/compact_block', methods=['POST'])
+def receive_compact_block():
+    """Receives a new block as its header plus short transaction ids and rebuilds it from the mempool.
 
-    # If all checks pass, add the block
-    if ifchain.add_block(new_block, new_block.hash):
-        print(f"✅ Block {new_block.index} accepted and added to chain!")
-        return jsonify({"message": "Block accepted"}), 200
+    Answers {"missing": [positions]} while transactions are not in the pool; the sender then
+    sends the message again with those transactions included in full.
+    """
+    try:
+        new_block, missing = ifchain.receive_compact_block(request.get_json(silent=True))
+    except compact_block.CompactBlockError as e:
+        return jsonify({"error": str(e)}), 400
+    if missing:
+        print(f"DEBUG: Compact block is missing {len(missing)} transactions, requesting them.")
+        return jsonify({"missing": missing}), 200
+
+    print(f"DEBUG: Rebuilt compact block {new_block.index} from the mempool.")
+    return block_received(new_block, request.headers.get(NODE_URL_HEADER))
+
+def block_received(new_block, peer):
+    """Hands a block from `peer` to the block tree and answers with the outcome."""
+    # ✅ The block tree decides: extend the tip, keep a side branch, or reorg to a heavier branch
+    status = ifchain.accept_block(new_block, peer)
+
+    if status in ("extended", "reorg"):
+        # ✅ Fix: Accept the PoH hash from the incoming block
+        if hasattr(new_block, "poh_hash"):
+            print(f"🔄 Updating PoH hash from peer: {new_block.poh_hash}")
+            ifchain.poh.current_hash = new_block.poh_hash  # ✅ Accept PoH hash
+        print(f"✅ Block {new_block.index} accepted and added to chain ({status})!")
+        ifchain.broadcast_block(new_block.to_dict(), origin=peer)  # ✅ Relay the new tip to the other peers
+        message = "Block accepted" if status == "extended" else "Block accepted, chain reorganized"
+        return jsonify({"message": message}), 200
+
+    if status == "side":
+        print(f"DEBUG: Block {new_block.index} stored on a side branch.")
+        return jsonify({"message": "Block stored on a side branch"}), 202
+
+    if status == "duplicate":
+        return jsonify({"message": "Block already known"}), 200
+
+    if status == "orphan":
+        print(f"DEBUG: Block {new_block.index} has an unknown parent, pooled while its ancestors are fetched.")
+        return jsonify({"message": "Orphan block stored, requesting missing parents"}), 202
 
     print("❌ Block rejected: Failed validation.")
     return jsonify({"error": "Block rejected"}), 400
 
 
 
+@app.route('/chain_tips', methods=['GET'])
+def get_chain_tips():
+    """The main chain tip and the tips of the side branches kept in the block tree."""
+    tree = ifchain.block_tree
+    parents = {block.previous_hash for block, _ in tree.side.values()}
+    tips = [{
+        "hash": ifchain.tip_hash(),
+        "height": len(ifchain.chain) - 1,
+        "work": tree.tip_work,
+        "status": "active"
+    }]
+    for block_hash, (block, work) in tree.side.items():
+        if block_hash not in parents:
+            tips.append({
+                "hash": block_hash,
+                "height": block.index,
+                "work": work,
+                "branch_length": len(tree.branch(block_hash)),
+                "status": "side"
+            })
+    return jsonify({"tips": tips}), 200
+
 @app.route('/receive_transaction', methods=['POST'])
 def receive_transaction():
-    """Receives a transaction from another node and prevents rebroadcast loops."""
+    """Receives a transaction from another node; it keeps its hash and is never relayed back to the sender."""
 
     tx_data = request.get_json()
     print(f"Received transaction from peer: {tx_data}")
 
-    # Add 'origin' field to prevent resending it back
-    tx_data["origin"] = request.host_url.rstrip('/')
-
     required_fields = ["sender", "receiver", "amount", "token"]
     if not all(field in tx_data for field in required_fields):
         print("Transaction failed: Missing required fields.")
         return jsonify({"error": "Invalid transaction data"}), 400
 
-    # Prevent duplicate transactions
-    existing_hashes = {tx["hash"] for tx in ifchain.unconfirmed_transactions}
-    if tx_data["hash"] in existing_hashes:
+    if not tx_data.get("hash"):
+        # A bare transfer rather than a relayed transaction, hash and announce it as a new one
+        if ifchain.add_new_transaction(tx_data):
+            return jsonify({"message": "Transaction received and added"}), 201
+        return jsonify({"error": "Invalid transaction"}), 400
+
+    status = ifchain.accept_relayed_transaction(tx_data, request.headers.get(NODE_URL_HEADER))
+
+    if status == "accepted":
+        print(f"Transaction accepted and added: {tx_data['hash']}")
+        return jsonify({"message": "Transaction received and added"}), 201
+
+    if status == "duplicate":
         print(f"Transaction already exists, skipping: {tx_data['hash']}")
         return jsonify({"message": "Transaction already exists"}), 200
 
-    success = ifchain.add_new_transaction(tx_data)
-    
-    if success:
-        print(f"Transaction accepted and added: {tx_data}")
-        return jsonify({"message": "Transaction received and added"}), 201
+    # Reject replays of transactions that are already in a block
+    if status == "confirmed":
+        print(f"Transaction already confirmed, rejecting: {tx_data['hash']}")
+        return jsonify({"error": "Transaction already confirmed"}), 409
 
     print(f"Transaction rejected: {tx_data}")
     return jsonify({"error": "Invalid transaction"}), 400
 
+@app.route('/receive_transactions', methods=['POST'])
+def receive_transactions():
+    """Bodies of the announced transactions this node asked for via /inv."""
+    data = request.get_json(silent=True) or {}
+    transactions = data.get("transactions")
+    if not isinstance(transactions, list):
+        return jsonify({"error": "Expected a list of transactions"}), 400
+
+    origin = request.headers.get(NODE_URL_HEADER)
+    results = [ifchain.accept_relayed_transaction(tx, origin) for tx in transactions]
+    counts = {status: results.count(status) for status in ("accepted", "duplicate", "confirmed", "rejected")}
+    print(f"DEBUG: Received {len(transactions)} relayed transactions: {counts}")
+    return jsonify(counts), 200
+
+@app.route('/inv', methods=['POST'])
+def receive_inventory():
+    """Takes a peer's announcement of transaction or block hashes and answers with the ones this node wants.
+
+    Body: {"type": "tx" | "block", "hashes": [...]}. The announcing peer then sends only the
+    wanted bodies, to /receive_transactions or /receive_block.
+    """
+    data = request.get_json(silent=True) or {}
+    kind = data.get("type")
+    hashes = data.get("hashes")
+    if kind not in ("tx", "block") or not isinstance(hashes, list):
+        return jsonify({"error": "Expected a type of 'tx' or 'block' and a list of hashes"}), 400
+    if len(hashes) > IFChain.MAX_INVENTORY:
+        return jsonify({"error": f"At most {IFChain.MAX_INVENTORY} hashes per inventory"}), 400
+
+    return jsonify({"wanted": ifchain.wanted_inventory(kind, hashes)}), 200
+
     
 @app.route('/sync_chain', methods=['GET'])
 def sync_chain():
     """API endpoint to synchronize blockchain with peers."""
-    if ifchain.sync_chain():
-        return jsonify({"message": "Blockchain synchronized successfully."}), 200
-    return jsonify({"error": "No longer chain found or sync failed."}), 400
+    result, status = ifchain.sync_chain()
+    return jsonify(result), status
     
 @app.route('/execute_contract_call', methods=['POST', 'GET'])
 def execute_contract_call():
@@ -1797,14 +3230,53 @@ def get_gas_fee():
     instance = get_ifchain_instance()
     return jsonify({"gas_fee": instance.gas_fee}), 200
     
+@app.route('/headers', methods=['GET'])
+@cached_response(tip_version)
+def get_headers():
+    """Block headers from height `from` on (up to `count`, at most MAX_HEADERS), for headers-first sync."""
+    try:
+        from_height = max(0, int(request.args.get('from', 0)))
+        count = min(max(0, int(request.args.get('count', IFChain.MAX_HEADERS))), IFChain.MAX_HEADERS)
+    except ValueError:
+        return jsonify({"error": "Invalid from or count"}), 400
+
+    length = len(ifchain.chain)
+    headers = [ifchain.header_at(height) for height in range(from_height, min(length, from_height + count))]
+    return jsonify({
+        "chain_id": ifchain.chain_id,
+        "length": length,
+        "tip_hash": ifchain.tip_hash(),
+        "from": from_height,
+        "headers": headers
+    }), 200
+
+@app.route('/blocks', methods=['GET'])
+def get_blocks():
+    """Full blocks `from`..`to` (inclusive, at most MAX_BLOCK_RANGE of them), for headers-first sync."""
+    try:
+        from_height = max(0, int(request.args['from']))
+        to_height = int(request.args.get('to', from_height + IFChain.MAX_BLOCK_RANGE - 1))
+    except (KeyError, ValueError):
+        return jsonify({"error": "Invalid from or to"}), 400
+
+    length = len(ifchain.chain)
+    end_height = min(length, to_height + 1, from_height + IFChain.MAX_BLOCK_RANGE)
+    blocks = [ifchain.chain[height].to_dict() for height in range(from_height, end_height)]
+    return jsonify({
+        "chain_id": ifchain.chain_id,
+        "length": length,
+        "from": from_height,
+        "to": end_height - 1,
+        "blocks": blocks
+    }), 200
+
 @app.route('/blockchain', methods=['GET'])
 def get_blockchain():
     return get_chain()
     
 @app.route('/save_blockchain', methods=['POST'])
 def save_blockchain():
-    global blockchain  # Ensure Flask recognizes the blockchain instance
-    blockchain.save_blockchain_state()
+    ifchain.save_blockchain_state()
     return jsonify({"message": "Blockchain state saved successfully"}), 200
     
 @app.route("/", methods=["GET"])
@@ -1828,12 +3300,16 @@ def get_transactions():
     
 @app.route('/api/stats', methods=['POST'])
 def get_stats():
+    stats = ifchain.stats
+    average_block_time = stats.average_block_time
     return jsonify({
-        "totalSupply": "1,000,000 IFC",
-        "totalTransactions": 5000,
-        "totalBlocks": 100,
-        "totalWallets": 5000,
-        "avgBlockTime": "2.1s"
+        "totalSupply": f"{ifchain.token_supply:,} IFC",
+        "totalTransactions": stats.total_transactions,
+        "totalBlocks": stats.total_blocks,
+        "totalWallets": stats.total_wallets,
+        "avgBlockTime": f"{average_block_time:.1f}s" if average_block_time is not None else None,
+        "tokenVolume": stats.token_volume,
+        "gasCollected": stats.gas_collected
     })
     
 @app.route('/status', methods=['GET'])
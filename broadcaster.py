@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class PeerBroadcaster:
+    """Delivers messages to peers in the background over pooled HTTP connections.
+
+    Every peer gets its own `requests.Session`, so repeated broadcasts reuse
+    keep-alive connections instead of opening a new one each time. A broadcast
+    queues one delivery per peer and returns at once; a bounded thread pool
+    drains the per-peer queues in parallel. Each peer's messages are sent in
+    the order they were queued (a block is never overtaken by its successor),
+    and a peer that stops answering only delays its own queue, which is capped
+    at MAX_QUEUE messages (oldest dropped first). Outcomes are kept in
+    `results` and summarized per peer in `peer_stats`.
+    """
+
+    WORKERS = 8
+    MAX_QUEUE = 1000  # Pending messages per peer
+    RESULT_HISTORY = 200
+
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or self.WORKERS)
+        self.results = deque(maxlen=self.RESULT_HISTORY)
+        self.peer_stats = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="broadcast")
+        self._sessions = {}
+        self._queues = {}
+        self._draining = set()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)  # Notified when a peer's queue runs empty
+
+    def session(self, peer):
+        """The persistent session used for `peer`."""
+        with self._lock:
+            session = self._sessions.get(peer)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[peer] = session
+            return session
+
+    def broadcast(self, peers, description, deliver, on_result=None):
+        """Queue `deliver(session, peer)` for every peer and return immediately.
+
+        `deliver` sends the message and returns the peer's response; 2xx counts
+        as delivered. `on_result(result)` is called from a worker thread with
+        each peer's outcome.
+        """
+        for peer in list(peers):
+            self._enqueue(peer, (description, deliver, on_result))
+
+    def _enqueue(self, peer, job):
+        with self._lock:
+            queue = self._queues.setdefault(peer, deque())
+            if len(queue) >= self.MAX_QUEUE:
+                dropped = queue.popleft()
+                print(f"WARNING: Broadcast queue for {peer} is full, dropped {dropped[0]}")
+            queue.append(job)
+            if peer in self._draining:
+                return
+            self._draining.add(peer)
+        self._executor.submit(self._drain, peer)
+
+    def _drain(self, peer):
+        # One message per task, then requeue behind the other peers so a slow peer cannot hog a worker
+        with self._lock:
+            job = self._queues[peer].popleft()
+        try:
+            self._deliver(peer, *job)
+        except Exception as e:  # Raised by on_result; the executor would swallow it silently
+            print(f"ERROR: Result callback for {job[0]} to {peer} failed: {e}")
+        finally:
+            # Move on even after a failure, or the peer stays marked as draining with nobody draining it
+            with self._lock:
+                finished = not self._queues[peer]
+                if finished:
+                    del self._queues[peer]
+                    self._draining.discard(peer)
+                    self._idle.notify_all()
+            if not finished:
+                self._executor.submit(self._drain, peer)
+
+    def _deliver(self, peer, description, deliver, on_result):
+        started = time.perf_counter()
+        result = {"peer": peer, "message": description, "time": time.time()}
+        try:
+            response = deliver(self.session(peer), peer)
+            result["status"] = response.status_code
+            result["delivered"] = response.ok
+            if not response.ok:
+                result["error"] = response.text[:200]
+                print(f"WARNING: Peer {peer} rejected {description} Status: {response.status_code} Response: {response.text[:200]}")
+            else:
+                print(f"DEBUG: Sent {description} to {peer} Status: {response.status_code}")
+        except Exception as e:  # Mostly requests' connection errors and timeouts
+            result["status"] = None
+            result["delivered"] = False
+            result["error"] = str(e)
+            print(f"WARNING: Failed to send {description} to {peer}: {e}")
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+        with self._lock:
+            self.results.append(result)
+            stats = self.peer_stats.setdefault(peer, {"delivered": 0, "failed": 0, "last_error": None})
+            if result["delivered"]:
+                stats["delivered"] += 1
+            else:
+                stats["failed"] += 1
+                stats["last_error"] = result["error"]
+            stats["last_status"] = result["status"]
+            stats["last_elapsed_ms"] = result["elapsed_ms"]
+
+        if on_result is not None:
+            on_result(result)
+
+    def status(self):
+        """Per-peer delivery counts, queued messages and the most recent outcomes."""
+        with self._lock:
+            return {
+                "peers": {peer: dict(stats) for peer, stats in self.peer_stats.items()},
+                "pending": {peer: len(queue) for peer, queue in self._queues.items()},
+                "recent": list(self.results)
+            }
+
+    def close(self):
+        """Finish queued deliveries and close every session."""
+        with self._idle:
+            # Draining tasks resubmit themselves, so wait for the queues to empty before shutting down
+            self._idle.wait_for(lambda: not self._draining)
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
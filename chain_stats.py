@@ -0,0 +1,140 @@
+import json
+import os
+
+
+class ChainStats:
+    """Running totals over the confirmed chain, updated once per block.
+
+    Tracks block and transaction counts, the distinct wallets seen as sender
+    or receiver, the volume moved per token, the gas collected and the
+    timestamps needed for the average block time, so the overview endpoints
+    answer without walking the chain. Wallets are kept as exact reference
+    counts (transactions mentioning each address) so a reverted block can take
+    its wallets back out. Snapshots carry the height and tip hash they were
+    taken at, like the account ledger's.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.height = 0
+        self.tip_hash = None
+        self.total_transactions = 0
+        self.wallet_refs = {}  # Address -> number of confirmed transactions mentioning it
+        self.token_volume = {}
+        self.gas_collected = 0.0
+        self.first_timestamp = None
+        self.tip_timestamp = None
+
+    @staticmethod
+    def _number(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
+
+    @staticmethod
+    def transaction_wallets(tx):
+        """Distinct non-empty sender/receiver addresses of one transaction."""
+        return {address for address in (tx.get("sender"), tx.get("receiver")) if address}
+
+    def apply_block(self, block):
+        for tx in block.transactions:
+            for address in self.transaction_wallets(tx):
+                self.wallet_refs[address] = self.wallet_refs.get(address, 0) + 1
+            token = tx.get("token", "IFC")
+            self.token_volume[token] = self.token_volume.get(token, 0.0) + self._number(tx.get("amount"))
+            self.gas_collected += self._number(tx.get("gas_fee", 0))
+        self.total_transactions += len(block.transactions)
+        if self.first_timestamp is None:
+            self.first_timestamp = block.timestamp
+        self.tip_timestamp = block.timestamp
+        self.height = block.index + 1
+        self.tip_hash = block.hash
+
+    def revert_block(self, block, previous_hash=None, previous_timestamp=None):
+        """Undo the tip block; `previous_hash` and `previous_timestamp` describe the new tip."""
+        for tx in block.transactions:
+            for address in self.transaction_wallets(tx):
+                refs = self.wallet_refs.get(address, 0) - 1
+                if refs > 0:
+                    self.wallet_refs[address] = refs
+                else:
+                    self.wallet_refs.pop(address, None)
+            token = tx.get("token", "IFC")
+            self.token_volume[token] = self.token_volume.get(token, 0.0) - self._number(tx.get("amount"))
+            self.gas_collected -= self._number(tx.get("gas_fee", 0))
+        self.total_transactions -= len(block.transactions)
+        self.height = block.index
+        self.tip_hash = previous_hash if previous_hash is not None else block.previous_hash
+        self.tip_timestamp = previous_timestamp if self.height > 0 else None
+        if self.height == 0:
+            self.first_timestamp = None
+
+    @property
+    def total_blocks(self):
+        return self.height
+
+    @property
+    def total_wallets(self):
+        return len(self.wallet_refs)
+
+    @property
+    def average_block_time(self):
+        """Mean seconds between consecutive blocks, or None with fewer than two blocks."""
+        if self.height < 2 or self.first_timestamp is None or self.tip_timestamp is None:
+            return None
+        return (self.tip_timestamp - self.first_timestamp) / (self.height - 1)
+
+    def summary(self):
+        return {
+            "total_blocks": self.total_blocks,
+            "total_transactions": self.total_transactions,
+            "total_wallets": self.total_wallets,
+            "token_volume": dict(self.token_volume),
+            "gas_collected": self.gas_collected,
+            "average_block_time": self.average_block_time
+        }
+
+    def rebuild(self, chain):
+        """Recompute every total by applying the whole chain."""
+        self._reset()
+        for block in chain:
+            self.apply_block(block)
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "height": self.height,
+                "tip_hash": self.tip_hash,
+                "total_transactions": self.total_transactions,
+                "wallet_refs": self.wallet_refs,
+                "token_volume": self.token_volume,
+                "gas_collected": self.gas_collected,
+                "first_timestamp": self.first_timestamp,
+                "tip_timestamp": self.tip_timestamp
+            }, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Load a snapshot; returns False if it is missing or unreadable."""
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, "r") as f:
+                snapshot = json.load(f)
+        except json.JSONDecodeError:
+            print(f"ERROR: Corrupted chain stats snapshot {path}, it will be rebuilt.")
+            return False
+
+        self.height = snapshot.get("height", 0)
+        self.tip_hash = snapshot.get("tip_hash")
+        self.total_transactions = snapshot.get("total_transactions", 0)
+        self.wallet_refs = snapshot.get("wallet_refs", {})
+        self.token_volume = snapshot.get("token_volume", {})
+        self.gas_collected = snapshot.get("gas_collected", 0.0)
+        self.first_timestamp = snapshot.get("first_timestamp")
+        self.tip_timestamp = snapshot.get("tip_timestamp")
+        return True
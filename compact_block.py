@@ -0,0 +1,101 @@
+"""Compact block messages: a block header plus short ids of its transactions.
+
+Peers almost always hold a new block's transactions in their mempool
+already, so instead of the full bodies the sender lists a short id per
+transaction and includes ("prefills") only those the receiver is unlikely
+to have. A short id is a SHORT_ID_BYTES BLAKE2b MAC of the transaction hash
+keyed with the block hash, so ids change from block to block and collisions
+cannot be prepared in advance. The receiver rebuilds the block from its
+pool and reports the positions it could not fill; a short id matching two
+different pool transactions counts as missing. The rebuilt block is only
+trusted once its Merkle root matches the header.
+
+Message layout (JSON):
+
+    {"header": {...},                     # Block.header(), merkle_root included
+     "short_ids": ["<hex>", ...],         # one per transaction, in block order
+     "prefilled": {"<position>": {...}}}  # transactions sent in full
+"""
+import hashlib
+
+SHORT_ID_BYTES = 6
+
+
+class CompactBlockError(ValueError):
+    """Raised when a compact block message is malformed."""
+
+
+def short_id_key(block_hash):
+    return hashlib.sha256(str(block_hash).encode()).digest()
+
+
+def short_id(key, tx_hash):
+    return hashlib.blake2b(str(tx_hash).encode(), key=key, digest_size=SHORT_ID_BYTES).hexdigest()
+
+
+def encode_compact_block(header, transactions, prefill):
+    """Compact message for a block; transactions for which `prefill(tx)` is true are sent in full."""
+    key = short_id_key(header["hash"])
+    return {
+        "header": header,
+        "short_ids": [short_id(key, tx.get("hash")) for tx in transactions],
+        "prefilled": {str(position): tx for position, tx in enumerate(transactions) if prefill(tx)}
+    }
+
+
+def with_prefilled(message, transactions, positions):
+    """A copy of `message` that also carries the transactions at `positions` in full."""
+    prefilled = dict(message["prefilled"])
+    for position in positions:
+        if 0 <= position < len(transactions):
+            prefilled[str(position)] = transactions[position]
+    return dict(message, prefilled=prefilled)
+
+
+def parse(message):
+    """(header, short_ids, prefilled by position) of a message (raises CompactBlockError if malformed)."""
+    try:
+        header = message["header"]
+        short_ids = message["short_ids"]
+        prefilled = {int(position): tx for position, tx in message.get("prefilled", {}).items()}
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise CompactBlockError(f"Malformed compact block: {e}")
+    if not isinstance(header, dict) or "hash" not in header:
+        raise CompactBlockError("Malformed compact block: header without a hash")
+    if not isinstance(short_ids, list) or any(not 0 <= position < len(short_ids) for position in prefilled):
+        raise CompactBlockError("Malformed compact block: prefilled positions out of range")
+    return header, short_ids, prefilled
+
+
+def reconstruct(message, pool, as_block_transaction=lambda tx: tx):
+    """Fills a block's transactions from the prefilled ones and the pending transactions in `pool`.
+
+    Pool transactions are passed through `as_block_transaction` (the form they take inside a
+    block). Returns (transactions, missing, from_pool): `missing` lists the positions that could
+    not be filled (None there in `transactions`), `from_pool` those filled from the pool.
+    """
+    header, short_ids, prefilled = parse(message)
+    key = short_id_key(header["hash"])
+    wanted = {sid for position, sid in enumerate(short_ids) if position not in prefilled}
+
+    matches, ambiguous = {}, set()
+    for tx in pool:
+        sid = short_id(key, tx.get("hash"))
+        if sid not in wanted:
+            continue
+        match = matches.get(sid)
+        if match is None:
+            matches[sid] = tx
+        elif match != tx:
+            ambiguous.add(sid)
+
+    transactions, missing, from_pool = [], [], []
+    for position, sid in enumerate(short_ids):
+        tx = prefilled.get(position)
+        if tx is None and sid not in ambiguous and sid in matches:
+            tx = as_block_transaction(matches[sid])
+            from_pool.append(position)
+        if tx is None:
+            missing.append(position)
+        transactions.append(tx)
+    return transactions, missing, from_pool
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class SeenCache:
+    """Hashes of transactions or blocks this node has already handled, forgotten after TTL seconds.
+
+    Gossip consults it before asking a peer for a body, so an item announced
+    by several peers is fetched once, and one that was rejected is not fetched
+    again from the next peer announcing it. At most MAX_ENTRIES hashes are
+    kept (oldest evicted first); expiry and eviction only cost a redundant
+    fetch, never a wrong answer, since the chain and mempool are checked too.
+    """
+
+    MAX_ENTRIES = 100_000
+    TTL = 1800
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.ttl = ttl or self.TTL
+        self._entries = OrderedDict()  # Key -> time it was first seen
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            self._expire(time.time())
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expire(self, now):
+        while self._entries:
+            key, seen_at = next(iter(self._entries.items()))
+            if now - seen_at < self.ttl:
+                break
+            del self._entries[key]
+
+    def add(self, key):
+        """Remember `key`; returns False if it was already seen within TTL."""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            if key in self._entries:
+                return False
+            self._entries[key] = now
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+
+class InventoryQueue:
+    """Batches items to announce so a burst goes out as one inventory per peer.
+
+    `add` collects (item, origin) pairs. The first one arms a timer, and after
+    FLUSH_DELAY seconds, or as soon as MAX_BATCH items are waiting,
+    `flush(batch)` is called with everything collected so far.
+    """
+
+    FLUSH_DELAY = 0.1
+    MAX_BATCH = 500
+
+    def __init__(self, flush, delay=None, max_batch=None):
+        self.flush = flush
+        self.delay = delay or self.FLUSH_DELAY
+        self.max_batch = max_batch or self.MAX_BATCH
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, item, origin=None):
+        batch = None
+        with self._lock:
+            self._pending.append((item, origin))
+            if len(self._pending) >= self.max_batch:
+                batch = self._take()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.delay, self._on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self.flush(batch)
+
+    def _take(self):
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            batch, self._pending = self._pending, []
+        if batch:
+            self.flush(batch)
@@ -0,0 +1,150 @@
+import json
+import os
+
+
+class AccountLedger:
+    """Per-address, per-token balances derived from confirmed blocks.
+
+    Applying a block costs O(transactions in the block), so a balance lookup
+    never has to walk the chain. `height` is the number of blocks applied so
+    far; blocks must be applied (and reverted) in height order. Snapshots are
+    saved with the hash of the last applied block so a restart only has to
+    replay blocks mined after the snapshot.
+    """
+
+    def __init__(self):
+        self.balances = {}
+        self.height = 0
+        self.tip_hash = None
+
+    @staticmethod
+    def transaction_deltas(tx):
+        """Yield (address, token, delta) for one transaction, matching the full-scan balance rules."""
+        token = tx.get("token", "IFC")
+        if tx.get("receiver") is not None:
+            yield tx["receiver"], token, tx.get("net_amount", tx.get("amount", 0))
+        if tx.get("sender") is not None:
+            yield tx["sender"], token, -tx.get("amount", 0)
+
+    def _add(self, address, token, delta):
+        account = self.balances.setdefault(address, {})
+        account[token] = account.get(token, 0) + delta
+
+    def apply_block(self, block):
+        for tx in block.transactions:
+            for address, token, delta in self.transaction_deltas(tx):
+                self._add(address, token, delta)
+        self.height = block.index + 1
+        self.tip_hash = block.hash
+
+    def revert_block(self, block, previous_hash=None):
+        """Undo the tip block; `previous_hash` becomes the new tip hash."""
+        for tx in reversed(block.transactions):
+            for address, token, delta in self.transaction_deltas(tx):
+                self._add(address, token, -delta)
+        self.height = block.index
+        self.tip_hash = previous_hash if previous_hash is not None else block.previous_hash
+
+    def balance(self, address):
+        return dict(self.balances.get(address, {}))
+
+    def rebuild(self, chain):
+        """Recompute every balance from scratch by applying the whole chain."""
+        self.balances = {}
+        self.height = 0
+        self.tip_hash = None
+        for block in chain:
+            self.apply_block(block)
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"height": self.height, "tip_hash": self.tip_hash, "balances": self.balances}, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Load a snapshot; returns False if it is missing or unreadable."""
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, "r") as f:
+                snapshot = json.load(f)
+        except json.JSONDecodeError:
+            print(f"ERROR: Corrupted ledger snapshot {path}, it will be rebuilt.")
+            return False
+
+        self.balances = snapshot.get("balances", {})
+        self.height = snapshot.get("height", 0)
+        self.tip_hash = snapshot.get("tip_hash")
+        return True
+
+
+class PendingOverlay:
+    """Per-address, per-token balance deltas of the transactions waiting in the mempool.
+
+    It is updated as transactions enter and leave the pool, so a spendable
+    balance is the confirmed ledger balance plus one dictionary lookup here.
+    It also counts the pending transaction hashes, so membership in the pool
+    is a lookup too. `version` changes whenever the deltas do.
+    """
+
+    EPSILON = 1e-9  # Deltas this close to zero are float residue from add/remove pairs
+
+    def __init__(self):
+        self.deltas = {}
+        self.hashes = {}  # Pending tx hash -> number of pool entries carrying it
+        self.version = 0
+
+    def __contains__(self, tx_hash):
+        return tx_hash in self.hashes
+
+    def _count(self, tx, step):
+        tx_hash = tx.get("hash")
+        if tx_hash is None:
+            return
+        count = self.hashes.get(tx_hash, 0) + step
+        if count > 0:
+            self.hashes[tx_hash] = count
+        else:
+            self.hashes.pop(tx_hash, None)
+
+    def _add(self, address, token, delta):
+        account = self.deltas.setdefault(address, {})
+        value = account.get(token, 0) + delta
+        if abs(value) < self.EPSILON:
+            account.pop(token, None)
+            if not account:
+                del self.deltas[address]
+        else:
+            account[token] = value
+
+    def add(self, tx):
+        for address, token, delta in AccountLedger.transaction_deltas(tx):
+            self._add(address, token, delta)
+        self._count(tx, 1)
+        self.version += 1
+
+    def remove(self, tx):
+        for address, token, delta in AccountLedger.transaction_deltas(tx):
+            self._add(address, token, -delta)
+        self._count(tx, -1)
+        self.version += 1
+
+    def rebuild(self, transactions):
+        self.deltas = {}
+        self.hashes = {}
+        self.version += 1
+        for tx in transactions:
+            self.add(tx)
+
+    def clear(self):
+        self.deltas = {}
+        self.hashes = {}
+        self.version += 1
+
+    def delta(self, address, token=None):
+        """The pending delta of one token, or of every token as a dict when `token` is None."""
+        account = self.deltas.get(address, {})
+        if token is None:
+            return dict(account)
+        return account.get(token, 0)
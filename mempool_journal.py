@@ -0,0 +1,119 @@
+import json
+import os
+
+
+class MempoolJournal:
+    """Append-only journal of mempool changes.
+
+    Each admitted transaction is written as one `add` record with a sequence
+    number, so admission costs O(transaction size) instead of re-serializing
+    the whole pool. Transactions leave the pool through `remove` records or a
+    single `mined` marker that drops every transaction up to a sequence number.
+    Replaying the journal rebuilds the pool; once dead records outnumber live
+    ones the journal is compacted down to the live transactions.
+    """
+
+    COMPACT_MIN_DEAD_RECORDS = 1000
+
+    def __init__(self, path, fsync=False):
+        self.path = path
+        self.fsync = fsync
+        self.last_seq = 0
+        self.live_records = 0
+        self.dead_records = 0
+        self._file = None
+
+    def _write(self, record):
+        if self._file is None or self._file.closed:
+            self._file = open(self.path, "a")
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def replay(self):
+        """Rebuild the live pool from the journal as a list of (seq, transaction)."""
+        live = {}
+        self.last_seq = 0
+        self.dead_records = 0
+        if not os.path.exists(self.path):
+            self.live_records = 0
+            return []
+
+        valid_bytes = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Torn write at the tail, everything after it is discarded
+                if not line.endswith(b"\n"):
+                    break
+                valid_bytes += len(line)
+
+                op = record.get("op")
+                if op == "add":
+                    live[record["seq"]] = record["tx"]
+                    self.last_seq = max(self.last_seq, record["seq"])
+                elif op == "remove":
+                    if live.pop(record["seq"], None) is not None:
+                        self.dead_records += 1
+                    self.dead_records += 1
+                elif op == "mined":
+                    for seq in [seq for seq in live if seq <= record["through"]]:
+                        del live[seq]
+                        self.dead_records += 1
+                    self.dead_records += 1
+
+        if valid_bytes != os.path.getsize(self.path):
+            print(f"WARNING: Truncating torn tail of mempool journal {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_bytes)
+
+        self.live_records = len(live)
+        return sorted(live.items())
+
+    def add(self, tx):
+        """Journal a newly admitted transaction and return its sequence number."""
+        self.last_seq += 1
+        self._write({"op": "add", "seq": self.last_seq, "tx": tx})
+        self.live_records += 1
+        return self.last_seq
+
+    def remove(self, seq):
+        """Journal the removal of one pooled transaction."""
+        self._write({"op": "remove", "seq": seq})
+        self.live_records -= 1
+        self.dead_records += 2
+
+    def mark_mined(self, through_seq, count):
+        """Journal that every transaction up to `through_seq` (`count` of them) left the pool in a block."""
+        self._write({"op": "mined", "through": through_seq})
+        self.live_records -= count
+        self.dead_records += count + 1
+
+    def needs_compaction(self):
+        return self.dead_records >= self.COMPACT_MIN_DEAD_RECORDS and self.dead_records > self.live_records
+
+    def compact(self, entries):
+        """Rewrite the journal so it only holds the given live (seq, transaction) entries."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for seq, tx in entries:
+                f.write(json.dumps({"op": "add", "seq": seq, "tx": tx}, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        self.live_records = len(entries)
+        self.dead_records = 0
+        print(f"DEBUG: Compacted mempool journal to {len(entries)} transactions.")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,61 @@
+"""Merkle trees over block transactions.
+
+Leaves and inner nodes are hashed with different prefixes (LEAF_PREFIX and
+NODE_PREFIX), so an inner node can never be passed off as a transaction or
+the other way round. An odd node is paired with itself, which makes a list
+ending in a repeated transaction share the root of the list without the
+repeat; blocks therefore must not contain the same transaction twice (see
+`Block.has_duplicate_transactions`).
+"""
+import hashlib
+import json
+
+EMPTY_ROOT = bytes(32)
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def transaction_leaf(tx):
+    """Leaf hash committing to the full transaction content (not just its `hash` field)."""
+    return hashlib.sha256(LEAF_PREFIX + json.dumps(tx, sort_keys=True).encode()).digest()
+
+
+def hash_pair(left, right):
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def merkle_levels(leaves):
+    """Every level of the tree from the leaves up to the root; an odd node at any level is paired with itself."""
+    if not leaves:
+        return [[EMPTY_ROOT]]
+
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        if len(level) % 2:
+            level = level + [level[-1]]
+        levels.append([hash_pair(level[i], level[i + 1]) for i in range(0, len(level), 2)])
+    return levels
+
+
+def merkle_root(leaves):
+    return merkle_levels(leaves)[-1][0]
+
+
+def merkle_branch(levels, position):
+    """Sibling hashes from leaf `position` up to (not including) the root."""
+    branch = []
+    for level in levels[:-1]:
+        sibling = position ^ 1
+        branch.append(level[sibling] if sibling < len(level) else level[position])
+        position //= 2
+    return branch
+
+
+def verify_branch(leaf, position, branch, root):
+    """Check that `leaf` sits at `position` under `root`, given its sibling hashes."""
+    node = leaf
+    for sibling in branch:
+        node = hash_pair(sibling, node) if position & 1 else hash_pair(node, sibling)
+        position //= 2
+    return node == root
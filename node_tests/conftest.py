@@ -0,0 +1,101 @@
+import importlib
+import json
+import os
+import random
+import shutil
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+NODE_FIXTURES = ("blockchain.json", "pending_transactions.json", "wallet_balances.json")
+
+
+@pytest.fixture
+def legacy_chain():
+    """Block dicts of the bundled legacy chain."""
+    with open(os.path.join(REPO_DIR, "blockchain.json"), "r") as f:
+        return json.load(f)
+
+
+def start_node():
+    sys.modules.pop("blockchain_app", None)
+    return importlib.import_module("blockchain_app")
+
+
+def stop_node(app):
+    app.ifchain.mempool_journal.close()
+    app.ifchain.tx_index.close()
+    app.ifchain.miner.close()
+
+
+@pytest.fixture
+def synthetic_chain():
+    """300 blocks of random transfers and mints between a few addresses, about three hours apart.
+
+    Every 17th block's clock runs behind its parent's, as happens between real nodes.
+    """
+    rng = random.Random(13)
+    addresses = ["alice", "bob", "carol", "dave", "erin"]
+    blocks = []
+    timestamp = 1_700_000_000
+    for height in range(300):
+        timestamp += -600 if height % 17 == 16 else rng.randint(3600, 18000)
+        transactions = []
+        for position in range(rng.randint(0, 6)):
+            sender = None if rng.random() < 0.1 else rng.choice(addresses)
+            transactions.append({
+                "hash": f"tx-{height}-{position}",
+                "sender": sender,
+                "receiver": rng.choice(addresses),
+                "amount": round(rng.uniform(0, 500), 2),
+                "gas_fee": 0.01,
+                "token": rng.choice(["IFC", "IFC", "USD"]),
+            })
+        blocks.append(SimpleNamespace(index=height, hash=f"block-{height}", previous_hash=f"block-{height - 1}",
+                                      timestamp=timestamp, transactions=transactions))
+    return blocks
+
+
+@pytest.fixture
+def node(tmp_path, monkeypatch):
+    """A fresh `blockchain_app` module whose node keeps its files in a temporary directory.
+
+    The module builds its IFChain instance at import time from the working
+    directory, so it is re-imported for every test after copying the bundled
+    chain there.
+    """
+    for name in NODE_FIXTURES:
+        shutil.copy(os.path.join(REPO_DIR, name), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    yield start_node()
+    stop_node(sys.modules["blockchain_app"])  # The last node started, the test may have restarted it
+    sys.modules.pop("blockchain_app", None)
+
+
+@pytest.fixture
+def restart_node(node):
+    """Shuts a node down and starts a new one on the same files, as after a process restart."""
+    def restart(app):
+        stop_node(app)
+        return start_node()
+    return restart
+
+
+@pytest.fixture
+def make_block(node):
+    """Builds a v2 block on `parent` and finds a nonce for it, without touching the node."""
+    def make(parent, transactions):
+        block = node.Block(index=parent.index + 1, timestamp=time.time(), transactions=transactions,
+                           previous_hash=parent.hash, poh_hash=node.ifchain.poh.current_hash,
+                           version=node.Block.HEADER_VERSION)
+        target = "0" * node.IFChain.difficulty
+        while not block.compute_hash().startswith(target):
+            block.nonce += 1
+        block.hash = block.compute_hash()
+        return block
+    return make
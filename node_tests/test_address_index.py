@@ -0,0 +1,75 @@
+from address_index import AddressIndex
+
+
+def scan(chain, address, direction=None, token=None):
+    """(height, position) of an address's transactions, found by walking every block."""
+    matches = []
+    for block in chain:
+        for position, tx in enumerate(block.transactions):
+            sent = tx.get("sender") == address
+            received = tx.get("receiver") == address
+            if direction == AddressIndex.SENT and not sent or direction == AddressIndex.RECEIVED and not received:
+                continue
+            if (sent or received) and (token is None or tx.get("token") == token):
+                matches.append((block.index, position))
+    return matches
+
+
+def test_postings_match_a_full_scan(synthetic_chain):
+    index = AddressIndex()
+    index.rebuild(synthetic_chain)
+    for address in ("alice", "bob", "nobody"):
+        for direction in (None, AddressIndex.SENT, AddressIndex.RECEIVED):
+            for token in (None, "USD"):
+                found = [entry[:2] for entry in index.iter_entries(address, direction, token)]
+                assert found == scan(synthetic_chain, address, direction, token)
+
+
+def test_self_transfer_is_one_posting():
+    index = AddressIndex()
+    assert list(index.transaction_postings({"sender": "a", "receiver": "a"})) == [
+        ("a", AddressIndex.SENT | AddressIndex.RECEIVED)]
+    assert list(index.transaction_postings({"sender": None, "receiver": "b"})) == [("b", AddressIndex.RECEIVED)]
+
+
+def test_pages_resume_after_cursor(synthetic_chain):
+    index = AddressIndex()
+    index.rebuild(synthetic_chain)
+    expected = scan(synthetic_chain, "carol")
+    walked, after = [], None
+    while True:
+        entries, more = index.page("carol", after=after, limit=7)
+        walked += [entry[:2] for entry in entries]
+        if not more:
+            break
+        after = entries[-1][:2]
+    assert walked == expected
+
+
+def test_revert_and_snapshot(synthetic_chain, tmp_path):
+    index = AddressIndex()
+    index.rebuild(synthetic_chain)
+    for block in reversed(synthetic_chain[150:]):
+        index.revert_block(block)
+    partial = AddressIndex()
+    partial.rebuild(synthetic_chain[:150])
+    assert index.postings == partial.postings
+    assert (index.height, index.tip_hash) == (150, "block-149")
+
+    path = str(tmp_path / "address_index.json")
+    index.save(path)
+    loaded = AddressIndex()
+    assert loaded.load(path)
+    assert loaded.postings == index.postings and loaded.height == 150
+
+
+def test_wallet_transactions_endpoint(node):
+    chain = node.ifchain.chain
+    client = node.app.test_client()
+    for query, direction in (("", None), ("?type=sent", AddressIndex.SENT), ("?type=received", AddressIndex.RECEIVED)):
+        response = client.get(f"/wallet_transactions/wallet1{query}")
+        assert response.status_code == 200
+        served = [(tx["block_index"], tx["transaction_hash"]) for tx in response.get_json()["transactions"]]
+        expected = [(height, chain[height].transactions[position]["hash"])
+                    for height, position in scan(chain, "wallet1", direction)]
+        assert served == expected
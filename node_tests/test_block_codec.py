@@ -0,0 +1,117 @@
+import random
+
+import pytest
+
+import block_codec
+from block_codec import CodecError
+
+
+def test_block_round_trip(legacy_chain):
+    for block in legacy_chain:
+        payload = block_codec.encode_block(block)
+        assert block_codec.decode_block(payload) == block
+
+
+def test_decode_header_skips_transactions(legacy_chain):
+    block = legacy_chain[-1]
+    header = block_codec.decode_header(block_codec.encode_block(block))
+    assert header == {key: value for key, value in block.items() if key != "transactions"}
+
+
+def test_chain_round_trip(legacy_chain):
+    assert block_codec.decode_chain(block_codec.encode_chain(legacy_chain)) == legacy_chain
+
+
+def test_v2_header_fields_round_trip(legacy_chain):
+    block = dict(legacy_chain[-1], version=2, merkle_root="ab" * 32)
+    assert block_codec.decode_block(block_codec.encode_block(block)) == block
+
+
+def test_every_truncation_is_rejected(legacy_chain):
+    payload = block_codec.encode_block(legacy_chain[-1])
+    for end in range(len(payload)):
+        with pytest.raises(CodecError):
+            block_codec.decode_block(payload[:end])
+
+
+def test_unknown_format_version():
+    with pytest.raises(CodecError):
+        block_codec.decode_block(bytes([99]))
+
+
+def test_count_larger_than_payload():
+    buf = bytearray([block_codec.T_LIST])
+    block_codec.write_varint(buf, 10 ** 9)
+    with pytest.raises(CodecError):
+        block_codec.read_value(bytes(buf), 0)
+
+
+def test_nesting_is_capped():
+    buf = bytes([block_codec.T_LIST, 1]) * (block_codec.MAX_DEPTH + 1) + bytes([block_codec.T_NONE])
+    with pytest.raises(CodecError):
+        block_codec.read_value(buf, 0)
+
+    nested = None
+    for _ in range(block_codec.MAX_DEPTH):
+        nested = [nested]
+    buf = bytearray()
+    block_codec.write_value(buf, nested)
+    assert block_codec.read_value(bytes(buf), 0) == (nested, len(buf))
+
+
+def test_invalid_utf8():
+    with pytest.raises(CodecError):
+        block_codec.read_value(bytes([block_codec.T_STR, 2, 0xff, 0xfe]), 0)
+
+
+def test_varint_limits():
+    with pytest.raises(CodecError):
+        block_codec.read_varint(b"\xff" * 40 + b"\x01", 0)
+    with pytest.raises(CodecError):
+        block_codec.write_varint(bytearray(), 1 << block_codec.MAX_VARINT_BITS)
+
+
+def test_mutated_payloads_only_raise_codec_error(legacy_chain):
+    rng = random.Random(4)
+    payloads = [block_codec.encode_block(block) for block in legacy_chain]
+    for _ in range(3000):
+        data = bytearray(rng.choice(payloads))
+        for _ in range(rng.randint(1, 4)):
+            data[rng.randrange(len(data))] = rng.randrange(256)
+        try:
+            block_codec.decode_block(bytes(data))
+        except CodecError:
+            pass
+
+
+BAD_HEADERS = [
+    {"hash": 5},
+    {"hash": ["x"]},
+    {"version": "x"},
+    {"version": 2, "poh_hash": 3},
+    {"version": 2, "nonce": 2 ** 70},
+    {"timestamp": float("inf")},
+]
+# Not representable in the binary format, which writes index and nonce as unsigned varints
+BAD_JSON_HEADERS = [{"nonce": -1}, {"index": 1.5}, {"transactions": [1]}]
+
+
+def post_block(node, fields, encoding):
+    ifchain = node.ifchain
+    block = dict(ifchain.chain[-1].to_dict(), index=len(ifchain.chain), previous_hash=ifchain.chain[-1].hash)
+    block.update(fields)
+    client = node.app.test_client()
+    if encoding == "json":
+        return client.post("/receive_block", json=block)
+    return client.post("/receive_block", data=block_codec.encode_block(block), content_type=block_codec.CONTENT_TYPE)
+
+
+@pytest.mark.parametrize("fields", BAD_HEADERS)
+@pytest.mark.parametrize("encoding", ["json", "binary"])
+def test_bad_header_fields_are_rejected(node, fields, encoding):
+    assert post_block(node, fields, encoding).status_code == 400
+
+
+@pytest.mark.parametrize("fields", BAD_JSON_HEADERS)
+def test_bad_json_header_fields_are_rejected(node, fields):
+    assert post_block(node, fields, "json").status_code == 400
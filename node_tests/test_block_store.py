@@ -0,0 +1,191 @@
+import json
+import os
+
+import pytest
+
+from block_store import BlockLog, LazyChain
+
+
+def make_log(directory, segment_max_bytes=None):
+    return BlockLog(str(directory), segment_max_bytes=segment_max_bytes, fsync=False)
+
+
+def active_segment_path(log):
+    return os.path.join(log.directory, log.segments[-1]["name"])
+
+
+@pytest.fixture
+def blocks(legacy_chain):
+    return legacy_chain
+
+
+def test_append_and_reopen(tmp_path, blocks):
+    log = make_log(tmp_path)
+    for block in blocks:
+        log.append(block)
+    assert len(log) == len(blocks)
+    log.close()
+
+    log = make_log(tmp_path)
+    assert len(log) == len(blocks)
+    assert list(log.read_all()) == blocks
+    assert log.read_header(3) == {k: v for k, v in blocks[3].items() if k != "transactions"}
+    assert log.read_transactions(3) == blocks[3]["transactions"]
+    log.close()
+
+
+def test_torn_tail_is_truncated(tmp_path, blocks):
+    log = make_log(tmp_path)
+    for block in blocks[:4]:
+        log.append(block)
+    path = active_segment_path(log)
+    intact_size = os.path.getsize(path)
+    log.close()
+
+    # A crash half way through writing the next record
+    with open(path, "ab") as f:
+        f.write(log.RECORD_HEADER.pack(500, 0) + b"partial")
+
+    log = make_log(tmp_path)
+    assert len(log) == 4
+    assert os.path.getsize(path) == intact_size
+    log.append(blocks[4])
+    assert log.read(4) == blocks[4]
+    log.close()
+
+
+def test_corrupt_last_record_is_dropped(tmp_path, blocks):
+    log = make_log(tmp_path)
+    for block in blocks[:4]:
+        log.append(block)
+    path = active_segment_path(log)
+    log.close()
+
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xff]))
+
+    log = make_log(tmp_path)
+    assert len(log) == 3
+    assert list(log.read_all()) == blocks[:3]
+    log.close()
+
+
+def test_unindexed_record_is_recovered(tmp_path, blocks):
+    log = make_log(tmp_path)
+    for block in blocks[:4]:
+        log.append(block)
+    log.close()
+
+    # A crash between writing the record and its index entry
+    index_path = os.path.join(str(tmp_path), BlockLog.INDEX_FILE)
+    with open(index_path, "r+b") as f:
+        f.truncate(3 * BlockLog.INDEX_ENTRY.size)
+
+    log = make_log(tmp_path)
+    assert len(log) == 4
+    assert log.read(3) == blocks[3]
+    log.close()
+
+
+def test_missing_index_is_rebuilt(tmp_path, blocks):
+    log = make_log(tmp_path, segment_max_bytes=2048)
+    for block in blocks:
+        log.append(block)
+    log.close()
+    os.remove(os.path.join(str(tmp_path), BlockLog.INDEX_FILE))
+
+    log = make_log(tmp_path, segment_max_bytes=2048)
+    assert [log.read(height) for height in range(len(blocks))] == blocks
+    log.close()
+
+
+def test_truncate_across_segments(tmp_path, blocks):
+    log = make_log(tmp_path, segment_max_bytes=2048)
+    for block in blocks:
+        log.append(block)
+    assert len(log.segments) > 2
+
+    log.truncate(2)
+    assert len(log) == 2
+    remaining = {segment["name"] for segment in log.segments}
+    assert {name for name in os.listdir(str(tmp_path)) if name.startswith("segment_")} == remaining
+
+    log.append(blocks[5])
+    assert log.read(2) == blocks[5]
+    log.close()
+
+    log = make_log(tmp_path, segment_max_bytes=2048)
+    assert list(log.read_all()) == blocks[:2] + [blocks[5]]
+    log.close()
+
+
+def test_unreadable_manifest_is_rebuilt(tmp_path, blocks):
+    log = make_log(tmp_path, segment_max_bytes=2048)
+    for block in blocks:
+        log.append(block)
+    log.close()
+
+    with open(os.path.join(str(tmp_path), BlockLog.MANIFEST_FILE), "w") as f:
+        f.write("{not json")
+
+    log = make_log(tmp_path, segment_max_bytes=2048)
+    assert list(log.read_all()) == blocks
+    log.close()
+
+
+def test_migrate_from_json_runs_once(tmp_path, blocks):
+    json_path = str(tmp_path / "blockchain.json")
+    with open(json_path, "w") as f:
+        json.dump(blocks, f)
+
+    log = make_log(tmp_path / "log")
+    assert log.migrate_from_json(json_path) == len(blocks)
+    assert log.migrate_from_json(json_path) == 0
+    log.close()
+
+    log = make_log(tmp_path / "log")
+    assert log.migrated_from == "blockchain.json"
+    assert list(log.read_all()) == blocks
+    log.close()
+
+
+class LoadedBlock:
+    def __init__(self, header, load_transactions):
+        self.header = header
+        self.load_transactions = load_transactions
+
+    def to_dict(self, format_timestamp=True):
+        return dict(self.header, transactions=self.load_transactions())
+
+
+def test_lazy_chain_decodes_transactions_on_demand(tmp_path, blocks):
+    log = make_log(tmp_path)
+    for block in blocks:
+        log.append(block)
+    loads = []
+
+    def factory(header, load_transactions):
+        return LoadedBlock(header, lambda: loads.append(header["index"]) or load_transactions())
+
+    chain = LazyChain(log, factory, cache_size=4)
+    assert len(chain) == len(blocks) and chain
+    assert chain[-1].header["hash"] == blocks[-1]["hash"]
+    assert [block.header["index"] for block in chain[2:5]] == [2, 3, 4]
+    assert loads == []  # Headers only so far
+    assert chain[3].to_dict() == blocks[3] and loads == [3]
+
+    assert chain[3] is chain[3]  # Cached
+    for height in range(len(blocks)):
+        chain[height]
+    assert len(chain._cache) == 4
+
+    chain.truncate(5)
+    assert len(chain) == 5 and all(height < 5 for height in chain._cache)
+    appended = LoadedBlock({k: v for k, v in blocks[7].items() if k != "transactions"}, lambda: blocks[7]["transactions"])
+    chain.append(appended)
+    assert chain[5] is appended
+    assert log.read(5) == blocks[7]
+    log.close()
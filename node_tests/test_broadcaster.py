@@ -0,0 +1,85 @@
+import threading
+from types import SimpleNamespace
+
+import requests
+
+from broadcaster import PeerBroadcaster
+
+
+def reply(status):
+    return SimpleNamespace(status_code=status, ok=200 <= status < 300, text="rejected" if status >= 300 else "")
+
+
+def wait_idle(broadcaster):
+    broadcaster.close()  # Waits for every queued delivery
+    return broadcaster.status()
+
+
+def test_broadcast_returns_before_delivery():
+    broadcaster = PeerBroadcaster(workers=2)
+    release = threading.Event()
+    delivered = []
+
+    def deliver(session, peer):
+        release.wait(5)
+        delivered.append(peer)
+        return reply(200)
+
+    broadcaster.broadcast(["http://a", "http://b"], "block 1", deliver)
+    assert delivered == []  # Both deliveries are still blocked
+    release.set()
+    status = wait_idle(broadcaster)
+    assert sorted(delivered) == ["http://a", "http://b"]
+    assert status["peers"]["http://a"]["delivered"] == 1 and status["pending"] == {}
+
+
+def test_messages_to_one_peer_keep_their_order():
+    broadcaster = PeerBroadcaster(workers=4)
+    order = []
+
+    def deliver_message(n):
+        def deliver(session, peer):
+            order.append(n)
+            return reply(200)
+        return deliver
+
+    for n in range(50):
+        broadcaster.broadcast(["http://a"], f"block {n}", deliver_message(n))
+    wait_idle(broadcaster)
+    assert order == list(range(50))
+
+
+def test_failures_are_reported_per_peer():
+    broadcaster = PeerBroadcaster(workers=2)
+    outcomes = []
+
+    def deliver(session, peer):
+        assert session is broadcaster.session(peer)  # One pooled session per peer
+        if peer == "http://down":
+            raise requests.ConnectionError("connection refused")
+        return reply(409 if peer == "http://rejects" else 201)
+
+    broadcaster.broadcast(["http://ok", "http://rejects", "http://down"], "tx abc", deliver, outcomes.append)
+    status = wait_idle(broadcaster)
+    assert {result["peer"]: result["delivered"] for result in outcomes} == {
+        "http://ok": True, "http://rejects": False, "http://down": False}
+    assert status["peers"]["http://rejects"]["last_status"] == 409
+    assert status["peers"]["http://down"]["last_error"] == "connection refused"
+    assert status["peers"]["http://ok"] == dict(status["peers"]["http://ok"], delivered=1, failed=0)
+    assert len(status["recent"]) == 3
+
+
+def test_raising_callback_does_not_stall_the_peer():
+    broadcaster = PeerBroadcaster(workers=1)
+    delivered = threading.Event()
+
+    def on_result(result):
+        raise RuntimeError("callback bug")
+
+    broadcaster.broadcast(["http://a"], "block 1", lambda session, peer: reply(200), on_result)
+    broadcaster.broadcast(["http://a"], "block 2", lambda session, peer: reply(200), on_result)
+    broadcaster.broadcast(["http://a"], "block 3", lambda session, peer: delivered.set() or reply(200))
+    assert delivered.wait(5)
+    status = wait_idle(broadcaster)
+    assert status["peers"]["http://a"]["delivered"] == 3
+    assert "http://a" not in broadcaster._draining
@@ -0,0 +1,121 @@
+import pytest
+
+import compact_block
+from compact_block import CompactBlockError
+
+
+def make_tx(n):
+    return {"hash": f"tx-{n}", "sender": "wallet1", "receiver": f"r{n}", "amount": n}
+
+
+def as_block_transaction(tx):
+    return dict(tx, status="confirmed")
+
+
+@pytest.fixture
+def block():
+    transactions = [dict(make_tx(0), sender="SYSTEM")] + [as_block_transaction(make_tx(n)) for n in range(1, 6)]
+    return {"hash": "00" + "ab" * 31, "merkle_root": "cd" * 32}, transactions
+
+
+def encode(block):
+    header, transactions = block
+    return compact_block.encode_compact_block(header, transactions, lambda tx: tx["sender"] == "SYSTEM")
+
+
+def test_short_ids_depend_on_the_block():
+    first, second = compact_block.short_id_key("a"), compact_block.short_id_key("b")
+    assert compact_block.short_id(first, "tx") != compact_block.short_id(second, "tx")
+    assert len(compact_block.short_id(first, "tx")) == 2 * compact_block.SHORT_ID_BYTES
+
+
+def test_rebuild_from_pool(block):
+    header, transactions = block
+    message = encode(block)
+    assert list(message["prefilled"]) == ["0"]
+
+    pool = [make_tx(n) for n in (5, 3, 1, 2, 4, 9)]
+    rebuilt, missing, from_pool = compact_block.reconstruct(message, pool, as_block_transaction)
+    assert rebuilt == transactions
+    assert missing == []
+    assert from_pool == [1, 2, 3, 4, 5]
+
+
+def test_missing_transactions_are_reported_and_retried(block):
+    header, transactions = block
+    message = encode(block)
+
+    rebuilt, missing, from_pool = compact_block.reconstruct(message, [make_tx(2)], as_block_transaction)
+    assert missing == [1, 3, 4, 5]
+    assert rebuilt[2] == transactions[2]
+    assert all(rebuilt[position] is None for position in missing)
+
+    retry = compact_block.with_prefilled(message, transactions, missing)
+    rebuilt, missing, _from_pool = compact_block.reconstruct(retry, [make_tx(2)], as_block_transaction)
+    assert rebuilt == transactions
+    assert missing == []
+
+
+def test_ambiguous_short_id_counts_as_missing(block):
+    message = encode(block)
+    pool = [make_tx(1), dict(make_tx(1), amount=100), make_tx(2)]
+    _rebuilt, missing, from_pool = compact_block.reconstruct(message, pool, as_block_transaction)
+    assert 1 in missing
+    assert 2 in from_pool
+
+
+@pytest.mark.parametrize("message", [
+    {},
+    {"header": {}, "short_ids": []},
+    {"header": {"hash": "h"}, "short_ids": "abc"},
+    {"header": {"hash": "h"}, "short_ids": ["a"], "prefilled": {"1": {}}},
+    {"header": {"hash": "h"}, "short_ids": ["a"], "prefilled": {"x": {}}},
+    {"header": {"hash": "h"}, "short_ids": ["a"], "prefilled": []},
+])
+def test_malformed_messages(message):
+    with pytest.raises(CompactBlockError):
+        compact_block.parse(message)
+
+
+def test_node_rebuilds_block_from_mempool(node, make_block):
+    client = node.app.test_client()
+    ifchain = node.ifchain
+    client.post("/force_add_balance", json={"wallet_address": "a", "token": "IFC", "amount": 100})
+    for n in range(4):
+        client.post("/add_new_transaction", json={"sender": "a", "receiver": f"r{n}", "amount": n + 1, "token": "IFC"})
+    pool = [tx for tx in ifchain.unconfirmed_transactions if tx["sender"] in ("a", "SYSTEM")]
+    block = make_block(ifchain.chain[-1], [ifchain.block_transaction(tx) for tx in pool])
+    transactions = block.to_dict()["transactions"]
+    message = compact_block.encode_compact_block(block.header(), transactions, lambda tx: tx["tx_type"] == "mint")
+
+    # One transaction never reached this node, the others are rebuilt from its pool
+    ifchain.remove_from_mempool([pool[2]["hash"]])
+    response = client.post("/compact_block", json=message)
+    assert response.status_code == 200
+    assert response.get_json()["missing"] == [2]
+    assert len(ifchain.chain) == block.index
+
+    retry = compact_block.with_prefilled(message, transactions, [2])
+    response = client.post("/compact_block", json=retry)
+    assert response.status_code == 200
+    assert ifchain.tip_hash() == block.hash
+    assert all(tx["hash"] not in {t["hash"] for t in ifchain.unconfirmed_transactions} for tx in pool)
+
+
+def test_node_reports_pool_positions_on_merkle_mismatch(node, make_block):
+    client = node.app.test_client()
+    ifchain = node.ifchain
+    client.post("/force_add_balance", json={"wallet_address": "a", "token": "IFC", "amount": 100})
+    client.post("/add_new_transaction", json={"sender": "a", "receiver": "r", "amount": 1, "token": "IFC"})
+    pool = [tx for tx in ifchain.unconfirmed_transactions if tx["sender"] in ("a", "SYSTEM")]
+    block = make_block(ifchain.chain[-1], [ifchain.block_transaction(tx) for tx in pool])
+    message = compact_block.encode_compact_block(block.header(), block.to_dict()["transactions"], lambda tx: False)
+
+    # Our copy of a transaction differs from the one the block commits to
+    pool[1]["amount"] = 999
+    response = client.post("/compact_block", json=message)
+    assert response.status_code == 200
+    assert response.get_json()["missing"] == [0, 1]
+    assert len(ifchain.chain) == block.index
+
+    assert client.post("/compact_block", json={"header": {}}).status_code == 400
@@ -0,0 +1,98 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from gossip import InventoryQueue, SeenCache
+
+
+def test_seen_cache_dedups_within_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    seen = SeenCache(max_entries=3, ttl=60)
+    assert seen.add("a") and not seen.add("a")
+    for key in ("b", "c", "d"):
+        seen.add(key)
+    assert "a" not in seen and len(seen) == 3  # Evicted, oldest first
+
+    now[0] += 60
+    assert "b" not in seen and len(seen) == 0
+    assert seen.add("b")
+
+
+def test_inventory_queue_batches():
+    batches = []
+    flushed = threading.Event()
+
+    def flush(batch):
+        batches.append(batch)
+        flushed.set()
+
+    queue = InventoryQueue(flush, delay=0.05, max_batch=3)
+    queue.add("a", "peer-1")
+    queue.add("b")
+    assert batches == []  # Waiting for the timer or a full batch
+    queue.add("c")
+    assert batches == [[("a", "peer-1"), ("b", None), ("c", None)]] and len(queue) == 0
+
+    flushed.clear()
+    queue.add("d")
+    assert flushed.wait(5)
+    assert batches[-1] == [("d", None)]
+
+
+def test_inv_answers_only_unknown_hashes_once(node):
+    client = node.app.test_client()
+    pending = node.ifchain.unconfirmed_transactions[0]["hash"]
+    confirmed = next(tx["hash"] for block in node.ifchain.chain for tx in block.transactions)
+
+    response = client.post("/inv", json={"type": "tx", "hashes": [pending, confirmed, "new", "new", 5]})
+    assert response.status_code == 200 and response.get_json() == {"wanted": ["new"]}
+    # Already asked the first announcer for it, so the next one is not asked again
+    assert client.post("/inv", json={"type": "tx", "hashes": ["new", "other"]}).get_json() == {"wanted": ["other"]}
+
+    tip = node.ifchain.last_block().hash
+    assert client.post("/inv", json={"type": "block", "hashes": [tip, "unknown"]}).get_json() == {"wanted": ["unknown"]}
+
+    assert client.post("/inv", json={"type": "nope", "hashes": []}).status_code == 400
+    assert client.post("/inv", json={"type": "tx", "hashes": "x"}).status_code == 400
+    too_many = [str(n) for n in range(node.IFChain.MAX_INVENTORY + 1)]
+    assert client.post("/inv", json={"type": "tx", "hashes": too_many}).status_code == 400
+
+
+class StubPeer:
+    """Answers /inv with the hashes it lacks and records the bodies it is sent."""
+
+    def __init__(self, known=()):
+        self.known = set(known)
+        self.posts = []
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        path = url.rsplit("/", 1)[1]
+        self.posts.append((path, json))
+        if path == "inv":
+            return SimpleNamespace(status_code=200, ok=True, text="",
+                                   json=lambda: {"wanted": [h for h in json["hashes"] if h not in self.known]})
+        return SimpleNamespace(status_code=200, ok=True, text="", json=lambda: {})
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_announcements_send_only_wanted_bodies(node, monkeypatch):
+    peers = {"http://a": StubPeer(known={"tx-1"}), "http://b": StubPeer()}
+    monkeypatch.setattr(node.ifchain.broadcaster, "session", lambda url: peers[url])
+    monkeypatch.setattr(node.ifchain, "peers", set(peers))
+
+    transactions = [{"hash": f"tx-{n}", "sender": "s", "receiver": "r", "amount": 1, "token": "IFC"} for n in range(3)]
+    node.ifchain.announce_transactions([(tx, "http://b" if tx["hash"] == "tx-2" else None) for tx in transactions])
+    wait_for(lambda: len(node.ifchain.broadcaster.status()["recent"]) == 2)
+
+    first, second = peers["http://a"].posts, peers["http://b"].posts
+    assert first[0] == ("inv", {"type": "tx", "hashes": ["tx-0", "tx-1", "tx-2"]})
+    assert [tx["hash"] for tx in first[1][1]["transactions"]] == ["tx-0", "tx-2"]  # It already had tx-1
+    assert second[0] == ("inv", {"type": "tx", "hashes": ["tx-0", "tx-1"]})  # tx-2 came from b
+    assert [path for path, _ in first + second] == ["inv", "receive_transactions", "inv", "receive_transactions"]
@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+
+
+class StubPeer:
+    """Serves /headers and /blocks from a list of blocks, the way a peer node answers them."""
+
+    def __init__(self, chain_id, blocks, tamper=None):
+        self.chain_id = chain_id
+        self.blocks = blocks
+        self.tamper = tamper  # Called on each served block dict, to play a misbehaving peer
+        self.block_requests = []
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        path = url.rsplit("/", 1)[1]
+        if path == "headers":
+            start, count = params["from"], params["count"]
+            body = {"chain_id": self.chain_id, "length": len(self.blocks), "tip_hash": self.blocks[-1].hash,
+                    "headers": [block.header() for block in self.blocks[start:start + count]]}
+        elif path == "blocks":
+            with self.lock:
+                self.block_requests.append((params["from"], params["to"]))
+            blocks = [block.to_dict() for block in self.blocks[params["from"]:params["to"] + 1]]
+            if self.tamper:
+                blocks = [self.tamper(block) for block in blocks]
+            body = {"blocks": blocks}
+        else:
+            return StubResponse(404, {})
+        return StubResponse(200, body)
+
+
+class StubResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+@pytest.fixture
+def peers(node, monkeypatch):
+    """Registers stub peers with the node; `add(url, peer)` routes the node's requests for `url` to `peer`."""
+    stubs = {}
+    monkeypatch.setattr(node.ifchain.broadcaster, "session", lambda url: stubs[url])
+    monkeypatch.setattr(node.IFChain, "SYNC_BLOCK_RANGE", 2)
+    monkeypatch.setattr(node.ifchain, "peers", set())
+
+    def add(url, peer):
+        stubs[url] = peer
+        node.ifchain.peers.add(url)
+        return peer
+    return add
+
+
+def extend(make_block, chain, count):
+    blocks = list(chain)
+    for _ in range(count):
+        blocks.append(make_block(blocks[-1], []))
+    return blocks
+
+
+def test_missing_blocks_are_fetched_in_ranges_from_every_peer(node, make_block, peers):
+    ours = list(node.ifchain.chain)
+    longer = extend(make_block, ours, 7)
+    first = peers("http://a", StubPeer(node.ifchain.chain_id, longer))
+    second = peers("http://b", StubPeer(node.ifchain.chain_id, longer))
+
+    assert node.ifchain.sync_chain()[1] == 200
+    assert [block.hash for block in node.ifchain.chain] == [block.hash for block in longer]
+
+    # Only the missing heights were requested, in ranges of SYNC_BLOCK_RANGE spread over both peers
+    requested = sorted(first.block_requests + second.block_requests)
+    assert requested == [(height, min(height + 1, len(longer) - 1)) for height in range(len(ours), len(longer), 2)]
+    assert first.block_requests and second.block_requests
+
+
+def test_sync_from_a_fork_below_our_tip(node, make_block, peers):
+    ours = list(node.ifchain.chain)
+    fork = extend(make_block, ours[:-3], 6)
+    peer = peers("http://a", StubPeer(node.ifchain.chain_id, fork))
+
+    assert node.ifchain.sync_chain()[1] == 200
+    assert [block.hash for block in node.ifchain.chain] == [block.hash for block in fork]
+    assert min(start for start, _ in peer.block_requests) == len(ours) - 3
+    assert node.app.test_client().get("/ledger/check").status_code == 200
+
+
+def test_invalid_header_chain_is_rejected(node, make_block, peers):
+    ours = list(node.ifchain.chain)
+    longer = extend(make_block, ours, 4)
+    longer[-2] = make_block(ours[-1], [])  # Valid proof of work, but it does not link to its predecessor
+    peer = peers("http://a", StubPeer(node.ifchain.chain_id, longer))
+
+    assert node.ifchain.sync_chain()[1] == 400
+    assert [block.hash for block in node.ifchain.chain] == [block.hash for block in ours]
+    assert peer.block_requests == []  # No block was downloaded for a header chain that does not check out
+
+
+def test_blocks_not_matching_their_headers_are_fetched_elsewhere(node, make_block, peers):
+    ours = list(node.ifchain.chain)
+    longer = extend(make_block, ours, 4)
+
+    def add_transaction(block):
+        block["transactions"] = [{"sender": None, "receiver": "thief", "amount": 1000, "token": "IFC", "hash": "x"}]
+        return block
+
+    liar = peers("http://a", StubPeer(node.ifchain.chain_id, longer, tamper=add_transaction))
+    honest = peers("http://b", StubPeer(node.ifchain.chain_id, longer))
+
+    assert node.ifchain.sync_chain()[1] == 200
+    assert [block.hash for block in node.ifchain.chain] == [block.hash for block in longer]
+    assert sorted(honest.block_requests) == [(len(ours), len(ours) + 1), (len(ours) + 2, len(ours) + 3)]
+    assert liar.block_requests  # Asked first for one of the ranges, and its blocks were refused
+    assert all(tx.get("receiver") != "thief" for block in node.ifchain.chain for tx in block.transactions)
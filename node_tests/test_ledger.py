@@ -0,0 +1,98 @@
+import pytest
+
+from ledger import AccountLedger, PendingOverlay
+
+
+def scan(transactions):
+    """Balances from walking every transaction, the way the node computed them before the ledger."""
+    balances = {}
+    for tx in transactions:
+        for address, token, delta in AccountLedger.transaction_deltas(tx):
+            account = balances.setdefault(address, {})
+            account[token] = account.get(token, 0) + delta
+    return balances
+
+
+def assert_same_balances(actual, expected):
+    assert set(actual) == set(expected)
+    for address, tokens in expected.items():
+        assert actual[address] == pytest.approx(tokens), address
+
+
+def test_ledger_matches_a_full_scan(synthetic_chain, tmp_path):
+    ledger = AccountLedger()
+    ledger.rebuild(synthetic_chain)
+    assert_same_balances(ledger.balances, scan(tx for block in synthetic_chain for tx in block.transactions))
+    assert (ledger.height, ledger.tip_hash) == (300, "block-299")
+
+    for block in reversed(synthetic_chain[120:]):
+        ledger.revert_block(block)
+    assert_same_balances({address: {token: value for token, value in tokens.items() if abs(value) > 1e-6}
+                          for address, tokens in ledger.balances.items()},
+                         scan(tx for block in synthetic_chain[:120] for tx in block.transactions))
+    assert (ledger.height, ledger.tip_hash) == (120, "block-119")
+
+    path = str(tmp_path / "ledger.json")
+    ledger.save(path)
+    loaded = AccountLedger()
+    assert loaded.load(path)
+    assert (loaded.balances, loaded.height, loaded.tip_hash) == (ledger.balances, 120, "block-119")
+
+
+def test_overlay_add_and_remove(synthetic_chain):
+    pending = [tx for block in synthetic_chain[:20] for tx in block.transactions]
+    overlay = PendingOverlay()
+    for tx in pending:
+        overlay.add(tx)
+    assert_same_balances(overlay.deltas, scan(pending))
+
+    for tx in pending[::2]:
+        overlay.remove(tx)
+    assert_same_balances(overlay.deltas, scan(pending[1::2]))
+
+    version = overlay.version
+    for tx in pending[1::2]:
+        overlay.remove(tx)
+    assert overlay.deltas == {} and overlay.version > version  # Float residue is dropped, not left as 1e-14
+
+
+def test_check_and_rebuild_endpoints(node):
+    client = node.app.test_client()
+    response = client.get("/ledger/check")
+    assert response.status_code == 200
+    assert response.get_json()["consistent"] and response.get_json()["height"] == len(node.ifchain.chain)
+
+    client.post("/force_add_balance", json={"wallet_address": "wallet1", "token": "IFC", "amount": 100})
+    client.post("/add_new_transaction", json={"sender": "wallet1", "receiver": "wallet2", "amount": 5, "token": "IFC"})
+    assert client.get("/mine?miner_wallet=m").status_code == 200
+    assert client.get("/ledger/check").status_code == 200
+
+    node.ifchain.ledger.balances["wallet2"]["IFC"] += 1
+    response = client.get("/ledger/check")
+    assert response.status_code == 409
+    assert [(m["wallet_address"], m["token"]) for m in response.get_json()["mismatches"]] == [("wallet2", "IFC")]
+
+    response = client.post("/ledger/rebuild")
+    assert response.status_code == 200 and response.get_json()["height"] == len(node.ifchain.chain)
+    assert client.get("/ledger/check").status_code == 200
+
+
+def test_overlay_when_a_peer_block_confirms_pending_transactions(node, make_block):
+    client = node.app.test_client()
+    chain = node.ifchain
+    client.post("/force_add_balance", json={"wallet_address": "wallet1", "token": "IFC", "amount": 100})
+    for amount in (4, 6):
+        assert client.post("/add_new_transaction",
+                           json={"sender": "wallet1", "receiver": "wallet2", "amount": amount, "token": "IFC"}).status_code == 201
+    ours = [tx for tx in chain.unconfirmed_transactions if tx["amount"] == 4]
+
+    block = make_block(chain.last_block(), [dict(tx) for tx in ours])
+    assert client.post("/receive_block", json=block.to_dict()).status_code == 200
+
+    pending = list(chain.unconfirmed_transactions)
+    assert [tx["amount"] for tx in pending if tx["amount"] in (4, 6)] == [6]
+    assert_same_balances(chain.pending_overlay.deltas, scan(pending))
+    for address in ("wallet1", "wallet2"):
+        confirmed = scan(tx for block in chain.chain for tx in block.transactions).get(address, {}).get("IFC", 0)
+        expected = chain.wallet_balances.get(address, {}).get("IFC", 0) + confirmed + scan(pending).get(address, {}).get("IFC", 0)
+        assert chain.spendable_balance(address, "IFC") == pytest.approx(expected)
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+
+def walk(client, url, items_key, limit):
+    """Follows `next_cursor` from the first page of `url` to the last, returning every item and page."""
+    items, pages, cursor = [], [], None
+    separator = "&" if "?" in url else "?"
+    while True:
+        response = client.get(f"{url}{separator}limit={limit}" + (f"&cursor={cursor}" if cursor else ""))
+        assert response.status_code == 200
+        page = response.get_json()
+        pages.append(page)
+        items += page[items_key]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+def ndjson(client, url):
+    response = client.get(url + ("&" if "?" in url else "?") + "format=ndjson")
+    assert response.status_code == 200 and response.mimetype == "application/x-ndjson"
+    return response, [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def tx_hash(item):
+    return item["transaction"]["hash"] if "transaction" in item else item.get("hash", item.get("transaction_hash"))
+
+
+@pytest.mark.parametrize("url, items_key, total_key", [
+    ("/search_transactions", "transactions", "total_matches"),
+    ("/search_transactions?sender=wallet1", "transactions", "total_matches"),
+    ("/search_transactions?token=IFC", "transactions", "total_matches"),
+    ("/search_transactions_by_amount?min_amount=1&max_amount=100", "transactions", "total_matches"),
+    ("/search_transactions_advanced?sender=wallet1&token=IFC", "transactions", "total_matches"),
+    ("/search_transactions_by_date?start_date=2025-02-19&end_date=2025-03-08", "transactions", "total_matches"),
+    ("/wallet_transactions/wallet1", "transactions", "total_transactions"),
+])
+def test_cursors_walk_every_match_once(node, url, items_key, total_key):
+    client = node.app.test_client()
+    everything = client.get(url + ("&" if "?" in url else "?") + "limit=1000").get_json()
+    assert everything["next_cursor"] is None and everything[total_key] == len(everything[items_key])
+
+    for limit in (1, 3):
+        items, pages = walk(client, url, items_key, limit)
+        assert [tx_hash(item) for item in items] == [tx_hash(item) for item in everything[items_key]]
+        assert all(page["count"] == len(page[items_key]) <= limit for page in pages)
+        assert all(page[total_key] == len(items) for page in pages)
+
+    _, streamed = ndjson(client, url)
+    assert [tx_hash(item) for item in streamed] == [tx_hash(item) for item in everything[items_key]]
+
+
+def test_chain_pages_and_stream(node):
+    client = node.app.test_client()
+    chain = [block.to_dict() for block in node.ifchain.chain]
+    blocks, pages = walk(client, "/chain", "chain", 5)
+    assert [block["hash"] for block in blocks] == [block["hash"] for block in chain]
+    assert [page["from_height"] for page in pages] == list(range(0, len(chain), 5))
+
+    response, streamed = ndjson(client, "/chain")
+    assert [block["hash"] for block in streamed] == [block["hash"] for block in chain]
+    assert response.headers["X-Chain-Length"] == str(len(chain))
+    assert response.headers["X-Chain-Id"] == node.ifchain.chain_id
+
+    _, tail = ndjson(client, "/chain?from_height=10")
+    assert [block["index"] for block in tail] == list(range(10, len(chain)))
+
+
+def test_pending_pages_survive_mining(node):
+    client = node.app.test_client()
+    client.post("/force_add_balance", json={"wallet_address": "wallet1", "token": "IFC", "amount": 100})
+    for amount in range(1, 6):
+        client.post("/add_new_transaction",
+                    json={"sender": "wallet1", "receiver": "wallet2", "amount": amount, "token": "IFC"})
+    pending = client.get("/pending_transactions").get_json()["pending_transactions"]
+
+    items, _ = walk(client, "/pending_transactions", "pending_transactions", 2)
+    assert [tx["hash"] for tx in items] == [tx["hash"] for tx in pending]
+    _, streamed = ndjson(client, "/pending_transactions")
+    assert [tx["hash"] for tx in streamed] == [tx["hash"] for tx in pending]
+
+    # A cursor taken before mining still points past the same transactions afterwards
+    cursor = client.get("/pending_transactions?limit=2").get_json()["next_cursor"]
+    assert client.get("/mine?miner_wallet=m").status_code == 200
+    client.post("/add_new_transaction", json={"sender": "wallet1", "receiver": "wallet3", "amount": 7, "token": "IFC"})
+    page = client.get(f"/pending_transactions?limit=2&cursor={cursor}").get_json()
+    assert [tx["receiver"] for tx in page["pending_transactions"]] == ["wallet3"]
+    assert page["next_cursor"] is None
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=x", "cursor=!!", "cursor=MQ"])
+def test_bad_page_args_are_rejected(node, query):
+    assert node.app.test_client().get(f"/search_transactions?{query}").status_code == 400
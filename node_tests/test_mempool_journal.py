@@ -0,0 +1,92 @@
+import json
+
+from mempool_journal import MempoolJournal
+
+
+def make_tx(n):
+    return {"hash": f"tx-{n}", "sender": "wallet1", "receiver": f"r{n}", "amount": n, "token": "IFC"}
+
+
+def journal_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_replay_rebuilds_live_pool(tmp_path):
+    path = str(tmp_path / "pending.journal")
+    journal = MempoolJournal(path)
+    seqs = [journal.add(make_tx(n)) for n in range(6)]
+    journal.remove(seqs[4])
+    journal.mark_mined(seqs[2], 3)
+    journal.close()
+
+    reopened = MempoolJournal(path)
+    assert reopened.replay() == [(seqs[3], make_tx(3)), (seqs[5], make_tx(5))]
+    assert reopened.live_records == 2
+    assert reopened.add(make_tx(6)) == seqs[-1] + 1
+
+
+def test_mined_marker_is_one_record(tmp_path):
+    path = str(tmp_path / "pending.journal")
+    journal = MempoolJournal(path)
+    for n in range(50):
+        journal.add(make_tx(n))
+    journal.mark_mined(40, 40)
+    journal.close()
+
+    records = journal_records(path)
+    assert len(records) == 51
+    assert records[-1] == {"op": "mined", "through": 40}
+    assert [tx for _, tx in MempoolJournal(path).replay()] == [make_tx(n) for n in range(40, 50)]
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    path = str(tmp_path / "pending.journal")
+    journal = MempoolJournal(path)
+    journal.add(make_tx(1))
+    journal.add(make_tx(2))
+    journal.close()
+    with open(path, "a") as f:
+        f.write('{"op":"add","seq":3,"tx":{"hash"')
+
+    reopened = MempoolJournal(path)
+    assert reopened.replay() == [(1, make_tx(1)), (2, make_tx(2))]
+    reopened.add(make_tx(3))
+    reopened.close()
+    assert [tx for _, tx in MempoolJournal(path).replay()] == [make_tx(1), make_tx(2), make_tx(3)]
+
+
+def test_compaction_keeps_live_transactions(tmp_path, monkeypatch):
+    monkeypatch.setattr(MempoolJournal, "COMPACT_MIN_DEAD_RECORDS", 5)
+    path = str(tmp_path / "pending.journal")
+    journal = MempoolJournal(path)
+    seqs = [journal.add(make_tx(n)) for n in range(8)]
+    for seq in seqs[:5]:
+        journal.remove(seq)
+    assert journal.needs_compaction()
+
+    live = [(seq, make_tx(n)) for n, seq in enumerate(seqs) if n >= 5]
+    journal.compact(live)
+    assert not journal.needs_compaction()
+    assert [record["op"] for record in journal_records(path)] == ["add"] * 3
+    assert MempoolJournal(path).replay() == live
+
+
+def test_node_rebuilds_pool_after_mining_and_restart(node, restart_node):
+    client = node.app.test_client()
+    client.post("/force_add_balance", json={"wallet_address": "wallet1", "token": "IFC", "amount": 100})
+    for receiver in ("a", "b"):
+        client.post("/add_new_transaction", json={"sender": "wallet1", "receiver": receiver, "amount": 1, "token": "IFC"})
+    assert client.get("/mine?miner_wallet=m").status_code == 200
+    assert node.ifchain.unconfirmed_transactions == []
+
+    for receiver in ("c", "d", "e"):
+        client.post("/add_new_transaction", json={"sender": "wallet1", "receiver": receiver, "amount": 1, "token": "IFC"})
+    node.ifchain.remove_from_mempool([node.ifchain.unconfirmed_transactions[1]["hash"]])
+    pool = [dict(tx) for tx in node.ifchain.unconfirmed_transactions]
+    assert [tx["receiver"] for tx in pool] == ["c", "e"]
+    balance = node.ifchain.get_wallet_balance("wallet1")
+
+    node = restart_node(node)
+    assert node.ifchain.unconfirmed_transactions == pool
+    assert node.ifchain.get_wallet_balance("wallet1") == balance
@@ -0,0 +1,101 @@
+import time
+from types import SimpleNamespace
+
+from orphan_pool import OrphanPool
+
+
+def block(height, parent=None):
+    return SimpleNamespace(index=height, hash=f"block-{height}",
+                           previous_hash=parent if parent is not None else f"block-{height - 1}")
+
+
+def test_children_are_found_by_parent():
+    pool = OrphanPool()
+    assert pool.add(block(5)) and pool.add(block(4)) and pool.add(block(6))
+    assert not pool.add(block(5))
+    sibling = SimpleNamespace(index=5, hash="block-5b", previous_hash="block-4")
+    pool.add(sibling)
+
+    assert pool.missing_parent(block(6)) == ("block-3", 3)  # Follows the pooled 5 and 4 down to the gap
+    assert [child.hash for child in pool.pop_children("block-3")] == ["block-4"]
+    assert sorted(child.hash for child in pool.pop_children("block-4")) == ["block-5", "block-5b"]
+    assert pool.pop_children("block-4") == []
+    assert len(pool) == 1 and "block-6" in pool and pool.by_parent == {"block-5": {"block-6"}}
+
+
+def test_pool_is_bounded_and_expires(monkeypatch):
+    pool = OrphanPool(max_blocks=3, ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    for height in range(1, 5):
+        pool.add(block(height, parent=f"gap-{height}"))
+    assert [pool.get(f"block-{height}") is not None for height in range(1, 5)] == [False, True, True, True]
+    assert "gap-1" not in pool.by_parent
+
+    now[0] += 30
+    pool.add(block(10, parent="gap-10"))  # Evicts block 2, the oldest left
+    now[0] += 31  # Blocks 3 and 4 are now older than the TTL, block 10 is not
+    assert pool.pop_children("gap-10")[0].hash == "block-10"
+    assert len(pool) == 0 and pool.by_parent == {}
+
+
+def test_missing_parent_is_requested_once_per_retry_window(monkeypatch):
+    pool = OrphanPool()
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    assert pool.mark_requested("block-3")
+    assert not pool.mark_requested("block-3")
+    now[0] += OrphanPool.REQUEST_RETRY
+    assert pool.mark_requested("block-3")
+
+
+class StubPeer:
+    """Serves /blocks from a list of blocks, the way a peer node answers them."""
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.requests = []
+
+    def get(self, url, params=None, timeout=None):
+        self.requests.append(params)
+        served = [b.to_dict() for b in self.blocks if params["from"] <= b.index <= params["to"]]
+        return SimpleNamespace(status_code=200, json=lambda: {"blocks": served})
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_blocks_out_of_order_are_connected(node, make_block):
+    client = node.app.test_client()
+    tip = node.ifchain.last_block()
+    first = make_block(tip, [])
+    second = make_block(first, [])
+    third = make_block(second, [])
+
+    assert client.post("/receive_block", json=third.to_dict()).status_code == 202
+    assert client.post("/receive_block", json=second.to_dict()).status_code == 202
+    assert len(node.ifchain.orphans) == 2
+    assert client.post("/receive_block", json=first.to_dict()).status_code == 200
+    assert node.ifchain.last_block().hash == third.hash
+    assert len(node.ifchain.orphans) == 0
+
+
+def test_missing_parents_are_fetched_from_the_announcing_peer(node, make_block, monkeypatch):
+    tip = node.ifchain.last_block()
+    blocks = [make_block(tip, [])]
+    for _ in range(3):
+        blocks.append(make_block(blocks[-1], []))
+    peer = StubPeer(blocks)
+    monkeypatch.setattr(node.ifchain.broadcaster, "session", lambda url: peer)
+    monkeypatch.setattr(node.ifchain, "peers", {"http://a"})
+
+    response = node.app.test_client().post("/receive_block", json=blocks[-1].to_dict(),
+                                           headers={node.NODE_URL_HEADER: "http://a"})
+    assert response.status_code == 202
+    wait_for(lambda: node.ifchain.last_block().hash == blocks[-1].hash)
+    assert peer.requests == [{"from": tip.index + 1, "to": tip.index + 3}]
+    assert len(node.ifchain.orphans) == 0
@@ -0,0 +1,58 @@
+import hashlib
+
+import pytest
+
+from pow_miner import ProofOfWorkMiner, encode_nonce, search_nonces
+
+
+@pytest.fixture(params=[1, 2], ids=["one-worker", "two-workers"])
+def workers(request):
+    return request.param
+
+
+@pytest.fixture
+def configured_node(workers, monkeypatch, request):
+    """A node started with IFCHAIN_MINER_WORKERS set, so it is read when the module is imported."""
+    monkeypatch.setenv("IFCHAIN_MINER_WORKERS", str(workers))
+    return request.getfixturevalue("node")
+
+
+def test_search_nonces_scans_its_range():
+    prefix, suffix = b'{"index": 1, "nonce": ', b', "transactions": []}'
+    nonce, digest, attempts = search_nonces(prefix, suffix, 0, 100_000, 3)
+    assert digest == hashlib.sha256(prefix + str(nonce).encode() + suffix).hexdigest()
+    assert digest.startswith("000") and attempts == nonce + 1
+    assert not any(hashlib.sha256(prefix + str(n).encode() + suffix).hexdigest().startswith("000")
+                   for n in range(nonce))
+
+    assert search_nonces(prefix, suffix, 0, 10, 8) == (None, None, 10)
+    assert encode_nonce(258, "u64") == b"\x00\x00\x00\x00\x00\x00\x01\x02"
+
+
+def test_miner_finds_a_valid_nonce(workers):
+    miner = ProofOfWorkMiner(workers=workers, chunk_size=2000)
+    try:
+        prefix, suffix = b"header:", b":end"
+        nonce, digest = miner.mine(prefix, suffix, 3)
+        assert digest == hashlib.sha256(prefix + str(nonce).encode() + suffix).hexdigest()
+        assert digest.startswith("000")
+        status = miner.status()
+        assert status["workers"] == workers and not status["mining"]
+        assert status["total_hashes"] > 0 and status["last_hashrate"] > 0
+    finally:
+        miner.close()
+
+
+def test_worker_count_is_configurable(configured_node, workers):
+    node = configured_node
+    assert node.ifchain.miner.workers == workers
+
+    client = node.app.test_client()
+    assert client.get("/mine?miner_wallet=m").status_code == 200
+    block = node.ifchain.last_block()
+    assert block.hash == block.compute_hash()
+    assert block.hash.startswith("0" * node.IFChain.difficulty)
+
+    status = client.get("/mining_status").get_json()
+    assert status["workers"] == workers
+    assert status["last_hashrate"] > 0 and status["total_hashes"] > 0
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from address_index import AddressIndex
+from query_planner import TransactionQueryPlanner
+from time_index import BlockTimeIndex
+from tx_columns import TransactionColumns
+
+
+@pytest.fixture
+def planner(synthetic_chain):
+    columns = TransactionColumns()
+    columns.rebuild(synthetic_chain)
+    addresses = AddressIndex()
+    addresses.rebuild(synthetic_chain)
+    times = BlockTimeIndex()
+    for block in synthetic_chain:
+        times.append(block.index, block.timestamp)
+    return TransactionQueryPlanner(columns, addresses, times)
+
+
+def scan(chain, filters):
+    """(height, position) of every transaction matching `filters`, checked one by one."""
+    def keep(block, tx):
+        return ((filters.get("sender") is None or tx["sender"] == filters["sender"]) and
+                (filters.get("receiver") is None or tx["receiver"] == filters["receiver"]) and
+                (filters.get("token") is None or tx["token"] == filters["token"]) and
+                (filters.get("min_amount") is None or tx["amount"] >= filters["min_amount"]) and
+                (filters.get("max_amount") is None or tx["amount"] <= filters["max_amount"]) and
+                (filters.get("start_time") is None or block.timestamp >= filters["start_time"]) and
+                (filters.get("end_time") is None or block.timestamp <= filters["end_time"]) and
+                (filters.get("block_number") is None or block.index == filters["block_number"]))
+    return [(block.index, position) for block in chain
+            for position, tx in enumerate(block.transactions) if keep(block, tx)]
+
+
+def random_filters(rng, chain):
+    filters = {}
+    if rng.random() < 0.4:
+        filters["sender"] = rng.choice(["alice", "bob", "carol", "nobody"])
+    if rng.random() < 0.4:
+        filters["receiver"] = rng.choice(["dave", "erin", "alice"])
+    if rng.random() < 0.3:
+        filters["token"] = rng.choice(["IFC", "USD"])
+    if rng.random() < 0.4:
+        low = rng.uniform(0, 400)
+        filters.update(min_amount=low, max_amount=low + rng.uniform(0, 200), amount_range_given=True)
+    if rng.random() < 0.4:
+        first, last = sorted(rng.sample(range(len(chain)), 2))
+        filters.update(start_time=chain[first].timestamp, end_time=chain[last].timestamp)
+    if rng.random() < 0.2:
+        filters["block_number"] = rng.randrange(len(chain))
+    return filters
+
+
+def test_plans_match_a_full_scan(planner, synthetic_chain):
+    rng = random.Random(16)
+    paths = set()
+    for _ in range(400):
+        filters = random_filters(rng, synthetic_chain)
+        rows, plan = planner.execute(filters)
+        assert planner.columns.locations(rows) == scan(synthetic_chain, filters), filters
+        assert plan["rows_matched"] == len(rows)
+        paths.add(plan["access_path"])
+    assert paths == {"full_scan", "block_height", "sender_postings", "receiver_postings", "time_range", "amount_range"}
+
+
+def test_cheapest_access_path_is_chosen(planner):
+    _, plan = planner.execute({"sender": "alice", "block_number": 7})
+    assert plan["access_path"] == "block_height"
+    assert {candidate["path"] for candidate in plan["candidates"]} == {"block_height", "sender_postings"}
+
+    _, plan = planner.execute({"sender": "nobody", "token": "IFC"})
+    assert plan["access_path"] == "sender_postings" and plan["rows_examined"] == 0
+
+    _, plan = planner.execute({"token": "USD", "min_amount": 0, "max_amount": float("inf")})
+    assert plan["access_path"] == "full_scan"
+
+
+def test_advanced_search_endpoint(node):
+    chain = node.ifchain.chain
+    response = node.app.test_client().get(
+        "/search_transactions_advanced?sender=wallet1&min_amount=1&max_amount=100&explain=1&limit=1000")
+    assert response.status_code == 200
+    body = response.get_json()
+    served = [(tx["block_index"], tx["transaction"]["hash"]) for tx in body["transactions"]]
+    expected = [(block.index, tx["hash"]) for block in chain for tx in block.transactions
+                if tx.get("sender") == "wallet1" and 1 <= float(tx["amount"]) <= 100]
+    assert served == expected
+    assert body["plan"]["rows_matched"] == len(expected)
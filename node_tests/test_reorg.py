@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+from address_index import AddressIndex
+from chain_stats import ChainStats
+from tx_columns import TransactionColumns
+
+
+def transfer(receiver, amount=1):
+    return {"sender": "wallet1", "receiver": receiver, "amount": amount, "token": "IFC", "gas_fee": 0.01,
+            "net_amount": amount - 0.01, "hash": f"h-{receiver}", "timestamp": time.time(),
+            "tx_type": "transfer", "status": "confirmed", "block_confirmations": 1, "signatures": []}
+
+
+def assert_consistent(ifchain):
+    """Every piece of derived state matches a rebuild from the active chain."""
+    assert ifchain.check_ledger() == []
+
+    addresses = AddressIndex()
+    addresses.rebuild(ifchain.chain)
+    assert addresses.postings == ifchain.address_index.postings
+
+    stats = ChainStats()
+    stats.rebuild(ifchain.chain)
+    assert stats.total_transactions == ifchain.stats.total_transactions
+    assert stats.wallet_refs == ifchain.stats.wallet_refs
+
+    columns = TransactionColumns()
+    columns.rebuild(ifchain.chain)
+    assert len(columns) == len(ifchain.tx_columns)
+
+    for block in ifchain.chain:
+        for tx in block.transactions:
+            assert ifchain.tx_index.lookup(tx["hash"]) is not None
+    assert ifchain.block_times.times == [block.timestamp for block in ifchain.chain]
+    assert len(ifchain.block_tree.main_work) == len(ifchain.chain)
+
+
+@pytest.fixture
+def mined(node):
+    """The node after mining one block of two transfers; returns (block it was mined on, mined block)."""
+    client = node.app.test_client()
+    ifchain = node.ifchain
+    base = ifchain.chain[-1]
+    client.post("/force_add_balance", json={"wallet_address": "wallet1", "token": "IFC", "amount": 100})
+    for receiver in ("p1", "p2"):
+        client.post("/add_new_transaction", json={"sender": "wallet1", "receiver": receiver, "amount": 2, "token": "IFC"})
+    assert client.get("/mine?miner_wallet=m").status_code == 200
+    assert ifchain.chain[-1].index == base.index + 1
+    return base, ifchain.chain[-1]
+
+
+def test_reorg_to_longer_branch_and_back(node, mined, make_block):
+    ifchain = node.ifchain
+    base, mined_block = mined
+    mined_hashes = [tx["hash"] for tx in mined_block.transactions if tx.get("receiver") in ("p1", "p2")]
+    assert_consistent(ifchain)
+
+    side_1 = make_block(base, [transfer("s1")])
+    assert ifchain.accept_block(side_1)
+    assert ifchain.tip_hash() == mined_block.hash
+
+    side_2 = make_block(side_1, [transfer("s2")])
+    assert ifchain.accept_block(side_2)
+    assert ifchain.tip_hash() == side_2.hash
+    assert mined_block.hash in ifchain.block_tree
+    assert_consistent(ifchain)
+    assert ifchain.find_transaction("h-s2")[0].index == side_2.index
+    pending = {tx["hash"] for tx in ifchain.unconfirmed_transactions}
+    assert all(tx_hash not in ifchain.tx_index and tx_hash in pending for tx_hash in mined_hashes)
+
+    # The first branch overtakes again: its transfers are confirmed, the side branch's return to the pool
+    client = node.app.test_client()
+    next_1 = make_block(mined_block, [transfer("a1")])
+    next_2 = make_block(next_1, [transfer("a2")])
+    assert client.post("/receive_block", json=next_1.to_dict()).status_code == 202
+    response = client.post("/receive_block", json=next_2.to_dict())
+    assert response.status_code == 200
+    assert ifchain.tip_hash() == next_2.hash
+    assert_consistent(ifchain)
+    assert all(tx_hash in ifchain.tx_index for tx_hash in mined_hashes)
+    assert sorted(tx["receiver"] for tx in ifchain.unconfirmed_transactions) == ["s1", "s2"]
+
+
+def test_unaffordable_transactions_are_not_returned(node, mined, make_block):
+    ifchain = node.ifchain
+    base, _mined_block = mined
+    # The winning branch overspends wallet1, so its transfers in the abandoned block cannot be paid for
+    side_1 = make_block(base, [transfer("drain", amount=10 ** 6)])
+    side_2 = make_block(side_1, [])
+    assert ifchain.accept_block(side_1) and ifchain.accept_block(side_2)
+    assert ifchain.tip_hash() == side_2.hash
+    assert_consistent(ifchain)
+    returned = {(tx["sender"], tx["receiver"]) for tx in ifchain.unconfirmed_transactions}
+    assert ("SYSTEM", "wallet1") in returned
+    assert not returned & {("wallet1", "p1"), ("wallet1", "p2")}
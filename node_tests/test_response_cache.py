@@ -0,0 +1,64 @@
+from response_cache import ResponseCache
+
+
+def test_lru_bounds():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    cache.put("a", b"1234", 200, "application/json")
+    cache.put("b", b"1234", 200, "application/json")
+    cache.put("c", b"1234", 200, "application/json")
+    assert cache.get("a") is None
+    assert cache.get("c") == (b"1234", 200, "application/json")
+
+    cache.put("d", b"12345678", 200, "application/json")
+    assert len(cache) == 1
+    cache.put("e", b"x" * 11, 200, "application/json")
+    assert cache.get("e") is None
+
+
+def test_etag_is_salted_per_instance():
+    key = ("/contracts", (), False, 0)
+    assert ResponseCache().etag(key) != ResponseCache().etag(key)
+    cache = ResponseCache()
+    assert cache.etag(key) == cache.etag(key)
+
+
+def test_unchanged_state_answers_304(node):
+    client = node.app.test_client()
+    first = client.get("/block/1")
+    assert first.status_code == 200 and first.headers["ETag"]
+
+    again = client.get("/block/1", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert client.get("/block/2", headers={"If-None-Match": first.headers["ETag"]}).status_code == 200
+
+
+def test_write_invalidates_balance(node):
+    client = node.app.test_client()
+    url = "/get_wallet_balance?wallet_address=wallet1"
+    before = client.get(url)
+    etag = before.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    response = client.post("/add_new_transaction", json={"sender": "wallet1", "receiver": "r", "amount": 5, "token": "IFC"})
+    assert response.status_code == 201
+    after = client.get(url, headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != etag
+    assert after.get_json() != before.get_json()
+
+
+def test_etag_from_before_a_restart_is_not_honoured(node, restart_node):
+    client = node.app.test_client()
+    etag = client.get("/contracts").headers["ETag"]
+    assert client.get("/contracts").get_json() == {"contracts": []}
+
+    response = client.post("/deploy_contract", json={"contract_name": "Counter", "owner": "wallet1",
+                                                     "contract_code": "def increment(): return 1"})
+    assert response.status_code == 200
+
+    # The contracts version counter starts again from 0, the data it described has changed
+    node = restart_node(node)
+    response = node.app.test_client().get("/contracts", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json() == {"contracts": ["Counter"]}
@@ -0,0 +1,73 @@
+import calendar
+from datetime import datetime
+
+import pytest
+
+from time_index import BlockTimeIndex
+
+
+def build(chain):
+    index = BlockTimeIndex()
+    for block in chain:
+        index.append(block.index, block.timestamp)
+    return index
+
+
+def test_range_matches_a_full_scan(synthetic_chain):
+    index = build(synthetic_chain)
+    times = [block.timestamp for block in synthetic_chain]
+    for start, end in ((times[0], times[-1]), (times[40], times[41]), (times[16], times[16]),
+                       (times[100] + 1, times[120] - 1), (0, times[0] - 1), (times[-1] + 1, times[-1] + 10)):
+        expected = [height for height, timestamp in enumerate(times) if start <= timestamp <= end]
+        assert index.heights_between(start, end) == expected
+
+
+def test_boundaries_are_inclusive():
+    index = BlockTimeIndex()
+    for height, timestamp in enumerate((100, 200, 200, 300)):
+        index.append(height, timestamp)
+    assert index.heights_between(200, 200) == [1, 2]
+    assert index.heights_between(100, 300) == [0, 1, 2, 3]
+    assert index.heights_between(101, 299) == [1, 2]
+    assert index.heights_between(301, 400) == []
+
+
+def test_block_behind_its_parent_and_pop():
+    index = BlockTimeIndex()
+    for height, timestamp in enumerate((100, 300, 200)):
+        index.append(height, timestamp)
+    assert index.heights_between(150, 250) == [2]
+    assert index.heights_between(0, 1000) == [0, 1, 2]
+    index.pop()
+    assert index.heights_between(150, 250) == []
+    assert index.times == [100, 300]
+    with pytest.raises(ValueError):
+        index.append(5, 400)
+
+
+def epoch(date):
+    return calendar.timegm(datetime.strptime(date, "%Y-%m-%d").timetuple())
+
+
+@pytest.mark.parametrize("start_date, end_date, heights", [
+    ("2025-02-19", "2025-02-20", [0, 1, 2]),  # Midnight to midnight: the blocks early on the 20th are out
+    ("2025-02-20", "2025-03-08", [3, 4, 5, 6, 7]),
+    ("2025-03-10", "2025-03-11", []),
+])
+def test_date_search_endpoint(node, start_date, end_date, heights):
+    chain = node.ifchain.chain
+    response = node.app.test_client().get(
+        f"/search_transactions_by_date?start_date={start_date}&end_date={end_date}&limit=1000")
+    assert response.status_code == 200
+
+    served = [(tx["block_index"], tx["transaction"]["hash"]) for tx in response.get_json()["transactions"]]
+    expected = [(block.index, tx["hash"]) for block in chain
+                if epoch(start_date) <= block.timestamp <= epoch(end_date) for tx in block.transactions]
+    assert served == expected
+    assert sorted({height for height, _ in served}) == [h for h in heights if chain[h].transactions]
+
+
+def test_date_search_rejects_bad_dates(node):
+    client = node.app.test_client()
+    assert client.get("/search_transactions_by_date?start_date=2024-13-01&end_date=2024-12-01").status_code == 400
+    assert client.get("/search_transactions_by_date?start_date=2024-12-01").status_code == 400
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from tx_columns import TransactionColumns
+
+
+def rows(chain):
+    """Every transaction as (height, position, block timestamp, tx), in chain order."""
+    return [(block.index, position, block.timestamp, tx)
+            for block in chain for position, tx in enumerate(block.transactions)]
+
+
+def matches(row, min_amount=None, max_amount=None, token=None, sender=None, receiver=None,
+            start_time=None, end_time=None):
+    _, _, timestamp, tx = row
+    return ((min_amount is None or tx["amount"] >= min_amount) and
+            (max_amount is None or tx["amount"] <= max_amount) and
+            (token is None or tx["token"] == token) and
+            (sender is None or tx["sender"] == sender) and
+            (receiver is None or tx["receiver"] == receiver) and
+            (start_time is None or timestamp >= start_time) and
+            (end_time is None or timestamp <= end_time))
+
+
+@pytest.fixture
+def columns(synthetic_chain):
+    table = TransactionColumns()
+    table.rebuild(synthetic_chain)
+    return table
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"min_amount": 100, "max_amount": 200},
+    {"token": "USD", "sender": "alice"},
+    {"receiver": "bob", "max_amount": 50},
+    {"sender": "nobody"},
+    {"start_time": 1_700_300_000, "end_time": 1_701_000_000, "token": "IFC"},
+])
+def test_select_matches_a_full_scan(synthetic_chain, columns, filters):
+    matching = [row for row in rows(synthetic_chain) if matches(row, **filters)]
+    selected = columns.select(**filters)
+    assert columns.locations(selected) == [(height, position) for height, position, _, _ in matching]
+    assert columns.count(selected) == len(matching)
+    assert columns.sum("amount", selected) == pytest.approx(sum(row[3]["amount"] for row in matching))
+
+
+def test_range_and_height_lookups(synthetic_chain, columns):
+    all_rows = rows(synthetic_chain)
+    in_range = [i for i, row in enumerate(all_rows) if 10 <= row[3]["amount"] <= 20]
+    assert columns.value_range_rows("amount", 10, 20).tolist() == in_range
+    assert columns.count_value_range("amount", 10, 20) == len(in_range)
+
+    heights = [3, 50, 51, 299]
+    expected = [i for i, row in enumerate(all_rows) if row[0] in heights]
+    assert columns.rows_of_heights(heights).tolist() == expected
+    assert columns.count_rows_of_heights(heights) == len(expected)
+    assert columns.rows_at([(row[0], row[1]) for row in all_rows[5:9]]).tolist() == [5, 6, 7, 8]
+
+
+def test_histogram(columns):
+    selected = columns.select(token="USD")
+    counts, edges = columns.histogram("amount", selected, bins=5)
+    assert sum(counts) == len(selected)
+    assert len(edges) == 6
+    assert columns.histogram("amount", columns.select(sender="nobody")) == ([], [])
+
+
+def test_revert_and_snapshot(synthetic_chain, columns, tmp_path):
+    for block in reversed(synthetic_chain[200:]):
+        columns.revert_block(block)
+    partial = TransactionColumns()
+    partial.rebuild(synthetic_chain[:200])
+    assert len(columns) == len(partial)
+    assert np.array_equal(columns.column("amount"), partial.column("amount"))
+
+    path = str(tmp_path / "tx_columns.npz")
+    columns.save(path)
+    loaded = TransactionColumns()
+    assert loaded.load(path)
+    assert (loaded.height, loaded.tip_hash) == (200, "block-199")
+    assert loaded.locations(loaded.select(sender="alice")) == columns.locations(columns.select(sender="alice"))
+
+
+def test_aggregates_endpoint(node):
+    chain = node.ifchain.chain
+    response = node.app.test_client().get("/api/transaction-aggregates?token=IFC&min_amount=1")
+    assert response.status_code == 200
+    body = response.get_json()
+    amounts = [float(tx["amount"]) for block in chain for tx in block.transactions
+               if tx.get("token") == "IFC" and float(tx["amount"]) >= 1]
+    assert body["count"] == len(amounts)
+    assert body["total_amount"] == pytest.approx(sum(amounts))
+    assert sum(body["amount_histogram"]["counts"]) == len(amounts)
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+from tx_index import BloomFilter, TransactionIndex
+
+
+def make_block(index, tx_hashes):
+    return SimpleNamespace(index=index, hash=f"block-{index}", previous_hash=f"block-{index - 1}",
+                           transactions=[{"hash": tx_hash} for tx_hash in tx_hashes])
+
+
+class CountingConnection:
+    """Wraps the index's SQLite connection and counts the statements run on it."""
+
+    def __init__(self, db):
+        self.db = db
+        self.statements = 0
+
+    def execute(self, *args):
+        self.statements += 1
+        return self.db.execute(*args)
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+
+def test_bloom_filter_has_no_false_negatives(tmp_path):
+    bloom = BloomFilter(1000, error_rate=0.01)
+    keys = [f"tx-{n}".encode() for n in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other-{n}".encode() in bloom for n in range(10000))
+    assert false_positives < 300
+
+    path = str(tmp_path / "filter.bloom")
+    bloom.save(path, 7)
+    loaded, height = BloomFilter.load(path)
+    assert height == 7
+    assert loaded.bits == bloom.bits
+
+
+def test_lookup_and_revert(tmp_path):
+    index = TransactionIndex(str(tmp_path))
+    index.apply_block(make_block(0, ["a", "b"]))
+    index.apply_block(make_block(1, ["c", "a"]))
+    assert index.lookup("a") == (0, 0)
+    assert index.lookup("c") == (1, 0)
+    assert index.count == 3
+    assert (index.height, index.tip_hash) == (2, "block-1")
+
+    index.revert_block(make_block(1, ["c", "a"]))
+    assert "c" not in index
+    assert index.lookup("a") == (0, 0)
+    assert (index.height, index.tip_hash, index.count) == (1, "block-0", 2)
+    index.close()
+
+
+def test_unknown_hash_is_answered_by_the_bloom_filter(tmp_path):
+    index = TransactionIndex(str(tmp_path))
+    index.apply_block(make_block(0, [f"tx-{n}" for n in range(100)]))
+    index._db = connection = CountingConnection(index._db)
+
+    misses = [f"unknown-{n}" for n in range(1000)]
+    assert not any(tx_hash in index for tx_hash in misses)
+    assert connection.statements < 10
+    assert index.lookup("tx-5") == (0, 5)
+    index._db = connection.db
+    index.close()
+
+
+def test_index_survives_reopen(tmp_path):
+    index = TransactionIndex(str(tmp_path))
+    index.apply_block(make_block(0, ["a", "b"]))
+    index.apply_block(make_block(1, ["c"]))
+    index.close()
+
+    reopened = TransactionIndex(str(tmp_path))
+    assert (reopened.height, reopened.tip_hash, reopened.count) == (2, "block-1", 3)
+    assert reopened.lookup("c") == (1, 0)
+    assert "d" not in reopened
+
+    reopened.rebuild([make_block(0, ["x"])])
+    assert "a" not in reopened and reopened.lookup("x") == (0, 0)
+    reopened.close()
+
+
+def test_replay_is_rejected_and_repeat_payments_are_not(node, restart_node):
+    client = node.app.test_client()
+    client.post("/force_add_balance", json={"wallet_address": "wallet1", "token": "IFC", "amount": 100})
+    payment = {"sender": "wallet1", "receiver": "shop", "amount": 3, "token": "IFC"}
+    signed = dict(payment, nonce="order-17")
+    assert client.post("/add_new_transaction", json=payment).status_code == 201
+    assert client.post("/add_new_transaction", json=signed).status_code == 201
+    assert client.get("/mine?miner_wallet=m").status_code == 200
+
+    # The same payment again is a new transaction, the same request (same nonce) is a replay
+    assert client.post("/add_new_transaction", json=payment).status_code == 201
+    assert client.post("/add_new_transaction", json=signed).status_code == 409
+
+    node = restart_node(node)
+    assert node.app.test_client().post("/add_new_transaction", json=signed).status_code == 409
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class OrphanPool:
+    """Blocks whose parent we do not have yet, keyed by the parent they wait for.
+
+    `by_parent` maps a missing previous_hash to the orphans built on it, so
+    when that parent arrives its children are found in one lookup and can be
+    connected in turn. The pool holds at most MAX_BLOCKS blocks (least
+    recently added evicted first) and drops any orphan older than TTL
+    seconds. `mark_requested` remembers which parents were recently asked
+    for, so a burst of orphans on the same gap triggers a single fetch.
+    """
+
+    MAX_BLOCKS = 100
+    TTL = 600
+    REQUEST_RETRY = 10  # Seconds before the same missing parent is requested again
+
+    def __init__(self, max_blocks=None, ttl=None):
+        self.max_blocks = max_blocks or self.MAX_BLOCKS
+        self.ttl = ttl or self.TTL
+        self.blocks = OrderedDict()  # Block hash -> (block, peer, added at)
+        self.by_parent = {}  # previous_hash -> set of orphan hashes
+        self.requested = {}  # Missing block hash -> time it was last requested
+        self._lock = threading.Lock()
+
+    def __contains__(self, block_hash):
+        return block_hash in self.blocks
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def get(self, block_hash):
+        """The pooled block with this hash, or None."""
+        entry = self.blocks.get(block_hash)
+        return entry[0] if entry is not None else None
+
+    def _remove(self, block_hash):
+        block, _, _ = self.blocks.pop(block_hash)
+        children = self.by_parent.get(block.previous_hash)
+        if children is not None:
+            children.discard(block_hash)
+            if not children:
+                del self.by_parent[block.previous_hash]
+        return block
+
+    def _expire(self, now):
+        while self.blocks:
+            block_hash, (_, _, added_at) = next(iter(self.blocks.items()))
+            if now - added_at < self.ttl:
+                break
+            self._remove(block_hash)
+        for block_hash in [h for h, at in self.requested.items() if now - at >= self.REQUEST_RETRY]:
+            del self.requested[block_hash]
+
+    def add(self, block, peer=None):
+        """Store an orphan; returns False if it was already pooled."""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            if block.hash in self.blocks:
+                return False
+            self.blocks[block.hash] = (block, peer, now)
+            self.by_parent.setdefault(block.previous_hash, set()).add(block.hash)
+            while len(self.blocks) > self.max_blocks:
+                evicted = self._remove(next(iter(self.blocks)))
+                print(f"DEBUG: Orphan pool full, evicted block {evicted.index}")
+            return True
+
+    def pop_children(self, parent_hash):
+        """Remove and return the orphans waiting for `parent_hash`, lowest first."""
+        with self._lock:
+            self._expire(time.time())
+            children = [self._remove(block_hash) for block_hash in list(self.by_parent.get(parent_hash, ()))]
+        return sorted(children, key=lambda block: block.index)
+
+    def missing_parent(self, block):
+        """(hash, height) of the oldest missing ancestor of a pooled block, following pooled parents."""
+        with self._lock:
+            entry = self.blocks.get(block.previous_hash)
+            while entry is not None:
+                block = entry[0]
+                entry = self.blocks.get(block.previous_hash)
+        return block.previous_hash, block.index - 1
+
+    def mark_requested(self, block_hash):
+        """True if `block_hash` should be requested now (it was not asked for within REQUEST_RETRY seconds)."""
+        now = time.time()
+        with self._lock:
+            requested_at = self.requested.get(block_hash)
+            if requested_at is not None and now - requested_at < self.REQUEST_RETRY:
+                return False
+            self.requested[block_hash] = now
+            return True
@@ -0,0 +1,179 @@
+import atexit
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+_cancel_event = None  # Set in each worker process by _init_worker
+
+
+def _init_worker(cancel_event):
+    global _cancel_event
+    _cancel_event = cancel_event
+
+
+def encode_nonce(nonce, nonce_encoding):
+    """Nonce bytes as they appear in the hashed input: ASCII decimal (legacy JSON blocks) or big-endian u64."""
+    if nonce_encoding == "u64":
+        return nonce.to_bytes(8, "big")
+    return str(nonce).encode()
+
+
+def search_nonces(prefix, suffix, start, stop, difficulty, nonce_encoding="decimal", cancel_event=None):
+    """Try every nonce in [start, stop) until sha256(prefix + nonce + suffix) meets the difficulty.
+
+    Returns (nonce, hash, attempts); nonce and hash are None when the range is
+    exhausted or the search was cancelled. The prefix is hashed once and its
+    midstate copied for each attempt.
+    """
+    cancel_event = cancel_event or _cancel_event
+    target = "0" * difficulty
+    midstate = hashlib.sha256(prefix)
+
+    for nonce in range(start, stop):
+        if nonce & 0x3FF == 0 and cancel_event is not None and cancel_event.is_set():
+            return None, None, nonce - start
+        attempt = midstate.copy()
+        attempt.update(encode_nonce(nonce, nonce_encoding) + suffix)
+        digest = attempt.hexdigest()
+        if digest.startswith(target):
+            return nonce, digest, nonce - start + 1
+
+    return None, None, stop - start
+
+
+class ProofOfWorkMiner:
+    """Searches for a proof-of-work nonce across a pool of worker processes.
+
+    The nonce space is cut into chunks of `chunk_size` that are handed out to
+    the workers in order, so every worker scans its own range. The first
+    worker to find a valid hash sets a shared cancel event and the others stop
+    within ~1000 attempts. `cancel()` abandons the job in flight, for example
+    when a peer block advances the tip.
+
+    Workers are forked, so `start()` should run at startup before the process
+    has other threads: a child forked while another thread holds a lock (the
+    import lock, a logging or connection pool lock) can deadlock on it. Spawned
+    workers would avoid that, but they re-import the main script, which here
+    builds a whole node. `start()` also registers `close()` to run at exit.
+    """
+
+    CHUNK_SIZE = 50_000
+
+    def __init__(self, workers=None, chunk_size=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.last_hashrate = 0.0
+        self.total_hashes = 0
+        self.mining = False
+        self._pool = None
+        self._context = multiprocessing.get_context("fork" if os.name == "posix" else None)
+        self._cancel_event = self._context.Event()
+        self._lock = threading.Lock()  # One mining job at a time
+
+    def start(self):
+        """Fork the worker processes now rather than on the first mining job."""
+        if self.workers > 1 and self._pool is None:
+            self._get_pool().submit(int).result()  # Forked workers are all started on the first submit
+            atexit.register(self.close)
+
+    def _get_pool(self):
+        if self._pool is None:
+            if threading.active_count() > 1 and self._context.get_start_method() == "fork":
+                print(f"WARNING: Forking {self.workers} PoW workers from a process with "
+                      f"{threading.active_count()} threads, call start() at startup instead.")
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=self._context,
+                initializer=_init_worker,
+                initargs=(self._cancel_event,)
+            )
+        return self._pool
+
+    def cancel(self):
+        """Abandon the job in flight (no-op when idle)."""
+        if self.mining:
+            self._cancel_event.set()
+
+    def mine(self, prefix, suffix, difficulty, nonce_encoding="decimal"):
+        """Return (nonce, hash) for the given hashing template, or None if the job was cancelled."""
+        with self._lock:
+            self._cancel_event.clear()
+            self.mining = True
+            started = time.time()
+            try:
+                if self.workers == 1:
+                    nonce, digest, attempts = self._mine_inline(prefix, suffix, difficulty, nonce_encoding)
+                else:
+                    nonce, digest, attempts = self._mine_parallel(prefix, suffix, difficulty, nonce_encoding)
+            finally:
+                self.mining = False
+
+            elapsed = max(time.time() - started, 1e-9)
+            self.total_hashes += attempts
+            self.last_hashrate = attempts / elapsed
+            print(f"DEBUG: PoW {'found nonce ' + str(nonce) if digest else 'cancelled'} after "
+                  f"{attempts} hashes with {self.workers} workers ({self.last_hashrate:,.0f} H/s)")
+            return (nonce, digest) if digest else None
+
+    def _mine_inline(self, prefix, suffix, difficulty, nonce_encoding):
+        attempts = 0
+        start = 0
+        while not self._cancel_event.is_set():
+            nonce, digest, tried = search_nonces(prefix, suffix, start, start + self.chunk_size,
+                                                 difficulty, nonce_encoding, self._cancel_event)
+            attempts += tried
+            if digest:
+                return nonce, digest, attempts
+            start += self.chunk_size
+        return None, None, attempts
+
+    def _mine_parallel(self, prefix, suffix, difficulty, nonce_encoding):
+        pool = self._get_pool()
+        next_start = 0
+        pending = set()
+        attempts = 0
+        found = None
+
+        def submit():
+            nonlocal next_start
+            pending.add(pool.submit(search_nonces, prefix, suffix, next_start,
+                                    next_start + self.chunk_size, difficulty, nonce_encoding))
+            next_start += self.chunk_size
+
+        for _ in range(self.workers):
+            submit()
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                nonce, digest, tried = future.result()
+                attempts += tried
+                if digest and (found is None or nonce < found[0]):
+                    found = (nonce, digest)
+            if found or self._cancel_event.is_set():
+                self._cancel_event.set()  # Stop the remaining workers
+                continue
+            while len(pending) < self.workers:
+                submit()
+
+        if found:
+            return found[0], found[1], attempts
+        return None, None, attempts
+
+    def status(self):
+        return {
+            "workers": self.workers,
+            "mining": self.mining,
+            "last_hashrate": round(self.last_hashrate, 2),
+            "total_hashes": self.total_hashes
+        }
+
+    def close(self):
+        """Stop the job in flight and wait for the worker processes to exit."""
+        self.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """LRU cache of rendered responses keyed on (endpoint, args, state version).
+
+    The state version is whatever the response depends on (the tip hash, a
+    counter bumped when contracts change, ...), so a new block or a state
+    change simply misses and stale entries age out of the LRU. The ETag is
+    derived from the key alone: a client that still holds it can be answered
+    with 304 before the view runs or the cache is even consulted. Counters such
+    as the contracts version restart at 0 with the process, so the ETag also
+    mixes in a random salt drawn per cache instance; an ETag handed out before
+    a restart never matches afterwards. Entries are bounded both in number and
+    in total body bytes.
+    """
+
+    MAX_ENTRIES = 512
+    MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self._entries = OrderedDict()  # Key -> (body, status, mimetype)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.salt = os.urandom(16)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def etag(self, key):
+        return hashlib.blake2b(repr(key).encode(), digest_size=16, salt=self.salt).hexdigest()
+
+    def get(self, key):
+        """The cached (body, status, mimetype) for `key`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, status, mimetype):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = (body, status, mimetype)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted[0])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
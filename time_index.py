@@ -0,0 +1,40 @@
+import bisect
+
+
+class BlockTimeIndex:
+    """Block timestamps kept sorted for date-range queries.
+
+    `times[height]` is the epoch timestamp of each block and `entries` holds
+    (timestamp, height) pairs in time order, so a date range bisects straight
+    to the blocks inside it. Blocks normally arrive in time order and insert
+    at the end; a block whose clock ran behind its parent still lands in the
+    right place.
+    """
+
+    def __init__(self):
+        self.times = []
+        self.entries = []
+
+    def __len__(self):
+        return len(self.times)
+
+    def append(self, height, timestamp):
+        if height != len(self.times):
+            raise ValueError(f"block {height} appended at height {len(self.times)}")
+        self.times.append(timestamp)
+        bisect.insort(self.entries, (timestamp, height))
+
+    def pop(self):
+        """Drop the tip block's entry."""
+        height = len(self.times) - 1
+        timestamp = self.times.pop()
+        del self.entries[bisect.bisect_left(self.entries, (timestamp, height))]
+
+    def time_at(self, height):
+        return self.times[height]
+
+    def heights_between(self, start, end):
+        """Heights, in chain order, of the blocks with start <= timestamp <= end."""
+        low = bisect.bisect_left(self.entries, (start, -1))
+        high = bisect.bisect_right(self.entries, (end, len(self.times)))
+        return sorted(height for _, height in self.entries[low:high])
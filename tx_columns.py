@@ -0,0 +1,260 @@
+import json
+import os
+
+import numpy as np
+
+
+class TransactionColumns:
+    """Confirmed transactions as growable NumPy columns, one row per transaction.
+
+    Rows are appended block by block, so they are ordered by (height,
+    position) and the rows of a height range are one contiguous slice.
+    Addresses and tokens are interned to integer ids. Range and equality
+    filters are evaluated as vectorized boolean masks and aggregates (count,
+    sum, histogram) run over the selected rows without building any
+    transaction dicts. Snapshots carry the height and tip hash they were
+    taken at, like the account ledger's.
+    """
+
+    NUMERIC_COLUMNS = {
+        "height": np.int64,
+        "position": np.int32,
+        "timestamp": np.float64,
+        "amount": np.float64,
+        "gas_fee": np.float64,
+    }
+    ID_COLUMNS = ("sender", "receiver", "token")
+    NO_ID = -1  # Missing sender/receiver (e.g. mint transactions)
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self):
+        self.height = 0
+        self.tip_hash = None
+        self._reset()
+
+    def _reset(self, capacity=None):
+        capacity = capacity or self.INITIAL_CAPACITY
+        self.size = 0
+        self.generation = getattr(self, "generation", 0) + 1  # Bumped on every change, keys derived caches
+        self._sorted = {}  # Column name -> (generation, row order, sorted values)
+        self.columns = {name: np.zeros(capacity, dtype) for name, dtype in self.NUMERIC_COLUMNS.items()}
+        self.columns.update({name: np.full(capacity, self.NO_ID, np.int32) for name in self.ID_COLUMNS})
+        self.names = []  # Interned id -> address or token
+        self.ids = {}
+
+    def __len__(self):
+        return self.size
+
+    def column(self, name):
+        """Live rows of one column (a view, not a copy)."""
+        return self.columns[name][:self.size]
+
+    def intern(self, value):
+        if value is None:
+            return self.NO_ID
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = self.ids[value] = len(self.names)
+            self.names.append(value)
+        return value_id
+
+    def lookup_id(self, value):
+        """Interned id of an address or token, or None if no transaction mentions it."""
+        return self.ids.get(value)
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        capacity = len(self.columns["height"])
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name, values in self.columns.items():
+            grown = np.full(capacity, self.NO_ID, values.dtype) if name in self.ID_COLUMNS else np.zeros(capacity, values.dtype)
+            grown[:self.size] = values[:self.size]
+            self.columns[name] = grown
+
+    @staticmethod
+    def _number(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return np.nan
+
+    def apply_block(self, block):
+        transactions = block.transactions
+        self._reserve(len(transactions))
+        row = self.size
+        for position, tx in enumerate(transactions):
+            self.columns["height"][row] = block.index
+            self.columns["position"][row] = position
+            self.columns["timestamp"][row] = block.timestamp
+            self.columns["amount"][row] = self._number(tx.get("amount"))
+            self.columns["gas_fee"][row] = self._number(tx.get("gas_fee", 0))
+            self.columns["sender"][row] = self.intern(tx.get("sender"))
+            self.columns["receiver"][row] = self.intern(tx.get("receiver"))
+            self.columns["token"][row] = self.intern(tx.get("token"))
+            row += 1
+        self.size = row
+        self.generation += 1
+        self.height = block.index + 1
+        self.tip_hash = block.hash
+
+    def revert_block(self, block, previous_hash=None):
+        """Undo the tip block; `previous_hash` becomes the new tip hash."""
+        self.size = self.row_range(block.index, block.index + 1)[0]
+        self.generation += 1
+        self.height = block.index
+        self.tip_hash = previous_hash if previous_hash is not None else block.previous_hash
+
+    def row_range(self, start_height, end_height):
+        """[first, last) rows of the blocks with start_height <= height < end_height."""
+        heights = self.column("height")
+        return (int(np.searchsorted(heights, start_height, "left")),
+                int(np.searchsorted(heights, end_height, "left")))
+
+    def sorted_column(self, name):
+        """(row order, sorted values) of a numeric column, cached until the table changes."""
+        cached = self._sorted.get(name)
+        if cached is None or cached[0] != self.generation:
+            order = np.argsort(self.column(name), kind="stable")
+            cached = self._sorted[name] = (self.generation, order, self.column(name)[order])
+        return cached[1], cached[2]
+
+    def _value_bounds(self, name, low, high):
+        order, values = self.sorted_column(name)
+        first = 0 if low is None else int(np.searchsorted(values, low, "left"))
+        last = len(values) if high is None else int(np.searchsorted(values, high, "right"))
+        return order, first, max(first, last)
+
+    def value_range_rows(self, name, low=None, high=None):
+        """Row numbers, in chain order, with low <= column value <= high (found by bisecting the sorted column)."""
+        order, first, last = self._value_bounds(name, low, high)
+        return np.sort(order[first:last])
+
+    def count_value_range(self, name, low=None, high=None):
+        _, first, last = self._value_bounds(name, low, high)
+        return last - first
+
+    def rows_of_heights(self, heights):
+        """Row numbers of every transaction in the given (ascending) block heights."""
+        heights = np.asarray(heights, dtype=np.int64)
+        column = self.column("height")
+        starts = np.searchsorted(column, heights, "left")
+        ends = np.searchsorted(column, heights + 1, "left")
+        if len(heights) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+
+    def count_rows_of_heights(self, heights):
+        heights = np.asarray(heights, dtype=np.int64)
+        column = self.column("height")
+        return int((np.searchsorted(column, heights + 1, "left") - np.searchsorted(column, heights, "left")).sum())
+
+    def rows_at(self, locations):
+        """Row numbers of (height, position) pairs."""
+        if not locations:
+            return np.zeros(0, dtype=np.int64)
+        heights, positions = np.asarray(locations, dtype=np.int64).T
+        return np.searchsorted(self.column("height"), heights, "left") + positions
+
+    def rows_after(self, rows, after):
+        """The row numbers in `rows` that come after the (height, position) cursor `after`."""
+        if after is None:
+            return rows
+        return rows[rows > self.rows_at([after])[0]]
+
+    def mask(self, rows=None, min_amount=None, max_amount=None, token=None, sender=None, receiver=None,
+             start_time=None, end_time=None):
+        """Boolean mask over `rows` (a slice or index array, all rows by default) for the given filters.
+
+        Equality filters take the address or token itself; one that was never
+        interned matches nothing.
+        """
+        rows = slice(0, self.size) if rows is None else rows
+        selected = np.ones(len(self.column("height")[rows]), dtype=bool)
+
+        for name, value in (("token", token), ("sender", sender), ("receiver", receiver)):
+            if value is None:
+                continue
+            value_id = self.lookup_id(value)
+            if value_id is None:
+                selected[:] = False
+                return selected
+            selected &= self.column(name)[rows] == value_id
+
+        if min_amount is not None:
+            selected &= self.column("amount")[rows] >= min_amount
+        if max_amount is not None:
+            selected &= self.column("amount")[rows] <= max_amount
+        if start_time is not None:
+            selected &= self.column("timestamp")[rows] >= start_time
+        if end_time is not None:
+            selected &= self.column("timestamp")[rows] <= end_time
+        return selected
+
+    def select(self, rows=None, **filters):
+        """Row numbers, in chain order, of the rows matching `filters` (see `mask`)."""
+        if rows is None:
+            rows = slice(0, self.size)
+        selected = self.mask(rows, **filters)
+        if isinstance(rows, slice):
+            return np.flatnonzero(selected) + rows.start
+        return np.asarray(rows)[selected]
+
+    def locations(self, rows):
+        """(height, position) of each row number."""
+        return list(zip(self.column("height")[rows].tolist(), self.column("position")[rows].tolist()))
+
+    def count(self, rows):
+        return int(len(rows))
+
+    def sum(self, name, rows):
+        return float(np.nansum(self.column(name)[rows]))
+
+    def histogram(self, name, rows, bins=10):
+        """(counts, bin edges) of a numeric column over the selected rows."""
+        values = self.column(name)[rows]
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return [], []
+        counts, edges = np.histogram(values, bins=bins)
+        return counts.tolist(), edges.tolist()
+
+    def rebuild(self, chain):
+        """Recompute every column by applying the whole chain."""
+        self.height = 0
+        self.tip_hash = None
+        self._reset()
+        for block in chain:
+            self.apply_block(block)
+
+    def save(self, path):
+        tmp_path = path + ".tmp.npz"  # np.savez appends .npz to names without it
+        arrays = {name: self.column(name) for name in self.columns}
+        meta = json.dumps({"height": self.height, "tip_hash": self.tip_hash, "names": self.names})
+        np.savez(tmp_path, meta=np.array(meta), **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Load a snapshot; returns False if it is missing or unreadable."""
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as snapshot:
+                meta = json.loads(str(snapshot["meta"]))
+                arrays = {name: snapshot[name] for name in self.columns}
+        except (OSError, ValueError, KeyError):
+            print(f"ERROR: Corrupted transaction column snapshot {path}, it will be rebuilt.")
+            return False
+
+        size = len(arrays["height"])
+        self._reset(max(self.INITIAL_CAPACITY, size))
+        for name, values in arrays.items():
+            self.columns[name][:size] = values
+        self.size = size
+        self.names = meta["names"]
+        self.ids = {value: value_id for value_id, value in enumerate(self.names)}
+        self.height = meta["height"]
+        self.tip_hash = meta["tip_hash"]
+        return True
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import struct
+import threading
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over byte strings.
+
+    `key in filter` is False only for keys that were never added, so a miss
+    answers a lookup without touching the index on disk. Keys cannot be
+    removed; a stale positive just falls through to the exact index.
+    """
+
+    FILE_HEADER = struct.Struct(">4sQQQI")  # magic, height, capacity, bit count, hash count
+    MAGIC = b"IFBF"
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, capacity)
+        self.num_bits = max(8, math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        first, second = struct.unpack(">QQ", hashlib.blake2b(key, digest_size=16).digest())
+        for i in range(self.num_hashes):
+            yield (first + i * second) % self.num_bits
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def save(self, path, height):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.FILE_HEADER.pack(self.MAGIC, height, self.capacity, self.num_bits, self.num_hashes))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Return (filter, height) from a saved file, or (None, None) if it is missing or unreadable."""
+        if not os.path.exists(path):
+            return None, None
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < cls.FILE_HEADER.size:
+            return None, None
+        magic, height, capacity, num_bits, num_hashes = cls.FILE_HEADER.unpack_from(data)
+        bits = data[cls.FILE_HEADER.size:]
+        if magic != cls.MAGIC or len(bits) != (num_bits + 7) // 8:
+            return None, None
+
+        bloom = cls.__new__(cls)
+        bloom.capacity = capacity
+        bloom.num_bits = num_bits
+        bloom.num_hashes = num_hashes
+        bloom.bits = bytearray(bits)
+        return bloom, height
+
+
+class TransactionIndex:
+    """Persistent map of confirmed transaction hash -> (block height, position in block).
+
+    Entries live in an SQLite database next to the block log and are added
+    block by block, so finding a transaction or checking whether it was
+    already confirmed is one key lookup instead of a scan of every block.
+    A Bloom filter in front of the database answers most lookups for unknown
+    hashes from memory. A hash confirmed in several blocks keeps its first
+    occurrence. Like the account ledger, the index records the height and
+    tip hash it was built to, so a restart only replays blocks added since.
+    """
+
+    DB_FILE = "tx_index.sqlite"
+    BLOOM_FILE = "tx_index.bloom"
+    INITIAL_CAPACITY = 100_000
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.height = 0
+        self.tip_hash = None
+        self.count = 0
+        self._lock = threading.Lock()
+        self._db = self._connect()
+        self._load_meta()
+        self._load_bloom()
+
+    def _db_path(self):
+        return os.path.join(self.directory, self.DB_FILE)
+
+    def _bloom_path(self):
+        return os.path.join(self.directory, self.BLOOM_FILE)
+
+    def _connect(self):
+        # Shared by the request threads; every use holds self._lock
+        db = sqlite3.connect(self._db_path(), check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS entries (hash TEXT PRIMARY KEY, height INTEGER NOT NULL, position INTEGER NOT NULL) WITHOUT ROWID")
+        db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        db.commit()
+        return db
+
+    def _load_meta(self):
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'state'").fetchone()
+        meta = json.loads(row[0]) if row else {}
+        self.height = meta.get("height", 0)
+        self.tip_hash = meta.get("tip_hash")
+        self.count = meta.get("count", 0)
+
+    def _save_meta(self):
+        state = json.dumps({"height": self.height, "tip_hash": self.tip_hash, "count": self.count})
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('state', ?)", (state,))
+        self._db.commit()
+
+    def _load_bloom(self):
+        bloom, height = BloomFilter.load(self._bloom_path())
+        if bloom is None or height != self.height or bloom.capacity < self.count:
+            self._rebuild_bloom()
+        else:
+            self.bloom = bloom
+
+    def _rebuild_bloom(self, capacity=None):
+        self.bloom = BloomFilter(capacity or max(self.INITIAL_CAPACITY, self.count * 2))
+        for (tx_hash,) in self._db.execute("SELECT hash FROM entries"):
+            self.bloom.add(tx_hash.encode())
+
+    def lookup(self, tx_hash):
+        """Return (height, position) of a confirmed transaction, or None."""
+        with self._lock:
+            if tx_hash.encode() not in self.bloom:
+                return None
+            row = self._db.execute("SELECT height, position FROM entries WHERE hash = ?", (tx_hash,)).fetchone()
+        return tuple(row) if row is not None else None
+
+    def __contains__(self, tx_hash):
+        return self.lookup(tx_hash) is not None
+
+    def apply_block(self, block):
+        with self._lock:
+            for position, tx in enumerate(block.transactions):
+                tx_hash = tx.get("hash")
+                if not tx_hash:
+                    continue
+                # A replayed hash is ignored: the first confirmation is kept
+                cursor = self._db.execute("INSERT OR IGNORE INTO entries (hash, height, position) VALUES (?, ?, ?)",
+                                          (tx_hash, block.index, position))
+                if cursor.rowcount:
+                    self.bloom.add(tx_hash.encode())
+                    self.count += 1
+            self.height = block.index + 1
+            self.tip_hash = block.hash
+            self._save_meta()
+            if self.count > self.bloom.capacity:
+                self._rebuild_bloom(self.bloom.capacity * 2)
+
+    def revert_block(self, block, previous_hash=None):
+        """Undo the tip block; `previous_hash` becomes the new tip hash."""
+        with self._lock:
+            for tx in block.transactions:
+                tx_hash = tx.get("hash")
+                if tx_hash:
+                    cursor = self._db.execute("DELETE FROM entries WHERE hash = ? AND height = ?", (tx_hash, block.index))
+                    self.count -= cursor.rowcount
+            self.height = block.index
+            self.tip_hash = previous_hash if previous_hash is not None else block.previous_hash
+            self._save_meta()
+
+    def rebuild(self, chain):
+        """Drop every entry and re-index the whole chain."""
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self.height = 0
+            self.tip_hash = None
+            self.count = 0
+            self._save_meta()
+            self.bloom = BloomFilter(self.INITIAL_CAPACITY)
+        for block in chain:
+            self.apply_block(block)
+
+    def sync(self):
+        """Checkpoint the database and snapshot the Bloom filter at the current height."""
+        with self._lock:
+            self._db.execute("PRAGMA wal_checkpoint")
+            self.bloom.save(self._bloom_path(), self.height)
+
+    def close(self):
+        self.sync()
+        with self._lock:
+            self._db.close()